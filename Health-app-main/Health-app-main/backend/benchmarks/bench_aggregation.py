@@ -0,0 +1,130 @@
+import argparse
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from benchmarks.common import print_table
+from src.models.timeseries import WearableSeries
+from src.utils import aggregation
+
+# Cost of a 30-day multi-metric health report computed with the vectorised
+# aggregation engine versus the same statistics written as pure-Python loops.
+
+DAY_MS = aggregation.MS_PER_DAY
+WINDOW_MS = 5 * aggregation.MS_PER_MINUTE
+
+def make_series(days: int, interval_s: int, mean: float, spread: float, seed: int) -> WearableSeries:
+    rng = np.random.default_rng(seed)
+    count = days * 86_400 // interval_s
+    timestamps = 1_704_067_200_000 + np.arange(count, dtype=np.int64) * interval_s * 1000
+    return WearableSeries(timestamps, (mean + spread * rng.standard_normal(count)).round(1))
+
+# -- pure-Python reference ----------------------------------------------------
+
+def py_percentile(sorted_values, p):
+    rank = (len(sorted_values) - 1) * p / 100
+    lo, hi = math.floor(rank), math.ceil(rank)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+def py_describe(values):
+    ordered = sorted(values)
+    mean = sum(values) / len(values)
+    return {
+        "min": ordered[0], "max": ordered[-1], "mean": mean,
+        "percentiles": [py_percentile(ordered, p) for p in aggregation.DEFAULT_PERCENTILES],
+    }
+
+def py_daily(timestamps, values):
+    days = {}
+    for ts, value in zip(timestamps, values):
+        bucket = days.setdefault(ts // DAY_MS, [math.inf, -math.inf, 0.0, 0])
+        bucket[0] = min(bucket[0], value)
+        bucket[1] = max(bucket[1], value)
+        bucket[2] += value
+        bucket[3] += 1
+    return days
+
+def py_resting(timestamps, values):
+    window, total, means = deque(), 0.0, []
+    for ts, value in zip(timestamps, values):
+        window.append((ts, value))
+        total += value
+        while window[0][0] <= ts - WINDOW_MS:
+            total -= window.popleft()[1]
+        means.append(total / len(window))
+    return py_percentile(sorted(means), 5)
+
+def py_hrv(timestamps, values):
+    windows = {}
+    prev_ts, prev_rr = None, None
+    for ts, value in zip(timestamps, values):
+        rr = 60_000.0 / value
+        if prev_ts is not None and prev_ts // WINDOW_MS == ts // WINDOW_MS:
+            acc = windows.setdefault(ts // WINDOW_MS, [0.0, 0])
+            acc[0] += (rr - prev_rr) ** 2
+            acc[1] += 1
+        prev_ts, prev_rr = ts, rr
+    rmssd = sorted(math.sqrt(s / n) for s, n in windows.values())
+    return py_percentile(rmssd, 50)
+
+def py_dips(timestamps, values, threshold=90.0):
+    dips, start, lowest = 0, None, math.inf
+    for i, value in enumerate(values):
+        if value < threshold:
+            lowest = min(lowest, value)
+            if start is None:
+                start = i
+        elif start is not None:
+            dips += timestamps[i - 1] - timestamps[start] >= 60_000
+            start = None
+    if start is not None:
+        dips += timestamps[-1] - timestamps[start] >= 60_000
+    return dips, lowest
+
+def python_report(raw):
+    hr_ts, hr = raw["heart_rate"]
+    spo2_ts, spo2 = raw["blood_oxygen"]
+    return {
+        "heart_rate": (py_describe(hr), py_resting(hr_ts, hr), py_hrv(hr_ts, hr), py_daily(hr_ts, hr)),
+        "blood_oxygen": (py_describe(spo2), py_dips(spo2_ts, spo2)),
+        "activity": py_daily(*raw["activity"]),
+        "sleep": py_daily(*raw["sleep"]),
+    }
+
+def best_of(repeat, fn, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Wearable aggregation benchmark")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--hr-interval", type=int, default=5, help="Seconds between heart-rate samples")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    series = {
+        "heart_rate": make_series(args.days, args.hr_interval, 72, 9, 1),
+        "blood_oxygen": make_series(args.days, 60, 96, 2.5, 2),
+        "activity": make_series(args.days, 60, 40, 25, 3),
+        "sleep": make_series(args.days, 300, 5, 1, 4),
+    }
+    raw = {name: (s.timestamps.tolist(), s.values.tolist()) for name, s in series.items()}
+    samples = sum(len(s) for s in series.values())
+
+    numpy_s = best_of(args.repeat, aggregation.build_report_stats, series)
+    python_s = best_of(args.repeat, python_report, raw)
+
+    print_table(f"{args.days}-day report, {samples} samples across 4 metrics", [
+        {"engine": "pure-Python loops", "report_ms": round(python_s * 1000, 1), "speedup": "1.0x"},
+        {"engine": "NumPy aggregation", "report_ms": round(numpy_s * 1000, 1),
+         "speedup": f"{python_s / numpy_s:.1f}x"},
+    ])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import print_table
+from src.models.timeseries import WearableSeries
+from src.utils.anomaly import AnomalyDetector
+
+# Throughput of the streaming anomaly detector on one worker. Thousands of
+# patients stream per-second heart rate and per-minute SpO2, delivered in
+# one-minute batches the way /wearable/ingest hands them over. A few patients
+# have a tachycardia episode or an SpO2 drop so the alert path is exercised too.
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming anomaly detection benchmark")
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--minutes", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    start_ms = 1_704_067_200_000
+    unhealthy = set(range(0, args.patients, 100))
+    detector = AnomalyDetector()
+
+    batches = []
+    for minute in range(args.minutes):
+        minute_ms = start_ms + minute * 60_000
+        for patient in range(args.patients):
+            hr = 72 + 6 * rng.standard_normal(60)
+            spo2 = 97 + rng.standard_normal(1)
+            if patient in unhealthy and minute >= args.minutes // 2:
+                hr += 50
+                spo2 -= 10
+            timestamps = minute_ms + np.arange(60, dtype=np.int64) * 1000
+            batches.append({
+                (f"patient-{patient}", "heart_rate"): WearableSeries._wrap(timestamps, hr, "bpm"),
+                (f"patient-{patient}", "blood_oxygen"): WearableSeries._wrap(timestamps[:1], spo2, "%"),
+            })
+
+    alerts = 0
+    started = time.perf_counter()
+    for batch in batches:
+        alerts += len(detector.observe_batch(batch))
+    elapsed = time.perf_counter() - started
+
+    samples = detector.samples
+    print_table(f"{args.patients} patients, {args.minutes} minutes of streaming data", [{
+        "samples": samples,
+        "elapsed_s": round(elapsed, 2),
+        "samples_per_s": round(samples / elapsed),
+        "us_per_sample": round(elapsed / samples * 1e6, 2),
+        "realtime_patients": round(samples / elapsed / (61 / 60)),
+        "alerts": alerts,
+        "patients_with_episodes": len(unhealthy),
+    }])
+
+if __name__ == "__main__":
+    main()
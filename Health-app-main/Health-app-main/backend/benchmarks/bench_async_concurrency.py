@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.common import FAKE_SUPABASE_KEY, MockHTTPServer, latency_summary, print_table
+
+# Fires N parallel requests at /doctors/locations and reports tail latency for
+# the old handler (synchronous supabase-py `.execute()` inside `async def`) and
+# the async repository layer. The mock PostgREST server adds a fixed delay so
+# blocking the event loop shows up as queueing.
+
+async def fire(app: FastAPI, path: str, requests_total: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Every request "arrives" at the same instant, so queueing behind a
+        # blocked event loop counts towards its latency.
+        started = time.perf_counter()
+
+        async def one():
+            response = await client.get(path)
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        samples = await asyncio.gather(*(one() for _ in range(requests_total)))
+        return samples, time.perf_counter() - started
+
+def build_legacy_app() -> FastAPI:
+    from src.utils.supabase_client import get_supabase_client
+
+    legacy = FastAPI()
+
+    @legacy.get("/doctors/locations")
+    async def get_doctors_locations():
+        supabase = get_supabase_client()
+        return supabase.table("doctors").select("*").execute().data
+
+    return legacy
+
+def main():
+    parser = argparse.ArgumentParser(description="Async data-access concurrency benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock DB latency in seconds")
+    args = parser.parse_args()
+
+    doctors = [{"id": str(i), "name": f"Dr. {i}", "specialty": "Cardiology",
+                "latitude": 30.0, "longitude": 78.0} for i in range(20)]
+
+    with MockHTTPServer(lambda method, path, body: doctors, latency=args.latency) as server:
+        os.environ["SUPABASE_URL"] = server.url
+        os.environ["SUPABASE_KEY"] = FAKE_SUPABASE_KEY
+        from main import app
+        from src.utils.supabase_client import registry
+
+        async def run_all():
+            rows = []
+            for label, target in (("sync execute() in async def", build_legacy_app()),
+                                  ("async repository", app)):
+                samples, elapsed = await fire(target, "/doctors/locations", args.requests)
+                rows.append({
+                    "handler": label,
+                    "requests": args.requests,
+                    "wall_s": round(elapsed, 3),
+                    **latency_summary(samples),
+                })
+            await registry.aclose()
+            return rows
+
+        rows = asyncio.run(run_all())
+
+    print_table(f"{args.requests} parallel requests, {args.latency * 1000:.0f} ms DB latency", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk, jwt
+
+from benchmarks.common import MockHTTPServer, latency_summary, print_table
+from src.utils.auth import InvalidToken, TokenVerifier
+
+# Per-request cost of authenticating a caller. Remote: one GET to a mock Supabase
+# Auth `/auth/v1/user` endpoint per request, as get_current_user used to do
+# (localhost plus a simulated network round trip). Local: TokenVerifier checks ES256
+# tokens against a JWKS served by the same mock. Cold verifies every token
+# once; warm replays tokens from a pool of sessions, as real clients do. Midway the
+# signing key is rotated; tokens signed with the new key must verify after a
+# single JWKS refetch, and tampered tokens must be rejected.
+
+def signing_key(kid):
+    private = ec.generate_private_key(ec.SECP256R1())
+    pem = private.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    public = jwk.construct(private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo), "ES256").to_dict()
+    public.update(kid=kid, use="sig")
+    return pem, public
+
+def token(pem, kid, user):
+    now = int(time.time())
+    return jwt.encode({"sub": f"user-{user}", "aud": "authenticated", "role": "authenticated",
+                       "email": f"user{user}@example.com", "iat": now, "exp": now + 3600},
+                      pem, algorithm="ES256", headers={"kid": kid})
+
+async def measure(tokens, check):
+    latencies = []
+    for value in tokens:
+        started = time.perf_counter()
+        await check(value)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+async def main_async(args):
+    keys = [signing_key("key-1")]
+    jwks = {"keys": [keys[0][1]]}
+
+    def responder(method, path, body):
+        if path.endswith("/jwks.json"):
+            return jwks
+        return {"id": "user", "aud": "authenticated", "email": "user@example.com"}
+
+    rows = []
+    with MockHTTPServer(responder, latency=args.rtt_ms / 1000) as server:
+        async with httpx.AsyncClient(base_url=server.url) as client:
+            async def remote(value):
+                response = await client.get("/auth/v1/user", headers={"Authorization": f"Bearer {value}"})
+                response.raise_for_status()
+
+            tokens = [token(keys[0][0], "key-1", i) for i in range(args.remote_requests)]
+            latencies = await measure(tokens, remote)
+            rows.append({"auth": f"Supabase get_user ({args.rtt_ms:g} ms RTT)", "requests": len(tokens),
+                         "network_calls": server.request_count, **latency_summary(latencies)})
+
+        server.latency = 0
+        verifier = TokenVerifier(secret="", jwks_url=f"{server.url}/auth/v1/.well-known/jwks.json",
+                                 jwks_min_refresh=1.0)
+        calls_before = server.request_count
+        tokens = [token(keys[0][0], "key-1", i) for i in range(args.sessions)]
+        latencies = await measure(tokens, verifier.verify)
+        rows.append({"auth": "local ES256 (cold, every token new)", "requests": len(tokens),
+                     "network_calls": server.request_count - calls_before, **latency_summary(latencies)})
+
+        rng = random.Random(20)
+        calls_before = server.request_count
+        replay = [rng.choice(tokens) for _ in range(args.requests)]
+        latencies = await measure(replay, verifier.verify)
+        rows.append({"auth": f"local ES256 (warm, {args.sessions} sessions)", "requests": len(replay),
+                     "network_calls": server.request_count - calls_before, **latency_summary(latencies)})
+
+        # Rotate: the project starts signing with key-2 while key-1 tokens stay valid.
+        # Unknown key ids refetch at most once per jwks_min_refresh, so let that pass first.
+        await asyncio.sleep(verifier.jwks_min_refresh)
+        keys.append(signing_key("key-2"))
+        jwks["keys"] = [keys[0][1], keys[1][1]]
+        calls_before = server.request_count
+        rotated = [token(keys[1][0], "key-2", i) for i in range(args.sessions)]
+        latencies = await measure(rotated, verifier.verify)
+        rows.append({"auth": "local ES256 (after key rotation)", "requests": len(rotated),
+                     "network_calls": server.request_count - calls_before, **latency_summary(latencies)})
+
+        header, payload, signature = tokens[0].split(".")
+        forged = ".".join([header, payload, signature[:-4] + ("AAAA" if signature[-4:] != "AAAA" else "BBBB")])
+        for value in (forged, token(signing_key("key-1")[0], "key-1", 0)):
+            try:
+                await verifier.verify(value)
+                raise AssertionError("tampered token accepted")
+            except InvalidToken:
+                pass
+        await verifier.aclose()
+
+    print_table(f"Authenticating requests (stats: {verifier.stats()})", rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Token verification benchmark")
+    parser.add_argument("--remote-requests", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
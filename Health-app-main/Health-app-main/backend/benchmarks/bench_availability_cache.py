@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import latency_summary, print_table
+from src.utils.availability_cache import AvailabilityCache
+from src.utils.cache import MemoryCache
+from src.utils.scheduling import BookingIntervals, SlotEngine
+
+# Read-heavy /appointments/slots traffic with occasional bookings, against a
+# simulated appointments table with a fixed round-trip latency. Compares querying
+# on every read with the doctor-day availability cache, and checks that every
+# cached answer matches what the table holds at that moment.
+
+class FakeAppointments:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.rows = []
+        self.queries = 0
+
+    async def find_overlapping(self, doctor_ids, start, end):
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+        return self.snapshot(doctor_ids, start, end)
+
+    def snapshot(self, doctor_ids, start, end):
+        wanted = set(doctor_ids)
+        return [row for row in self.rows if row["doctor_id"] in wanted
+                and start - timedelta(minutes=120) <= row["start"] < end]
+
+def to_row(doctor_id, start, minutes):
+    return {"doctor_id": doctor_id, "start": start, "appointment_date": start.isoformat(),
+            "duration_minutes": minutes}
+
+def make_traffic(count, doctors, days, first_day, booking_share, rng):
+    traffic = []
+    for _ in range(count):
+        doctor_id = f"doctor-{rng.randrange(doctors)}"
+        day = first_day + timedelta(days=rng.randrange(days))
+        if rng.random() < booking_share:
+            start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(9 * 60, 17 * 60, 30))
+            traffic.append(("book", doctor_id, start, rng.choice((30, 60))))
+        else:
+            traffic.append(("slots", doctor_id, day, day + timedelta(days=rng.choice((0, 0, 6)))))
+    return traffic
+
+async def replay(traffic, table, cache, engine, check):
+    latencies = []
+    for kind, doctor_id, a, b in traffic:
+        if kind == "book":
+            table.rows.append(to_row(doctor_id, a, b))
+            if cache is not None:
+                await cache.invalidate(doctor_id, a, a + timedelta(minutes=b))
+            continue
+        started = time.perf_counter()
+        if cache is None:
+            rows = await table.find_overlapping([doctor_id], datetime.combine(a, datetime.min.time()),
+                                                datetime.combine(b + timedelta(days=1), datetime.min.time()))
+            bookings = BookingIntervals.from_appointments(rows)
+        else:
+            bookings = (await cache.bookings([doctor_id], a, b, table.find_overlapping))[doctor_id]
+        slots = engine.free_slots(doctor_id, bookings, a, b)
+        latencies.append(time.perf_counter() - started)
+        if check:
+            truth = BookingIntervals.from_appointments(table.snapshot(
+                [doctor_id], datetime.combine(a, datetime.min.time()),
+                datetime.combine(b + timedelta(days=1), datetime.min.time())))
+            assert slots == engine.free_slots(doctor_id, truth, a, b)
+    return latencies
+
+async def main_async(args):
+    rng = random.Random(14)
+    first_day = date(2030, 5, 6)
+    traffic = make_traffic(args.requests, args.doctors, args.days, first_day, args.booking_share, rng)
+    engine = SlotEngine()
+    rows = []
+    for name, cached in (("query every read", False), ("doctor-day cache", True)):
+        table = FakeAppointments(args.latency_ms / 1000)
+        cache = AvailabilityCache(MemoryCache(ttl=300, max_entries=50000)) if cached else None
+        latencies = await replay(traffic, table, cache, engine, check=cached)
+        row = {"strategy": name, "reads": len(latencies), "db_queries": table.queries,
+               **latency_summary(latencies), "hit_ratio": cache.stats()["hit_ratio"] if cached else "-"}
+        rows.append(row)
+    print_table(f"{args.requests} requests over {args.doctors} doctors x {args.days} days, "
+                f"{args.booking_share:.0%} bookings, {args.latency_ms} ms round trip", rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Doctor-day availability cache benchmark")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--booking-share", type=float, default=0.05)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from benchmarks.common import latency_summary, print_table
+from src.utils.booking import BookingLedger, SlotConflict
+from src.utils.scheduling import BookingIntervals, booking_interval
+
+# Concurrency stress test for POST /appointments. Hundreds of bookings for a
+# handful of doctors fire at once, many of them competing for the same slots.
+# The database is simulated in-process, with a round-trip latency and optionally
+# the `appointments_no_overlap` exclusion constraint. Each run counts the
+# overlapping pairs left in the table and reports booking latency.
+
+class FakeAppointmentsTable:
+    """In-memory appointments table; the constraint check is atomic with the insert"""
+
+    def __init__(self, latency: float, constraint: bool):
+        self.latency = latency
+        self.constraint = constraint
+        self.rows = []
+        self.round_trips = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+
+    async def find_overlapping(self, doctor_id, start, end):
+        await self._round_trip()
+        return [dict(row) for row in self.rows if row["doctor_id"] == doctor_id
+                and booking_interval(row)[0] < end and booking_interval(row)[1] > start]
+
+    async def insert(self, row):
+        await self._round_trip()
+        if self.constraint:
+            start, end = booking_interval(row)
+            bookings = BookingIntervals(booking_interval(r) for r in self.rows
+                                        if r["doctor_id"] == row["doctor_id"])
+            if bookings.overlaps(start, end):
+                raise SlotConflict("conflicting key value violates exclusion constraint")
+        self.rows.append(row)
+        return row
+
+    def double_bookings(self):
+        by_doctor = {}
+        for row in self.rows:
+            by_doctor.setdefault(row["doctor_id"], []).append(booking_interval(row))
+        overlaps = 0
+        for intervals in by_doctor.values():
+            intervals.sort()
+            for i, (start, end) in enumerate(intervals):
+                for other_start, _ in intervals[i + 1:]:
+                    if other_start >= end:
+                        break
+                    overlaps += 1
+        return overlaps
+
+def make_requests(count, doctors, rng):
+    day = datetime(2030, 3, 4, 9)
+    requests = []
+    for _ in range(count):
+        start = day + timedelta(minutes=15 * rng.randrange(32))
+        requests.append({"doctor_id": f"doctor-{rng.randrange(doctors)}",
+                         "appointment_date": start.isoformat(),
+                         "duration_minutes": rng.choice((15, 30, 45, 60))})
+    return requests
+
+async def check_then_insert(table, row):
+    """The previous create_appointment: availability query, then a separate insert"""
+    start, end = booking_interval(row)
+    if BookingIntervals.from_appointments(await table.find_overlapping(row["doctor_id"], start, end)).overlaps(start, end):
+        raise SlotConflict("Time slot not available")
+    return await table.insert(row)
+
+async def run(requests, table, book):
+    latencies, outcomes = [], {"booked": 0, "conflict": 0}
+
+    async def one(row):
+        started = time.perf_counter()
+        try:
+            await book(row)
+            outcomes["booked"] += 1
+        except SlotConflict:
+            outcomes["conflict"] += 1
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(dict(row)) for row in requests))
+    return latencies, outcomes
+
+async def scenario(name, requests, latency, constraint, workers):
+    table = FakeAppointmentsTable(latency, constraint)
+    if workers == 0:
+        latencies, outcomes = await run(requests, table, lambda row: check_then_insert(table, row))
+    else:
+        # Each request lands on one of several workers, each with its own ledger
+        ledgers = [BookingLedger() for _ in range(workers)]
+
+        def book(row):
+            start, end = booking_interval(row)
+            ledger = ledgers[zlib.crc32(row["appointment_date"].encode()) % workers]
+            return ledger.reserve(row["doctor_id"], start, end, row,
+                                  load=table.find_overlapping, insert=table.insert)
+
+        latencies, outcomes = await run(requests, table, book)
+    return {"strategy": name, **outcomes, "double_bookings": table.double_bookings(),
+            "round_trips": table.round_trips, **latency_summary(latencies)}
+
+async def main_async(args):
+    rng = random.Random(13)
+    requests = make_requests(args.requests, args.doctors, rng)
+    latency = args.latency_ms / 1000
+    rows = [
+        await scenario("check then insert (old)", requests, latency, constraint=False, workers=0),
+        await scenario("ledger, 1 worker", requests, latency, constraint=False, workers=1),
+        await scenario(f"ledger + constraint, {args.workers} workers", requests, latency,
+                       constraint=True, workers=args.workers),
+    ]
+    print_table(f"{args.requests} simultaneous bookings, {args.doctors} doctors, "
+                f"{args.latency_ms} ms database round trip", rows)
+    for row in rows[1:]:
+        assert row["double_bookings"] == 0, row
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent appointment booking stress test")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--doctors", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.common import latency_summary, print_table
+from src.models.doctor import Doctor
+from src.repositories.doctors import get_doctor_repository
+from src.routers import doctors
+from src.utils.doctor_directory import DoctorDirectory
+
+# Cost of serving the doctor directory. The real /doctors router runs in process
+# over an in-memory `doctors` table whose reads take a simulated database round
+# trip. "table read" is the old /doctors/locations: the whole table read and
+# validated on every call. The directory loads the table once and serves the
+# listing as stored bytes (or a 304 for a client that already has it). After a
+# profile write only that doctor's entry is re-encoded. Finally a write lands
+# while a TTL reload is reading an older snapshot; it must survive the reload.
+
+SPECIALTIES = ["Cardiology", "Pediatrics", "Orthopedics", "Dermatology", "Neurology", "Oncology",
+               "Gastroenterology", "Endocrinology", "Urology", "Rheumatology", "Psychiatry", "Radiology"]
+
+class FakeDoctors:
+    def __init__(self, rows, latency):
+        self.rows = rows
+        self.latency = latency
+        self.reads = 0
+        self.gate = None
+
+    async def list_all(self):
+        self.reads += 1
+        snapshot = [dict(row) for row in self.rows]
+        await asyncio.sleep(self.latency)
+        if self.gate is not None:
+            await self.gate.wait()
+        return snapshot
+
+def build(count, rng):
+    return [{"id": f"doctor-{i}", "name": f"Dr. {rng.choice('ABCDEFGHJK')}. Doctor {i}",
+             "specialty": rng.choice(SPECIALTIES), "latitude": rng.uniform(8, 35),
+             "longitude": rng.uniform(68, 97)} for i in range(count)]
+
+async def timed(http, path, repeat, headers=None):
+    latencies, response = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await http.get(path, headers=headers or {})
+        latencies.append(time.perf_counter() - started)
+    return response, latencies
+
+async def main_async(args):
+    rng = random.Random(24)
+    repository = FakeDoctors(build(args.doctors, rng), args.latency_ms / 1000)
+    directory = DoctorDirectory()
+    doctors.doctor_directory = directory  # a fresh directory, so earlier imports do not share state
+    app = FastAPI()
+    app.include_router(doctors.router)
+    app.dependency_overrides[get_doctor_repository] = lambda: repository
+
+    @app.get("/table-read", response_model=List[Doctor])
+    async def table_read():
+        return await repository.list_all()
+
+    rows = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as http:
+        reads = repository.reads
+        response, latencies = await timed(http, "/table-read", args.repeat)
+        old = response.json()
+        rows.append({"listing": "table read per request", "requests": args.repeat,
+                     "db_reads": repository.reads - reads, "kb": round(len(response.content) / 1024),
+                     **latency_summary(latencies)})
+
+        reads = repository.reads
+        started = time.perf_counter()
+        response = await http.get("/doctors/locations")
+        first = time.perf_counter() - started
+        assert response.json() == old
+        response, latencies = await timed(http, "/doctors/locations", args.repeat)
+        rows.append({"listing": f"directory (first load {first * 1000:.0f} ms)", "requests": args.repeat + 1,
+                     "db_reads": repository.reads - reads, "kb": round(len(response.content) / 1024),
+                     **latency_summary(latencies)})
+
+        etag = response.headers["etag"]
+        response, latencies = await timed(http, "/doctors/locations", args.repeat, {"If-None-Match": etag})
+        assert response.status_code == 304
+        rows.append({"listing": "directory, client has it (304)", "requests": args.repeat, "db_reads": 0,
+                     "kb": 0, **latency_summary(latencies)})
+
+        # One profile write between reads: the doctor is re-encoded and the listing re-joined
+        latencies = []
+        for i in range(args.repeat):
+            doctor = dict(repository.rows[rng.randrange(args.doctors)], specialty=rng.choice(SPECIALTIES))
+            directory.upsert(doctor)
+            started = time.perf_counter()
+            response = await http.get("/doctors/locations")
+            latencies.append(time.perf_counter() - started)
+        assert response.headers["etag"] != etag
+        rows.append({"listing": "directory after each write", "requests": args.repeat, "db_reads": 0,
+                     "kb": round(len(response.content) / 1024), **latency_summary(latencies)})
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            directory.by_specialty("cardiology")
+        per_lookup = (time.perf_counter() - started) / args.repeat
+        response = await http.get("/doctors/nearby", params={"latitude": 20, "longitude": 80, "radius": 50})
+        assert response.status_code in (200, 404)
+
+    # A write made while a TTL reload reads an older snapshot survives the swap
+    repository.gate = asyncio.Event()
+    reload = asyncio.create_task(directory._reload(repository.list_all))
+    await asyncio.sleep(repository.latency * 2)
+    moved = dict(directory.get("doctor-0"), latitude=1.0, longitude=1.0, specialty="Genetics")
+    directory.upsert(moved)
+    repository.gate.set()
+    await reload
+    assert directory.get("doctor-0") == moved and directory.by_specialty("genetics") == [moved]
+
+    print_table(f"{args.doctors} doctors, {args.latency_ms:g} ms database round trip "
+                f"(by_specialty lookup {per_lookup * 1e6:.0f} us; stats: {directory.stats()})", rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Doctor directory benchmark")
+    parser.add_argument("--doctors", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import random
+import time
+
+from benchmarks.common import latency_summary, print_table
+from src.utils.geo_index import GeoGridIndex, haversine_km
+
+# Radius search over 100k doctors: the grid index behind /doctors/nearby
+# versus scanning every doctor (what a full-table fetch amounts to).
+# Doctors are clustered around cities, like real practices.
+
+CITIES = [(28.61, 77.21), (19.08, 72.88), (12.97, 77.59), (13.08, 80.27), (22.57, 88.36),
+          (17.39, 78.49), (30.32, 78.03), (26.91, 75.79), (23.02, 72.57), (18.52, 73.86)]
+
+def make_doctors(count: int, rng: random.Random):
+    doctors = []
+    for i in range(count):
+        if i % 5 == 0:
+            # A fifth are spread across the country
+            lat, lon = rng.uniform(8, 35), rng.uniform(68, 97)
+        else:
+            city_lat, city_lon = rng.choice(CITIES)
+            lat, lon = rng.gauss(city_lat, 0.3), rng.gauss(city_lon, 0.3)
+        doctors.append({"id": str(i), "name": f"Dr. {i}", "specialty": "Cardiology",
+                        "latitude": lat, "longitude": lon})
+    return doctors
+
+def brute_force(doctors, latitude, longitude, radius, limit):
+    found = [(haversine_km(latitude, longitude, d["latitude"], d["longitude"]), d) for d in doctors]
+    found = [item for item in found if item[0] <= radius]
+    found.sort(key=lambda item: item[0])
+    return found[:limit]
+
+def time_queries(search, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        search(*query)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Doctor radius search benchmark")
+    parser.add_argument("--doctors", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--radius", type=float, default=5.0, help="Search radius in km")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    doctors = make_doctors(args.doctors, rng)
+    index = GeoGridIndex()
+    started = time.perf_counter()
+    index.load(doctors)
+    build_s = time.perf_counter() - started
+
+    queries = []
+    for _ in range(args.queries):
+        lat, lon = rng.choice(CITIES)
+        queries.append((rng.gauss(lat, 0.2), rng.gauss(lon, 0.2), args.radius, args.limit))
+
+    # Sanity check: both approaches agree on the nearest doctors
+    for query in queries[:20]:
+        expected = [d["id"] for _, d in brute_force(doctors, *query)]
+        assert [d["id"] for _, d in index.nearby(*query)] == expected
+
+    indexed = time_queries(index.nearby, queries)
+    scanned = time_queries(lambda *q: brute_force(doctors, *q), queries[:50])
+
+    print_table(f"{args.doctors} doctors, {args.radius} km radius, limit {args.limit} "
+                f"(index built in {build_s * 1000:.0f} ms)", [
+        {"search": "full scan", "queries": len(scanned), **latency_summary(scanned)},
+        {"search": "grid index", "queries": len(indexed), **latency_summary(indexed)},
+    ])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import random
+import time
+
+from benchmarks.bench_doctor_geo import CITIES
+from benchmarks.common import latency_summary, print_table
+from src.utils.doctor_directory import DoctorDirectory
+from src.utils.doctor_search import facet_values, tokenize
+from src.utils.geo_index import haversine_km
+
+# /doctors/search over 100k doctors: the directory's inverted index versus
+# filtering every doctor, as the frontend does after fetching the full list.
+# Each query kind is run against both and the pages must be identical. Typeahead
+# types a clinic name one letter at a time. Profile updates are applied between
+# queries and must be visible to the next search.
+
+FIRST = ["Aarav", "Aditi", "Amit", "Ananya", "Arjun", "Deepa", "Farhan", "Ishaan", "Kavya", "Meera", "Neha",
+         "Nikhil", "Pooja", "Priya", "Rahul", "Riya", "Rohan", "Sanjay", "Sneha", "Vikram", "Zoya"]
+LAST = ["Agarwal", "Bose", "Chopra", "Das", "Gupta", "Iyer", "Joshi", "Kapoor", "Khan", "Menon", "Mehta",
+        "Nair", "Patel", "Rao", "Reddy", "Shah", "Sharma", "Singh", "Verma"]
+SPECIALTIES = ["Cardiology", "Pediatrics", "Orthopedics", "Dermatology", "Neurology", "Oncology", "Psychiatry",
+               "Gastroenterology", "Endocrinology", "Urology", "Rheumatology", "Radiology", "Nephrology",
+               "Pulmonology", "Ophthalmology", "ENT", "General Surgery", "Family Medicine", "Gynecology"]
+LANGUAGES = ["English", "Hindi", "Bengali", "Tamil", "Telugu", "Marathi", "Gujarati", "Kannada", "Malayalam",
+             "Punjabi", "Urdu", "Odia"]
+DEGREES = ["MBBS", "MD", "MS", "DM", "MCh", "DNB", "FRCS", "MRCP", "DCH", "DGO"]
+CLINIC_WORDS = ["Apollo", "Fortis", "Lotus", "Sunrise", "Lifeline", "CarePoint", "Medanta", "Harmony", "Wellspring",
+                "Cityview", "Greenfield", "Riverside", "Starlight", "Unity", "Zenith"]
+
+def make_doctors(count, rng):
+    clinics = [f"{word} {kind} {n}" for word in CLINIC_WORDS for kind in ("Hospital", "Clinic", "Medical Centre")
+               for n in range(1, 41)]
+    doctors = []
+    for i in range(count):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        lat, lon = rng.choice(CITIES)
+        doctors.append({"id": f"doctor-{i}", "name": f"Dr. {first} {last}", "firstName": first, "lastName": last,
+                        "specialty": rng.choice(SPECIALTIES),
+                        "languages": ", ".join(["English"] + rng.sample(LANGUAGES[1:], rng.randint(0, 2))),
+                        "qualifications": " ".join(rng.sample(DEGREES, rng.randint(1, 3))),
+                        "clinicAffiliation": rng.choice(clinics),
+                        "latitude": rng.gauss(lat, 0.3), "longitude": rng.gauss(lon, 0.3)})
+    return doctors
+
+def name_key(doctor):
+    return str(doctor["name"]).casefold(), doctor["id"]
+
+def scan(doctors, q=None, limit=20, offset=0, latitude=None, longitude=None, radius_km=None, **filters):
+    """Client-side filtering over the full list, with the same matching rules"""
+    prefixes = tokenize(q)
+    facets = {"specialty": "specialty", "language": "languages", "clinic": "clinicAffiliation"}
+    found = []
+    for doctor in doctors:
+        tokens = [token for field in ("name", "firstName", "lastName", "specialty", "languages", "qualifications",
+                                      "clinicAffiliation") for token in tokenize(doctor.get(field))]
+        if not all(any(token.startswith(prefix) for token in tokens) for prefix in prefixes):
+            continue
+        if any(value and value.casefold() not in facet_values(facets[facet], doctor.get(facets[facet]))
+               for facet, value in filters.items()):
+            continue
+        distance = None
+        if latitude is not None:
+            distance = haversine_km(latitude, longitude, doctor["latitude"], doctor["longitude"])
+            if distance > radius_km:
+                continue
+        found.append((distance, doctor))
+    found.sort(key=lambda item: (item[0] or 0, name_key(item[1])))
+    return found[offset:offset + limit], len(found) > offset + limit
+
+def run(search, queries):
+    latencies, pages = [], []
+    for kwargs in queries:
+        started = time.perf_counter()
+        pages.append(search(**kwargs))
+        latencies.append(time.perf_counter() - started)
+    return latencies, pages
+
+def same(page, expected):
+    (items, more), (expected_items, expected_more) = page, expected
+    return more == expected_more and [(None if d is None else round(d, 6), doctor["id"]) for d, doctor in items] == \
+        [(None if d is None else round(d, 6), doctor["id"]) for d, doctor in expected_items]
+
+def main():
+    parser = argparse.ArgumentParser(description="Doctor search benchmark")
+    parser.add_argument("--doctors", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--scan-queries", type=int, default=5, help="Full scans per kind (they are slow)")
+    args = parser.parse_args()
+
+    rng = random.Random(25)
+    doctors = make_doctors(args.doctors, rng)
+    directory = DoctorDirectory()
+    started = time.perf_counter()
+    directory.load(doctors)
+    build_s = time.perf_counter() - started
+
+    def typeahead():
+        clinic = rng.choice(doctors)["clinicAffiliation"].split()[0].casefold()
+        return {"q": clinic[:rng.randint(1, len(clinic))]}
+
+    def near():
+        lat, lon = rng.choice(CITIES)
+        return {"latitude": rng.gauss(lat, 0.2), "longitude": rng.gauss(lon, 0.2), "radius_km": 10.0}
+
+    kinds = {
+        "typeahead (1 prefix)": typeahead,
+        "name prefix + word": lambda: {"q": f"{rng.choice(FIRST)[:3]} {rng.choice(LAST)}"},
+        "specialty + language": lambda: {"specialty": rng.choice(SPECIALTIES), "language": rng.choice(LANGUAGES)},
+        "prefix + language filter": lambda: {"q": rng.choice(SPECIALTIES)[:4], "language": rng.choice(LANGUAGES[1:])},
+        "broad prefix, page 5": lambda: {"q": rng.choice("aeimrs"), "offset": 80},
+        "words + 10 km radius": lambda: {"q": rng.choice(SPECIALTIES)[:5], **near()},
+        "filter + 10 km radius": lambda: {"specialty": rng.choice(SPECIALTIES), **near()},
+    }
+
+    rows = []
+    for kind, make in kinds.items():
+        queries = [make() for _ in range(args.queries)]
+        latencies, pages = run(directory.search, queries)
+        scan_latencies, expected = run(lambda **kwargs: scan(doctors, **kwargs), queries[:args.scan_queries])
+        assert all(same(page, want) for page, want in zip(pages, expected)), kind
+        rows.append({"query": kind, "index_p50_us": round(sorted(latencies)[len(latencies) // 2] * 1e6),
+                     **{f"index_{key}": value for key, value in latency_summary(latencies).items()
+                        if key in ("p99_ms", "max_ms")},
+                     "scan_p50_ms": round(sorted(scan_latencies)[len(scan_latencies) // 2] * 1000, 1),
+                     "results": sum(len(items) for items, _ in pages) // len(pages)})
+
+    # Profile updates between searches: each must be found by its new clinic right away
+    update_latencies = []
+    for i in range(args.queries):
+        doctor = dict(rng.choice(doctors), clinicAffiliation=f"Newhope Annex {i}")
+        started = time.perf_counter()
+        directory.upsert(doctor)
+        update_latencies.append(time.perf_counter() - started)
+        items, _ = directory.search(q=f"newhope annex {i}")
+        assert doctor["id"] in [found["id"] for _, found in items]
+    rows.append({"query": "profile update (upsert)", "index_p50_us":
+                 round(sorted(update_latencies)[len(update_latencies) // 2] * 1e6),
+                 **{f"index_{key}": value for key, value in latency_summary(update_latencies).items()
+                    if key in ("p99_ms", "max_ms")}, "scan_p50_ms": "-", "results": "-"})
+
+    print_table(f"{args.doctors} doctors, index built in {build_s:.1f} s "
+                f"({directory.text.stats()['tokens']} tokens), pages of 20", rows)
+
+if __name__ == "__main__":
+    main()
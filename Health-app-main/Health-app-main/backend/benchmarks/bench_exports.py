@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import bisect
+import json
+import time
+import tracemalloc
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from fastapi import FastAPI
+
+from benchmarks.common import print_table
+from src.repositories.appointments import get_appointment_repository
+from src.routers import appointment
+from src.utils.auth import get_current_user_id
+
+# Cost of pulling a user's full appointment history. The real /appointments router
+# runs in process over an in-memory repository kept in (created_at, id) order, like
+# the keyset index. "list endpoint" is GET /appointments/, which builds and validates
+# the whole history before sending it. The exports stream NDJSON or CSV a page at a
+# time, optionally gzipped. Requests are driven straight through the ASGI app and
+# the client side counts bytes as they arrive, so peak memory is the server's.
+# Finally a download is cut midway and resumed from the last id received;
+# together the two parts must hold every row exactly once.
+
+class FakeAppointments:
+    def __init__(self, rows):
+        self.rows = rows
+        self.keys = [(row["created_at"], row["id"]) for row in rows]
+        self.queries = 0
+
+    async def list_for_patient(self, patient_id):
+        self.queries += 1
+        return [dict(row) for row in reversed(self.rows)]
+
+    async def page_for_user(self, user_id, limit, after=None):
+        self.queries += 1
+        start = bisect.bisect_right(self.keys, after) if after is not None else 0
+        return [dict(row) for row in self.rows[start:start + limit]]
+
+    async def resume_cursor(self, row_id, column):
+        row = next(row for row in self.rows if row["id"] == row_id)
+        return row[column], row["id"]
+
+def build(count):
+    started = datetime(2020, 1, 1)
+    return [{"id": str(uuid.UUID(int=i + 1)), "patient_id": "user-1", "doctor_id": str(uuid.UUID(int=10 ** 9 + i % 40)),
+             "appointment_date": (started + timedelta(hours=i)).isoformat(), "appointment_type": "follow_up",
+             "duration_minutes": 30,
+             "status": "completed", "reason": f"Follow-up visit {i}", "notes": "Blood pressure normal, continue treatment",
+             "created_at": (started + timedelta(minutes=i)).isoformat(),
+             "updated_at": (started + timedelta(minutes=i)).isoformat()} for i in range(count)]
+
+class Disconnect(Exception):
+    pass
+
+async def call(app, path, params, headers, on_body):
+    """Run one GET through the ASGI app, handing each body chunk to `on_body` as it is sent.
+
+    httpx's ASGITransport collects the whole body before returning, which would hide
+    both the time to first byte and the memory a streamed response saves.
+    """
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": urlencode(params).encode(), "server": ("bench", 80), "client": ("127.0.0.1", 1),
+             "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()]}
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body" and message.get("body"):
+            on_body(message["body"])
+
+    try:
+        await app(scope, receive, send)
+    except Disconnect:
+        pass
+
+async def download(app, params, headers, stop_after=None):
+    """(rows, last id, wire bytes, seconds to first byte, total seconds)"""
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if headers.get("Accept-Encoding") == "gzip" else None
+    state = {"rows": 0, "last_id": None, "wire": 0, "first_byte": None, "tail": b""}
+    started = time.perf_counter()
+
+    def on_body(chunk):
+        state["first_byte"] = state["first_byte"] or time.perf_counter() - started
+        state["wire"] += len(chunk)
+        lines = (state["tail"] + (decoder.decompress(chunk) if decoder else chunk)).split(b"\n")
+        state["tail"] = lines.pop()
+        if stop_after is not None:
+            lines = lines[:stop_after - state["rows"]]
+        state["rows"] += len(lines)
+        if lines and lines[-1].startswith(b"{"):
+            state["last_id"] = json.loads(lines[-1])["id"]
+        if stop_after is not None and state["rows"] >= stop_after:
+            raise Disconnect()
+
+    await call(app, "/appointments/export", params, headers, on_body)
+    return state["rows"], state["last_id"], state["wire"], state["first_byte"], time.perf_counter() - started
+
+async def peak_mb(run) -> float:
+    """Peak traced memory of a second run; tracing slows allocation-heavy code, so it is not timed"""
+    tracemalloc.start()
+    await run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+async def main_async(args):
+    repository = FakeAppointments(build(args.appointments))
+    app = FastAPI()
+    app.include_router(appointment.router)
+    app.dependency_overrides[get_appointment_repository] = lambda: repository
+    app.dependency_overrides[get_current_user_id] = lambda: "user-1"
+
+    # Old behaviour: the whole history as one validated JSON list
+    body = []
+    started = time.perf_counter()
+    await call(app, "/appointments/", {}, {}, body.append)
+    elapsed = time.perf_counter() - started
+    body = b"".join(body)
+    rows = [{"download": "list endpoint (JSON array)", "rows": len(json.loads(body)),
+             "wire_kb": round(len(body) / 1024), "first_byte_ms": round(elapsed * 1000),
+             "total_ms": round(elapsed * 1000),
+             "server_peak_mb": round(await peak_mb(lambda: call(app, "/appointments/", {}, {}, lambda chunk: None)))}]
+    del body
+
+    for label, fmt, encoding in (("export ndjson", "ndjson", "identity"), ("export csv", "csv", "identity"),
+                                 ("export ndjson + gzip", "ndjson", "gzip"), ("export csv + gzip", "csv", "gzip")):
+        params, headers = {"format": fmt}, {"Accept-Encoding": encoding}
+        count, _, wire, first_byte, elapsed = await download(app, params, headers)
+        peak = await peak_mb(lambda: download(app, params, headers))
+        # CSV counts its header line
+        assert count == args.appointments + (fmt == "csv"), count
+        rows.append({"download": label, "rows": args.appointments, "wire_kb": round(wire / 1024),
+                     "first_byte_ms": round(first_byte * 1000, 1), "total_ms": round(elapsed * 1000),
+                     "server_peak_mb": round(peak)})
+
+    # Cut the download midway, then resume after the last id received
+    first, last_id, *_ = await download(app, {}, {"Accept-Encoding": "gzip"}, stop_after=args.appointments // 2)
+    resumed = []
+
+    def collect(chunk):
+        resumed.append(chunk)
+
+    await call(app, "/appointments/export", {"after": last_id}, {}, collect)
+    resumed = [json.loads(line)["id"] for line in b"".join(resumed).splitlines()]
+    expected = [row["id"] for row in repository.rows]
+    assert expected.index(last_id) + 1 == first and resumed == expected[first:]
+    rows.append({"download": f"cut at {first} rows, resumed", "rows": first + len(resumed),
+                 "wire_kb": "-", "first_byte_ms": "-", "total_ms": "-", "server_peak_mb": "-"})
+
+    print_table(f"Full history of {args.appointments} appointments "
+                f"(export pages of {appointment.config.EXPORT_PAGE_SIZE})", rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk export benchmark")
+    parser.add_argument("--appointments", type=int, default=100000)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import httpx
+import numpy as np
+from fastapi import Header
+
+from benchmarks.common import FAKE_SUPABASE_KEY, MockHTTPServer, latency_summary, print_table
+
+# Load test for POST /wearable/ingest. Several simulated devices push batches
+# of heart-rate samples in each supported body format; samples are buffered
+# and flushed to a mock PostgREST server in batched inserts. Throughput is
+# measured end to end, i.e. until every sample has been written.
+
+def device_user(device: int) -> str:
+    return str(uuid.UUID(int=device + 1))
+
+async def bench_user(x_bench_user: str = Header(...)) -> str:
+    # Stands in for token verification: each simulated device pushes as its own user
+    return x_bench_user
+
+def make_batch(device: int, request: int, samples: int):
+    start_ms = 1_704_067_200_000 + (device * 1000 + request) * samples * 1000
+    timestamps = start_ms + np.arange(samples, dtype=np.int64) * 1000
+    values = (70 + 10 * np.random.default_rng(request).standard_normal(samples)).round(1)
+    return device_user(device), timestamps, values
+
+def ndjson_body(user_id, timestamps, values) -> bytes:
+    iso = np.datetime_as_string(timestamps.astype("datetime64[ms]"), unit="ms", timezone="UTC").tolist()
+    return "".join(
+        json.dumps({"user_id": user_id, "metric": "heart_rate", "timestamp": t, "value": v, "unit": "bpm"}) + "\n"
+        for t, v in zip(iso, values.tolist())
+    ).encode()
+
+def columnar_body(user_id, timestamps, values) -> bytes:
+    return json.dumps({"user_id": user_id, "metric": "heart_rate", "unit": "bpm",
+                       "timestamps": timestamps.tolist(), "values": values.tolist()}).encode() + b"\n"
+
+def binary_body(user_id, timestamps, values) -> bytes:
+    from src.models.timeseries import WearableSeries
+    from src.utils.ingest import encode_frame
+    return encode_frame(user_id, "heart_rate", WearableSeries(timestamps, values, "bpm"))
+
+FORMATS = (
+    ("NDJSON, one sample per line", "application/x-ndjson", ndjson_body),
+    ("NDJSON, columnar batches", "application/x-ndjson", columnar_body),
+    ("binary frames", "application/octet-stream", binary_body),
+)
+
+async def run_format(app, ingest_buffer, content_type, encode, args):
+    bodies = [[encode(*make_batch(d, r, args.samples)) for r in range(args.requests)]
+              for d in range(args.devices)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+
+        async def device(index):
+            for body in bodies[index]:
+                sent = time.perf_counter()
+                response = await client.post("/wearable/ingest", content=body,
+                                             headers={"Content-Type": content_type,
+                                                      "X-Bench-User": device_user(index)})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - sent)
+
+        flushed_before = ingest_buffer.flushed
+        started = time.perf_counter()
+        await asyncio.gather(*(device(i) for i in range(args.devices)))
+        await ingest_buffer.flush()
+        elapsed = time.perf_counter() - started
+        return ingest_buffer.flushed - flushed_before, elapsed, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Wearable ingest load test")
+    parser.add_argument("--devices", type=int, default=20, help="Concurrent pushing devices")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per device")
+    parser.add_argument("--samples", type=int, default=1000, help="Samples per request")
+    args = parser.parse_args()
+
+    with MockHTTPServer() as server:
+        os.environ["SUPABASE_URL"] = server.url
+        os.environ["SUPABASE_KEY"] = FAKE_SUPABASE_KEY
+        from main import app
+        from src.utils.auth import get_current_user_id
+        from src.utils.ingest import ingest_buffer
+        from src.utils.supabase_client import registry
+
+        app.dependency_overrides[get_current_user_id] = bench_user
+
+        async def run_all():
+            rows = []
+            for label, content_type, encode in FORMATS:
+                inserts_before = server.request_count
+                written, elapsed, latencies = await run_format(app, ingest_buffer, content_type, encode, args)
+                rows.append({
+                    "format": label,
+                    "samples": written,
+                    "inserts": server.request_count - inserts_before,
+                    "samples_per_s": round(written / elapsed),
+                    **latency_summary(latencies),
+                })
+            await ingest_buffer.close()
+            await registry.aclose()
+            return rows
+
+        rows = asyncio.run(run_all())
+
+    print_table(f"{args.devices} devices x {args.requests} requests x {args.samples} samples, one worker", rows)
+
+if __name__ == "__main__":
+    main()
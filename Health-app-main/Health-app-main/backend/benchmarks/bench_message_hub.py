@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+import resource
+import time
+
+import httpx
+import uvicorn
+import websockets
+from fastapi import FastAPI
+
+from benchmarks.common import latency_summary, print_table
+from src.repositories.messaging import get_conversation_repository, get_message_repository
+from src.routers import messaging
+from src.utils.auth import get_current_user_id
+from src.utils.message_hub import message_hub
+
+# WebSocket fan-out under load. A real uvicorn server runs the messaging router
+# with in-memory repositories. Thousands of sockets connect: most sit idle on
+# their own conversation, while a smaller set share a few busy conversations.
+# Messages are sent through POST /messaging/messages. The benchmark reports
+# send-to-receive latency across every socket that should get each message.
+
+class FakeConversations:
+    async def get(self, conversation_id, columns="*"):
+        return {"id": conversation_id, "patient_id": "patient", "doctor_id": "doctor"}
+
+class BenchVerifier:
+    """Accepts any token as the user it names, standing in for JWT verification"""
+
+    async def verify(self, token):
+        return {"sub": token}
+
+class FakeMessages:
+    async def insert(self, row):
+        return [dict(row, sent_at=time.time())]
+
+def make_app():
+    app = FastAPI()
+    app.include_router(messaging.router)
+    app.dependency_overrides[get_conversation_repository] = FakeConversations
+    app.dependency_overrides[get_message_repository] = FakeMessages
+    app.dependency_overrides[get_current_user_id] = lambda: "patient"
+    messaging.token_verifier = BenchVerifier()
+    return app
+
+async def start_server():
+    server = uvicorn.Server(uvicorn.Config(make_app(), host="127.0.0.1", port=0, log_level="error",
+                                           ws="websockets", ws_ping_interval=None, backlog=4096))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, port
+
+async def open_sockets(port, conversation_ids, batch=200):
+    sockets = []
+    for start in range(0, len(conversation_ids), batch):
+        sockets.extend(await asyncio.gather(*(
+            websockets.connect(f"ws://127.0.0.1:{port}/messaging/ws/{conversation_id}?token=patient",
+                               ping_interval=None, max_queue=None)
+            for conversation_id in conversation_ids[start:start + batch]
+        )))
+    return sockets
+
+async def main_async(args):
+    server, task, port = await start_server()
+    idle_ids = [f"idle-{i}" for i in range(args.idle)]
+    active_conversations = [f"busy-{i}" for i in range(args.conversations)]
+    active_ids = [active_conversations[i % args.conversations] for i in range(args.active)]
+
+    started = time.perf_counter()
+    idle = await open_sockets(port, idle_ids)
+    active = await open_sockets(port, active_ids)
+    connect_s = time.perf_counter() - started
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    latencies = []
+    per_conversation = {c: len(range(i, args.messages, args.conversations)) for i, c in enumerate(active_conversations)}
+    expected = sum(per_conversation[c] for c in active_ids)
+
+    async def receive(socket, count):
+        async for text in socket:
+            sent = float(json.loads(text)["message"]["content"])
+            latencies.append(time.perf_counter() - sent)
+            count -= 1
+            if not count:
+                return
+
+    receivers = [asyncio.create_task(receive(socket, per_conversation[c])) for socket, c in zip(active, active_ids)]
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}",
+                                 limits=httpx.Limits(max_connections=50)) as client:
+        semaphore = asyncio.Semaphore(50)
+
+        async def send(i):
+            async with semaphore:
+                await client.post("/messaging/messages", json={
+                    "conversation_id": active_conversations[i % args.conversations],
+                    "content": repr(time.perf_counter()),
+                })
+
+        send_started = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(args.messages)))
+        try:
+            await asyncio.wait_for(asyncio.gather(*receivers, return_exceptions=True), 30)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - send_started
+
+    stats = message_hub.stats()
+    print_table(f"{args.idle} idle + {args.active} active sockets over {args.conversations} busy conversations "
+                f"(connected in {connect_s:.1f} s, process RSS {rss_mb:.0f} MB incl. clients)", [{
+        "sockets": stats["sockets"],
+        "messages": args.messages,
+        "deliveries": len(latencies),
+        "expected": expected,
+        "deliveries_per_s": round(len(latencies) / elapsed),
+        **latency_summary(latencies),
+        "overflows": stats["overflows"],
+    }])
+
+    for socket in idle + active:
+        await socket.close()
+    server.should_exit = True
+    await task
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket message hub benchmark")
+    parser.add_argument("--idle", type=int, default=3000)
+    parser.add_argument("--active", type=int, default=500)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=1000)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import latency_summary, print_table
+from src.utils.outbox import PATIENT_NAME, MemoryQueue, NotificationOutbox
+
+# Cost of the "new appointment" notification on the booking path. Inline: a
+# `users` select for the patient name and a `notifications` insert before the
+# response, as create_appointment used to do. Outbox: the handler only queues an
+# event; a dispatcher resolves names and inserts in batches. The simulated
+# database fails a share of the writes, so the retry path runs as well. Every
+# event must be delivered exactly once.
+
+class FakeDatabase:
+    def __init__(self, latency: float, failure_rate: float, rng: random.Random):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.round_trips = 0
+        self.notifications = {}
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    async def names(self, user_ids):
+        await self._round_trip()
+        return {user_id: f"Patient {user_id}" for user_id in user_ids}
+
+    async def insert(self, rows):
+        await self._round_trip()
+        if self.rng.random() < self.failure_rate:
+            raise RuntimeError("simulated database error")
+        for row in rows:
+            self.notifications.setdefault(row["id"], row)
+
+async def booking_burst(bookings, concurrency, handler):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(i)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(bookings)))
+    return latencies
+
+async def main_async(args):
+    latency = args.latency_ms / 1000
+    rows = []
+
+    database = FakeDatabase(latency, 0.0, random.Random(16))
+
+    async def inline(i):
+        name = (await database.names([str(i)])).get(str(i), "A patient")
+        await database.insert([{"id": f"inline-{i}", "user_id": "doctor-1",
+                                "message": f"{name} has booked an appointment with you."}])
+
+    latencies = await booking_burst(args.bookings, args.concurrency, inline)
+    rows.append({"notifications": "inline", "delivered": len(database.notifications),
+                 "db_round_trips": database.round_trips, **latency_summary(latencies),
+                 "dispatch_p99_ms": "-"})
+
+    database = FakeDatabase(latency, args.failure_rate, random.Random(16))
+    outbox = NotificationOutbox(MemoryQueue(), sink=database.insert, resolve_names=database.names,
+                                flush_interval=0.05, retry_delay=0.01, max_attempts=50)
+
+    async def queued(i):
+        await outbox.publish([outbox.event("doctor-1", "New Appointment Booked",
+                                           f"{PATIENT_NAME} has booked an appointment with you.",
+                                           patient_id=str(i))])
+
+    latencies = await booking_burst(args.bookings, args.concurrency, queued)
+    while len(database.notifications) < args.bookings:
+        await asyncio.sleep(0.01)
+    await outbox.close()
+    stats = outbox.stats()
+    assert len(database.notifications) == args.bookings and stats["dropped"] == 0
+    rows.append({"notifications": f"outbox ({args.failure_rate:.0%} write failures)",
+                 "delivered": len(database.notifications), "db_round_trips": database.round_trips,
+                 **latency_summary(latencies), "dispatch_p99_ms": stats["dispatch_p99_ms"]})
+
+    print_table(f"{args.bookings} bookings, {args.concurrency} concurrent, "
+                f"{args.latency_ms} ms database round trip (handler latency of the notification step)", rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification outbox benchmark")
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
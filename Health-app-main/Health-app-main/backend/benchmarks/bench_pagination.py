@@ -0,0 +1,94 @@
+import argparse
+import json
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import latency_summary, print_table
+from src.utils.pagination import decode_cursor, page
+
+# Cost of reading a long chat history. An in-memory SQLite table stands in for
+# `messages`, with the same (conversation_id, sent_at, id) index as the README.
+# Three strategies are compared: the old "whole conversation" read, OFFSET pages,
+# and keyset pages driven by the real cursors of src/utils/pagination.py. Each is
+# timed at several depths into the history. Many messages share a timestamp, so
+# the id tie-break is exercised too. Every keyset walk must see each message
+# exactly once.
+
+def build(conn, messages):
+    conn.execute("create table messages (id text primary key, conversation_id text, content text, sent_at text)")
+    conn.execute("create index messages_conversation_keyset on messages (conversation_id, sent_at, id)")
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [(str(uuid.UUID(int=i + 1)), "long", f"message {i}", (start + timedelta(seconds=i // 4)).isoformat())
+            for i in range(messages)]
+    conn.executemany("insert into messages values (?, ?, ?, ?)", rows)
+    conn.execute("insert into messages values (?, 'short', 'hello', ?)", (str(uuid.uuid4()), start.isoformat()))
+
+def fetch(conn, sql, params):
+    cursor = conn.execute(sql, params)
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+def keyset_page(conn, limit, before=None):
+    sql, params = "select * from messages where conversation_id = 'long'", []
+    if before is not None:
+        value, row_id = decode_cursor(before)
+        # Same shape as keyset_condition: a sargable bound plus the tie-break
+        sql += " and sent_at <= ? and (sent_at < ? or id < ?)"
+        params += [value, value, row_id]
+    rows = fetch(conn, sql + " order by sent_at desc, id desc limit ?", params + [limit + 1])
+    return page(rows, "sent_at", limit, desc=True, more_before=False, more_after=before is not None)
+
+def offset_page(conn, limit, offset):
+    return fetch(conn, "select * from messages where conversation_id = 'long' "
+                       "order by sent_at desc, id desc limit ? offset ?", [limit, offset])
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - started)
+    return result, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Message pagination benchmark")
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(":memory:")
+    build(conn, args.messages)
+
+    # Walk the whole history with keyset cursors, remembering the cursor at each depth
+    seen, cursors, cursor = [], {0: None}, None
+    depths = [int(args.messages * share) // args.page_size * args.page_size for share in (0.1, 0.5, 0.99)]
+    while True:
+        result = keyset_page(conn, args.page_size, cursor)
+        seen.extend(row["id"] for row in result["items"])
+        if len(seen) in depths:
+            cursors[len(seen)] = result["before"]
+        cursor = result["before"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == args.messages
+
+    _, latencies = timed(lambda: fetch(conn, "select * from messages where conversation_id = 'long' "
+                                             "order by sent_at", []), max(1, args.repeat // 10))
+    full = fetch(conn, "select * from messages where conversation_id = 'long' order by sent_at", [])
+    rows = [{"strategy": "whole conversation", "depth": "-", "rows": len(full),
+             "response_kb": round(len(json.dumps(full)) / 1024), **latency_summary(latencies)}]
+    for depth in sorted(cursors):
+        items, latencies = timed(lambda: offset_page(conn, args.page_size, depth), args.repeat)
+        rows.append({"strategy": "offset page", "depth": depth, "rows": len(items),
+                     "response_kb": round(len(json.dumps(items)) / 1024, 1), **latency_summary(latencies)})
+        result, latencies = timed(lambda: keyset_page(conn, args.page_size, cursors[depth]), args.repeat)
+        rows.append({"strategy": "keyset page", "depth": depth, "rows": len(result["items"]),
+                     "response_kb": round(len(json.dumps(result)) / 1024, 1), **latency_summary(latencies)})
+    print_table(f"{args.messages} messages in one conversation, pages of {args.page_size} "
+                f"(keyset walk saw every message once)", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import bisect
+import json
+import time
+import tracemalloc
+import uuid
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.common import latency_summary, print_table
+from src.repositories.patients import get_patient_repository
+from src.routers import patients
+from src.utils.user_utils import AuthenticatedUser
+
+# Cost of listing patients as the table grows. The real /patients router runs in
+# process over an in-memory repository. The repository keeps rows sorted by
+# (full_name, id), like the README index, and answers keyset pages with a binary
+# search. "whole table" is the old behaviour: every row in one response. Pages
+# are timed at several depths with their real cursors. The export streams the
+# whole table; its peak memory is compared with building the full response at once.
+
+def sort_key(row):
+    return (row["full_name"] is None, row["full_name"] or "", row["id"])
+
+class FakePatients:
+    def __init__(self, rows):
+        self.rows = rows
+        self.keys = [sort_key(row) for row in rows]
+        self.count_queries = 0
+
+    async def list_all(self):
+        return [dict(row) for row in self.rows]
+
+    async def page(self, columns, limit, after=None, search=None, name=None, email=None):
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(self.keys, (after[0] is None, after[0] or "", after[1]))
+        selected = None if columns == "*" else columns.split(",")
+        return [row if selected is None else {c: row.get(c) for c in selected}
+                for row in self.rows[start:start + limit]]
+
+    async def estimate_count(self, search=None, name=None, email=None):
+        self.count_queries += 1
+        return len(self.rows)
+
+def build(count):
+    rows = [{"id": str(uuid.UUID(int=i + 1)), "full_name": f"Patient {i:07d}" if i % 50 else None,
+             "email": f"patient{i}@example.com", "phone": f"+1555{i:07d}", "created_at": "2024-01-01T00:00:00+00:00",
+             "address": "221B Baker Street, London"} for i in range(count)]
+    rows.sort(key=sort_key)
+    return rows
+
+async def timed(http, path, params, repeat):
+    latencies, response = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await http.get(path, params=params)
+        latencies.append(time.perf_counter() - started)
+    return response, latencies
+
+async def main_async(args):
+    repository = FakePatients(build(args.patients))
+    app = FastAPI()
+    app.include_router(patients.router)
+    app.dependency_overrides[get_patient_repository] = lambda: repository
+    staff = AuthenticatedUser({"sub": "bench", "app_metadata": {"role": "DOCTOR"}})
+    app.dependency_overrides[patients.get_staff_user] = lambda: staff
+
+    @app.get("/whole-table")
+    async def whole_table():
+        return await repository.list_all()
+
+    rows = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as http:
+        response, latencies = await timed(http, "/whole-table", {}, 3)
+        rows.append({"listing": "whole table", "depth": "-", "rows": len(response.json()),
+                     "response_kb": round(len(response.content) / 1024), **latency_summary(latencies)})
+
+        # Walk every page once, keeping the cursor at a few depths
+        depths = {0: None}
+        marks = {int(args.patients * share) // args.page_size * args.page_size for share in (0.5, 0.99)}
+        cursor, seen = None, 0
+        while True:
+            params = {"limit": args.page_size, **({"after": cursor} if cursor else {})}
+            body = (await http.get("/patients/", params=params)).json()
+            seen += len(body["items"])
+            cursor = body["after"]
+            if seen in marks:
+                depths[seen] = cursor
+            if cursor is None:
+                break
+        assert seen == args.patients
+
+        for depth, cursor in sorted(depths.items()):
+            for fields in (None, "id,full_name"):
+                params = {"limit": args.page_size, **({"after": cursor} if cursor else {}),
+                          **({"fields": fields} if fields else {})}
+                response, latencies = await timed(http, "/patients/", params, args.repeat)
+                rows.append({"listing": f"page ({fields or 'all columns'})", "depth": depth,
+                             "rows": len(response.json()["items"]),
+                             "response_kb": round(len(response.content) / 1024, 1), **latency_summary(latencies)})
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        exported = size = 0
+        async with http.stream("GET", "/patients/export", params={"fields": "id,full_name,email"}) as response:
+            # Counted as it arrives; keeping the body would measure the client, not the server
+            async for chunk in response.aiter_bytes():
+                exported += chunk.count(b'{"id":')
+                size += len(chunk)
+        elapsed = time.perf_counter() - started
+        _, export_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert exported == args.patients
+        rows.append({"listing": "streamed export (3 columns)", "depth": "-", "rows": exported,
+                     "response_kb": round(size / 1024),
+                     "p50_ms": round(elapsed * 1000, 1), "p95_ms": "-", "p99_ms": "-",
+                     "max_ms": f"peak {export_peak / 2 ** 20:.0f} MB"})
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        whole = json.dumps(await repository.list_all())
+        elapsed = time.perf_counter() - started
+        _, whole_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows.append({"listing": "whole table in memory", "depth": "-", "rows": args.patients,
+                     "response_kb": round(len(whole) / 1024), "p50_ms": round(elapsed * 1000, 1),
+                     "p95_ms": "-", "p99_ms": "-", "max_ms": f"peak {whole_peak / 2 ** 20:.0f} MB"})
+
+    print_table(f"{args.patients} patients, pages of {args.page_size} "
+                f"({repository.count_queries} count estimate queries for {seen // args.page_size + 1} pages)", rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Patient listing benchmark")
+    parser.add_argument("--patients", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
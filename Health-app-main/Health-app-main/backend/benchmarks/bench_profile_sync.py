@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import latency_summary, print_table
+from src.utils.profile_sync import ProfileSync
+
+# Cost of keeping `patients` in sync with the caller's token on every request.
+# Inline: one upsert per authenticated request before the handler runs, as
+# get_current_user used to do. Write-behind: ProfileSync skips unchanged profiles
+# and upserts changed ones in background batches. A few users change their name
+# during the run, and the simulated database fails a share of the writes. At the
+# end, the table must hold every user's latest profile.
+
+class FakeDatabase:
+    def __init__(self, latency: float, failure_rate: float, rng: random.Random):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.writes = 0
+        self.rows_written = 0
+        self.patients = {}
+
+    async def upsert(self, rows):
+        self.writes += 1
+        await asyncio.sleep(self.latency)
+        if self.rng.random() < self.failure_rate:
+            raise RuntimeError("simulated database error")
+        self.rows_written += len(rows)
+        for row in rows:
+            self.patients[row["id"]] = row
+
+def requests(args, rng):
+    """(user_id, profile) per authenticated request; a few profiles change midway"""
+    profiles = {f"user-{u}": {"id": f"user-{u}", "email": f"user{u}@example.com", "full_name": f"User {u}"}
+                for u in range(args.users)}
+    users = list(profiles)
+    for i in range(args.requests):
+        user_id = rng.choice(users)
+        if rng.random() < args.change_rate:
+            profiles[user_id] = dict(profiles[user_id], full_name=f"User {user_id} v{i}")
+        yield dict(profiles[user_id])
+
+async def burst(items, concurrency, handler):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(row):
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(row)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(row) for row in items))
+    return latencies
+
+async def main_async(args):
+    latency = args.latency_ms / 1000
+    rows = []
+    traffic = list(requests(args, random.Random(21)))
+    latest = {row["id"]: row for row in traffic}
+
+    database = FakeDatabase(latency, 0.0, random.Random(21))
+
+    async def inline(row):
+        await database.upsert([row])
+
+    latencies = await burst(traffic, args.concurrency, inline)
+    rows.append({"profile_sync": "inline upsert", "requests": len(traffic), "db_writes": database.writes,
+                 "rows_written": database.rows_written, "writes_avoided": 0, **latency_summary(latencies)})
+
+    database = FakeDatabase(latency, args.failure_rate, random.Random(21))
+    sync = ProfileSync(sink=database.upsert, flush_interval=0.05, max_attempts=50)
+
+    async def behind(row):
+        sync.submit(row)
+
+    latencies = await burst(traffic, args.concurrency, behind)
+    while sync.stats()["pending"]:
+        await asyncio.sleep(0.01)
+    await sync.close()
+    stats = sync.stats()
+    assert database.patients == latest and stats["dropped"] == 0
+    rows.append({"profile_sync": f"write-behind ({args.failure_rate:.0%} write failures)", "requests": len(traffic),
+                 "db_writes": database.writes, "rows_written": database.rows_written,
+                 "writes_avoided": stats["writes_avoided"], **latency_summary(latencies)})
+
+    print_table(f"{args.requests} authenticated requests from {args.users} users, {args.change_rate:.1%} change "
+                f"their profile, {args.latency_ms:g} ms database round trip (per-request profile sync cost)", rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Patient profile sync benchmark")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--change-rate", type=float, default=0.002)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
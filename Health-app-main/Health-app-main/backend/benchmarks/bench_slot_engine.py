@@ -0,0 +1,79 @@
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import print_table
+from src.utils.scheduling import BookingIntervals, SlotEngine, booking_interval
+
+# Free-slot computation for one doctor over a multi-week range: the previous
+# /appointments/slots loop (every candidate slot checked against every booking)
+# versus the interval engine (one sorted load, one merge pass per working day).
+
+def make_bookings(start: date, days: int, count: int, rng: random.Random):
+    bookings = []
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(days))
+        minute = rng.randrange(8 * 60, 18 * 60, 15)
+        when = datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+        bookings.append({"doctor_id": "doctor-1", "appointment_date": when.isoformat(),
+                         "duration_minutes": rng.choice((15, 30, 45, 60))})
+    return bookings
+
+def legacy_slots(appointments, start: date, days: int, duration: int = 30):
+    """The old algorithm, fed with parsed datetimes instead of raw strings"""
+    booked_slots = [booking_interval(a) for a in appointments]
+    available_slots = []
+    for offset in range(days):
+        day = datetime.combine(start + timedelta(days=offset), datetime.min.time())
+        current, end_time = day.replace(hour=9), day.replace(hour=17)
+        while current + timedelta(minutes=duration) <= end_time:
+            slot_end = current + timedelta(minutes=duration)
+            is_available = True
+            for booked_start, booked_end in booked_slots:
+                if current < booked_end and slot_end > booked_start:
+                    is_available = False
+                    break
+            if is_available:
+                available_slots.append(current)
+            current += timedelta(minutes=30)
+    return available_slots
+
+def engine_slots(appointments, start: date, days: int, duration: int = 30):
+    bookings = BookingIntervals.from_appointments(appointments)
+    return SlotEngine().free_slots("doctor-1", bookings, start, start + timedelta(days=days - 1), duration)
+
+def best_of(repeat, fn, *args):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Appointment slot engine benchmark")
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    start = date(2024, 1, 1)
+    rows = []
+    for count in (500, 2000, 5000):
+        appointments = make_bookings(start, args.days, count, rng)
+        legacy_s, legacy = best_of(args.repeat, legacy_slots, appointments, start, args.days)
+        engine_s, engine = best_of(args.repeat, engine_slots, appointments, start, args.days)
+        assert legacy == engine
+        rows.append({
+            "bookings": count,
+            "free_slots": len(engine),
+            "loop_ms": round(legacy_s * 1000, 2),
+            "engine_ms": round(engine_s * 1000, 2),
+            "speedup": f"{legacy_s / engine_s:.1f}x",
+        })
+
+    print_table(f"Free 30-minute slots over {args.days} days, one doctor", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from supabase import create_client
+
+from benchmarks.common import FAKE_SUPABASE_KEY, MockHTTPServer, print_table
+
+# Compares requests/sec of building a Supabase client per request (the old
+# `get_supabase_client()` behaviour) against the pooled per-worker registry.
+# Runs against a local mock PostgREST endpoint unless --url/--key are given.
+
+def run(label, make_client, requests_total, concurrency):
+    def one_request(_):
+        client = make_client()
+        client.table("doctors").select("id").limit(1).execute()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(requests_total)))
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": label,
+        "requests": requests_total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "req_per_sec": round(requests_total / elapsed, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Supabase client pooling benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="Real Supabase URL (defaults to a local mock)")
+    parser.add_argument("--key", help="Supabase key to use with --url")
+    args = parser.parse_args()
+
+    def bench(url, key):
+        os.environ["SUPABASE_URL"] = url
+        os.environ["SUPABASE_KEY"] = key
+        from src.utils.supabase_client import registry
+
+        rows = [
+            run("per-request create_client", lambda: create_client(url, key),
+                args.requests, args.concurrency),
+            run("pooled registry", registry.get, args.requests, args.concurrency),
+        ]
+        registry.close()
+        return rows
+
+    if args.url:
+        rows = bench(args.url, args.key)
+    else:
+        with MockHTTPServer() as server:
+            rows = bench(server.url, FAKE_SUPABASE_KEY)
+
+    print_table("Supabase client construction", rows)
+    print(f"\nSpeed-up: {rows[1]['req_per_sec'] / rows[0]['req_per_sec']:.1f}x")
+
+if __name__ == "__main__":
+    main()
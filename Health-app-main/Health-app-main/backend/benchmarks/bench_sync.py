@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from fastapi import FastAPI, Header
+
+from benchmarks.common import latency_summary, print_table
+from src.repositories.messaging import get_conversation_repository, get_message_repository
+from src.routers import messaging
+from src.utils.auth import get_current_user_id
+
+# Cost of keeping a mobile client up to date. In-memory repositories stand in
+# for `conversations` and `messages` and mirror the last-message trigger from the
+# README. The real router runs in process. Each client owns a few conversations
+# with a long history. Baseline: poll every interval and re-download every
+# conversation, as clients did before. Sync: long-poll /messaging/sync with the
+# previous cursor. Reported: bytes per client, requests and send-to-receive latency.
+# Every client must receive every message sent to it exactly once.
+
+def key(timestamp, row_id):
+    return datetime.fromisoformat(timestamp), row_id
+
+class Store:
+    def __init__(self):
+        self.conversations = {}
+        self.messages = {}
+
+    def add_message(self, conversation_id, content, sent_at, message_id=None):
+        row = {"id": message_id or str(uuid.uuid4()), "conversation_id": conversation_id, "content": content,
+               "sent_at": sent_at.isoformat()}
+        self.messages[conversation_id].append(row)
+        conv = self.conversations[conversation_id]
+        conv.update(last_message_id=row["id"], last_message_preview=content[:140], last_message_at=row["sent_at"])
+        return row
+
+class FakeConversations:
+    def __init__(self, store):
+        self.store = store
+
+    async def get(self, conversation_id, columns="*"):
+        return self.store.conversations.get(conversation_id)
+
+    async def page_for_user(self, user_id, limit, before=None):
+        rows = [c for c in self.store.conversations.values() if user_id in (c["patient_id"], c["doctor_id"])]
+        return sorted(rows, key=lambda c: key(c["last_message_at"], c["id"]), reverse=True)[:limit]
+
+    async def changed_since(self, user_id, since):
+        since = datetime.fromisoformat(since)
+        return [dict(c) for c in self.store.conversations.values()
+                if user_id in (c["patient_id"], c["doctor_id"]) and datetime.fromisoformat(c["last_message_at"]) >= since]
+
+class FakeMessages:
+    def __init__(self, store):
+        self.store = store
+
+    async def insert(self, row):
+        return [self.store.add_message(row["conversation_id"], row["content"], datetime.now(timezone.utc),
+                                       row["id"])]
+
+    async def page(self, conversation_id, limit, before=None, after=None):
+        return list(reversed(self.store.messages[conversation_id]))[:limit]
+
+    async def since(self, conversation_ids, after, limit):
+        after = key(*after)
+        rows = [m for c in conversation_ids for m in self.store.messages[c] if key(m["sent_at"], m["id"]) > after]
+        return sorted(rows, key=lambda m: key(m["sent_at"], m["id"]))[:limit]
+
+def header_user(x_user: str = Header(...)):
+    return x_user
+
+def make_app(store):
+    app = FastAPI()
+    app.include_router(messaging.router)
+    app.dependency_overrides[get_conversation_repository] = lambda: FakeConversations(store)
+    app.dependency_overrides[get_message_repository] = lambda: FakeMessages(store)
+    app.dependency_overrides[get_current_user_id] = header_user
+    return app
+
+def seed(store, users, per_user, history):
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    owned = {}
+    for u in range(users):
+        user_id = str(uuid.UUID(int=u + 1))
+        owned[user_id] = []
+        for _ in range(per_user):
+            conversation_id = str(uuid.uuid4())
+            store.conversations[conversation_id] = {"id": conversation_id, "patient_id": user_id,
+                                                    "doctor_id": "doctor", "created_at": start.isoformat()}
+            store.messages[conversation_id] = []
+            offset = timedelta(seconds=len(store.conversations))
+            for i in range(history):
+                store.add_message(conversation_id, f"history message {i} " + "x" * 80,
+                                  start + timedelta(minutes=i) + offset)
+            owned[user_id].append(conversation_id)
+    return owned
+
+async def run(args, mode):
+    store = Store()
+    owned = seed(store, args.users, args.conversations, args.history)
+    app = make_app(store)
+    sent_at, received_at, received = {}, {}, {user_id: [] for user_id in owned}
+    stats = {"requests": 0, "bytes": 0}
+    stop = asyncio.Event()
+
+    async def get(http, path, user_id, params):
+        response = await http.get(path, params=params, headers={"x-user": user_id})
+        stats["requests"] += 1
+        stats["bytes"] += len(response.content)
+        return response.json()
+
+    async def client(http, user_id):
+        seen = set()
+        cursor = (await get(http, "/messaging/sync", user_id, {}))["cursor"]
+        while not stop.is_set():
+            if mode == "sync":
+                body = await get(http, "/messaging/sync", user_id, {"since": cursor, "wait": args.wait})
+                cursor, new = body["cursor"], body["messages"]
+            else:
+                await asyncio.sleep(args.poll_interval)
+                new = []
+                for conversation_id in owned[user_id]:
+                    body = await get(http, "/messaging/messages", user_id,
+                                     {"conversation_id": conversation_id, "limit": args.history})
+                    new.extend(m for m in body["items"]
+                               if not m["content"].startswith("history") and m["id"] not in seen)
+            now = time.perf_counter()
+            for message in new:
+                seen.add(message["id"])
+                received[user_id].append(message["id"])
+                received_at.setdefault(message["id"], now)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 timeout=args.wait + 10) as http:
+        clients = [asyncio.create_task(client(http, user_id)) for user_id in owned]
+        await asyncio.sleep(0.2)
+        rng = random.Random(19)
+        users = list(owned)
+        for _ in range(args.messages):
+            user_id = rng.choice(users)
+            conversation_id = rng.choice(owned[user_id])
+            started = time.perf_counter()
+            response = await http.post("/messaging/messages", json={"conversation_id": conversation_id,
+                                                                    "content": "new message"},
+                                       headers={"x-user": user_id})
+            sent_at[response.json()["id"]] = started
+            await asyncio.sleep(args.duration / args.messages)
+        deadline = time.perf_counter() + args.poll_interval + args.wait + 2
+        while len(received_at) < args.messages and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        stop.set()
+        await asyncio.wait(clients, timeout=args.wait + 2)
+        for task in clients:
+            task.cancel()
+
+    delivered = sum(len(ids) for ids in received.values())
+    duplicates = sum(len(ids) - len(set(ids)) for ids in received.values())
+    assert duplicates == 0 and delivered == args.messages, (mode, delivered, duplicates)
+    latencies = [received_at[message_id] - started for message_id, started in sent_at.items()]
+    return {"client": mode if mode == "sync" else f"re-download every {args.poll_interval:g} s",
+            "delivered": delivered, "requests": stats["requests"],
+            "kb_per_client": round(stats["bytes"] / 1024 / args.users, 1), **latency_summary(latencies)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Messaging delta-sync benchmark")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--history", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--wait", type=float, default=5.0)
+    args = parser.parse_args()
+    rows = [asyncio.run(run(args, "poll")), asyncio.run(run(args, "sync"))]
+    print_table(f"{args.users} clients x {args.conversations} conversations of {args.history} messages, "
+                f"{args.messages} new messages over {args.duration:g} s", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import requests
+
+from benchmarks.common import MockHTTPServer, latency_summary, print_table
+
+# Latency of /wearable/summary against a local mock Vital server where each
+# timeseries has a different response time. Serial fetching costs the sum of
+# the four latencies; the concurrent fan-out should cost roughly the slowest.
+
+METRIC_LATENCY = {"heart_rate": 0.05, "activity": 0.08, "sleep": 0.12, "blood_oxygen": 0.06}
+
+def vital_responder(method, path, body):
+    metric = path.split("?")[0].rsplit("/", 1)[-1]
+    time.sleep(METRIC_LATENCY.get(metric, 0))
+    return {"summary": {"average": 70}, "data": []}
+
+def legacy_summary(base_url: str, user_id: str):
+    """The previous implementation: four serial, session-less requests.get calls"""
+    start, end = datetime.now() - timedelta(days=7), datetime.now()
+    params = {"start_date": start.strftime("%Y-%m-%d"), "end_date": end.strftime("%Y-%m-%d")}
+    return {metric: requests.get(f"{base_url}/timeseries/{user_id}/{metric}", params=params).json()
+            for metric in METRIC_LATENCY}
+
+async def concurrent_summaries(app, iterations: int):
+    transport = httpx.ASGITransport(app=app)
+    samples = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(iterations):
+            started = time.perf_counter()
+            response = await client.get(f"/wearable/summary/user-{i}")
+            response.raise_for_status()
+            samples.append(time.perf_counter() - started)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Vital timeseries fan-out benchmark")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    with MockHTTPServer(vital_responder) as server:
+        os.environ["VITAL_BASE_URL"] = server.url
+        from main import app
+        from src.utils.vital_client import close_vital_client
+
+        serial = []
+        for i in range(args.iterations):
+            started = time.perf_counter()
+            legacy_summary(server.url, f"user-{i}")
+            serial.append(time.perf_counter() - started)
+
+        async def run():
+            samples = await concurrent_summaries(app, args.iterations)
+            await close_vital_client()
+            return samples
+
+        concurrent = asyncio.run(run())
+
+    print_table("GET /wearable/summary", [
+        {"mode": "serial requests.get", **latency_summary(serial)},
+        {"mode": "pooled async fan-out", **latency_summary(concurrent)},
+    ])
+    print(f"\nSlowest single call: {max(METRIC_LATENCY.values()) * 1000:.0f} ms, "
+          f"sum of calls: {sum(METRIC_LATENCY.values()) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
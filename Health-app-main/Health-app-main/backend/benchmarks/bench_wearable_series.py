@@ -0,0 +1,68 @@
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from benchmarks.common import print_table
+from src.models.timeseries import WearableSeries
+from src.models.wearable_data import HeartRateData, WearableDataPoint
+
+# Memory and CPU cost of per-second heart-rate samples held as one Pydantic
+# WearableDataPoint per sample versus the columnar WearableSeries.
+
+def measure(build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar wearable series benchmark")
+    parser.add_argument("--samples", type=int, default=200_000, help="Per-second samples")
+    args = parser.parse_args()
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rng = np.random.default_rng(7)
+    values = (70 + 10 * rng.standard_normal(args.samples)).round(1).tolist()
+    records = [{"value": v, "unit": "bpm", "timestamp": (start + timedelta(seconds=i)).isoformat()}
+               for i, v in enumerate(values)]
+    window = (start + timedelta(hours=6), start + timedelta(hours=12))
+
+    objects, objects_build, objects_mem = measure(
+        lambda: HeartRateData.model_construct(data_points=[WearableDataPoint(**r) for r in records]))
+    series, series_build, series_mem = measure(lambda: HeartRateData(data_points=records))
+
+    started = time.perf_counter()
+    [p for p in objects.data_points if window[0] <= p.timestamp < window[1]]
+    objects_slice = time.perf_counter() - started
+    started = time.perf_counter()
+    series.data_points.slice(*window)
+    series_slice = time.perf_counter() - started
+
+    started = time.perf_counter()
+    json.dumps([p.model_dump(mode="json") for p in objects.data_points])
+    objects_json = time.perf_counter() - started
+    started = time.perf_counter()
+    series.data_points.to_json_bytes()
+    series_json = time.perf_counter() - started
+    started = time.perf_counter()
+    series.data_points.to_bytes()
+    series_binary = time.perf_counter() - started
+
+    print_table(f"{args.samples} heart-rate samples", [
+        {"representation": "List[WearableDataPoint]", "build_ms": round(objects_build * 1000, 1),
+         "peak_mem_mb": round(objects_mem / 1e6, 1), "slice_ms": round(objects_slice * 1000, 3),
+         "json_ms": round(objects_json * 1000, 1), "binary_ms": "-"},
+        {"representation": "WearableSeries", "build_ms": round(series_build * 1000, 1),
+         "peak_mem_mb": round(series_mem / 1e6, 1), "slice_ms": round(series_slice * 1000, 3),
+         "json_ms": round(series_json * 1000, 1), "binary_ms": round(series_binary * 1000, 3)},
+    ])
+
+if __name__ == "__main__":
+    main()
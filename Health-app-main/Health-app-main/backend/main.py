@@ -1,7 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from src.routers import appointment, messaging, doctors, wearable, profile, appointment_request, patients
+from src.routers import appointment, messaging, doctors, wearable, profile, appointment_request, patients, metrics
+from src.utils.supabase_client import registry as supabase_registry
+from src.utils.vital_client import close_vital_client
+from src.utils.ingest import ingest_buffer
+from src.utils.outbox import notification_outbox
+from src.utils.message_hub import message_hub
+from src.utils.profile_sync import profile_sync
+from src.utils.redis_client import close_redis
+from src.utils.auth import token_verifier
 
 app = FastAPI(title="Hospital Management System API")
 
@@ -22,6 +30,19 @@ app.include_router(wearable.router)
 app.include_router(profile.router)
 app.include_router(appointment_request.router)
 app.include_router(patients.router)
+app.include_router(metrics.router)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Write out buffered device samples and notifications, then release the worker's pooled connections
+    await ingest_buffer.close()
+    await notification_outbox.close()
+    await message_hub.close()
+    await profile_sync.close()
+    await supabase_registry.aclose()
+    await token_verifier.aclose()
+    await close_vital_client()
+    await close_redis()
 
 @app.get("/")
 async def root():
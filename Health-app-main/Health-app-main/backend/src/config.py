@@ -1 +1,121 @@
- 
\ No newline at end of file
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Runtime settings for the Hospital Management System backend.
+# Every value can be overridden through the environment (or the .env file).
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+# HTTP connection pool used by the shared Supabase client (one per worker process)
+SUPABASE_POOL_MAX_CONNECTIONS = _env_int("SUPABASE_POOL_MAX_CONNECTIONS", 100)
+SUPABASE_POOL_MAX_KEEPALIVE = _env_int("SUPABASE_POOL_MAX_KEEPALIVE", 20)
+SUPABASE_POOL_KEEPALIVE_EXPIRY = _env_float("SUPABASE_POOL_KEEPALIVE_EXPIRY", 30.0)
+SUPABASE_TIMEOUT = _env_float("SUPABASE_TIMEOUT", 10.0)
+
+# Vital wearable API client (shared per worker)
+VITAL_BASE_URL = os.getenv("VITAL_BASE_URL", "https://api.tryvital.io/v2")
+VITAL_TIMEOUT = _env_float("VITAL_TIMEOUT", 15.0)
+VITAL_CONNECT_TIMEOUT = _env_float("VITAL_CONNECT_TIMEOUT", 5.0)
+VITAL_POOL_MAX_CONNECTIONS = _env_int("VITAL_POOL_MAX_CONNECTIONS", 50)
+VITAL_POOL_MAX_KEEPALIVE = _env_int("VITAL_POOL_MAX_KEEPALIVE", 20)
+VITAL_MAX_CONCURRENCY = _env_int("VITAL_MAX_CONCURRENCY", 32)
+
+# Local store of synced wearable samples, keyed by (user, metric, day)
+WEARABLE_STORE_MAX_ENTRIES = _env_int("WEARABLE_STORE_MAX_ENTRIES", 50000)
+WEARABLE_STORE_RETENTION_DAYS = _env_int("WEARABLE_STORE_RETENTION_DAYS", 90)
+
+# Device push ingest (/wearable/ingest): buffered samples are flushed in batched inserts
+INGEST_BATCH_SIZE = _env_int("INGEST_BATCH_SIZE", 5000)
+INGEST_MAX_PENDING = _env_int("INGEST_MAX_PENDING", 200000)
+INGEST_FLUSH_INTERVAL = _env_float("INGEST_FLUSH_INTERVAL", 1.0)
+INGEST_BACKPRESSURE_TIMEOUT = _env_float("INGEST_BACKPRESSURE_TIMEOUT", 5.0)
+# Failed writes after which samples the database keeps rejecting are dropped
+INGEST_MAX_ATTEMPTS = _env_int("INGEST_MAX_ATTEMPTS", 5)
+
+# Upper bound on points returned by /wearable/data/* when resolution=auto picks a rollup tier
+WEARABLE_MAX_POINTS = _env_int("WEARABLE_MAX_POINTS", 1500)
+
+# Streaming anomaly detection on pushed wearable samples
+ANOMALY_COOLDOWN_MS = _env_int("ANOMALY_COOLDOWN_MS", 30 * 60 * 1000)
+ANOMALY_BASELINE_ALPHA = _env_float("ANOMALY_BASELINE_ALPHA", 0.001)
+ANOMALY_MIN_BASELINE_SAMPLES = _env_int("ANOMALY_MIN_BASELINE_SAMPLES", 600)
+ANOMALY_MAX_STREAMS = _env_int("ANOMALY_MAX_STREAMS", 100000)
+
+# In-memory doctor location index behind /doctors/nearby
+DOCTOR_GEO_CELL_DEG = _env_float("DOCTOR_GEO_CELL_DEG", 0.1)
+DOCTOR_INDEX_TTL = _env_float("DOCTOR_INDEX_TTL", 300.0)
+
+# Appointment scheduling: working hours used for doctors without `doctor_availability` rows
+DEFAULT_WORKDAY_START = os.getenv("DEFAULT_WORKDAY_START", "09:00")
+DEFAULT_WORKDAY_END = os.getenv("DEFAULT_WORKDAY_END", "17:00")
+MAX_SLOT_RANGE_DAYS = _env_int("MAX_SLOT_RANGE_DAYS", 62)
+MAX_AVAILABILITY_DOCTORS = _env_int("MAX_AVAILABILITY_DOCTORS", 500)
+
+# Appointment booking: cached busy intervals per doctor/day and retries of transient insert failures
+BOOKING_CACHE_TTL = _env_float("BOOKING_CACHE_TTL", 30.0)
+BOOKING_CACHE_MAX_DAYS = _env_int("BOOKING_CACHE_MAX_DAYS", 20000)
+BOOKING_MAX_RETRIES = _env_int("BOOKING_MAX_RETRIES", 3)
+
+# Optional Redis (shared caches across workers); leave REDIS_URL empty to keep everything in-process
+REDIS_URL = os.getenv("REDIS_URL", "")
+REDIS_TIMEOUT = _env_float("REDIS_TIMEOUT", 0.5)
+
+# Per doctor-day availability cache used by /appointments/availability and /appointments/slots
+AVAILABILITY_CACHE_TTL = _env_float("AVAILABILITY_CACHE_TTL", 300.0)
+AVAILABILITY_CACHE_MAX_ENTRIES = _env_int("AVAILABILITY_CACHE_MAX_ENTRIES", 50000)
+
+# Notification outbox: events are written by a background dispatcher in batches
+OUTBOX_BATCH_SIZE = _env_int("OUTBOX_BATCH_SIZE", 200)
+OUTBOX_FLUSH_INTERVAL = _env_float("OUTBOX_FLUSH_INTERVAL", 0.25)
+OUTBOX_MAX_ATTEMPTS = _env_int("OUTBOX_MAX_ATTEMPTS", 5)
+OUTBOX_RETRY_DELAY = _env_float("OUTBOX_RETRY_DELAY", 1.0)
+
+# WebSocket messaging: events buffered per socket before a slow client is disconnected
+MESSAGE_HUB_QUEUE_SIZE = _env_int("MESSAGE_HUB_QUEUE_SIZE", 256)
+
+# Keyset pagination of messages and conversations
+MESSAGES_PAGE_SIZE = _env_int("MESSAGES_PAGE_SIZE", 50)
+CONVERSATIONS_PAGE_SIZE = _env_int("CONVERSATIONS_PAGE_SIZE", 20)
+MAX_PAGE_SIZE = _env_int("MAX_PAGE_SIZE", 200)
+
+# Delta sync: messages returned per /messaging/sync response and the longest long-poll hold
+SYNC_MAX_MESSAGES = _env_int("SYNC_MAX_MESSAGES", 500)
+SYNC_MAX_WAIT = _env_float("SYNC_MAX_WAIT", 25.0)
+# Seconds behind the cursor every sync re-reads, for messages whose transaction committed late,
+# and the most ids of already delivered messages a cursor remembers for that window
+SYNC_OVERLAP = _env_float("SYNC_OVERLAP", 10.0)
+SYNC_MAX_SEEN = _env_int("SYNC_MAX_SEEN", 1000)
+
+# Auth: local verification of Supabase access tokens (HS256 secret and/or the project's JWKS)
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL", "")  # default: <SUPABASE_URL>/auth/v1/.well-known/jwks.json
+JWT_AUDIENCE = os.getenv("JWT_AUDIENCE", "authenticated")
+JWT_LEEWAY = _env_int("JWT_LEEWAY", 30)
+JWKS_CACHE_TTL = _env_float("JWKS_CACHE_TTL", 600.0)
+JWKS_REFRESH_MIN_INTERVAL = _env_float("JWKS_REFRESH_MIN_INTERVAL", 5.0)
+AUTH_CLAIMS_CACHE_SIZE = _env_int("AUTH_CLAIMS_CACHE_SIZE", 10000)
+
+# Write-behind patient profile sync on authenticated requests
+PROFILE_SYNC_MAX_USERS = _env_int("PROFILE_SYNC_MAX_USERS", 100000)
+PROFILE_SYNC_BATCH_SIZE = _env_int("PROFILE_SYNC_BATCH_SIZE", 500)
+PROFILE_SYNC_FLUSH_INTERVAL = _env_float("PROFILE_SYNC_FLUSH_INTERVAL", 1.0)
+PROFILE_SYNC_MAX_ATTEMPTS = _env_int("PROFILE_SYNC_MAX_ATTEMPTS", 5)
+
+# /patients listing: page sizes, export page size and how long a count estimate is reused
+PATIENTS_PAGE_SIZE = _env_int("PATIENTS_PAGE_SIZE", 50)
+PATIENTS_EXPORT_PAGE_SIZE = _env_int("PATIENTS_EXPORT_PAGE_SIZE", 1000)
+PATIENT_COUNT_TTL = _env_float("PATIENT_COUNT_TTL", 300.0)
+
+# Bulk exports (/appointments/export, /messaging/export, /wearable/export/*): rows read per query
+# and gzip level when the client sends Accept-Encoding: gzip
+EXPORT_PAGE_SIZE = _env_int("EXPORT_PAGE_SIZE", 1000)
+EXPORT_GZIP_LEVEL = _env_int("EXPORT_GZIP_LEVEL", 6)
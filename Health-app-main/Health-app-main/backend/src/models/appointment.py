@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
+from .doctor import Doctor
 
 # Appointment model for the Hospital Management System.
 # This file defines the structure and behavior of appointments in the system, ensuring seamless integration with IoT devices for health monitoring.
@@ -49,4 +50,48 @@ class Appointment(AppointmentBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+# One line of the multi-doctor availability search: a doctor and their free slots,
+# streamed in order of earliest availability.
+
+class DoctorAvailability(BaseModel):
+    doctor: Doctor
+    earliest: datetime
+    slots: List[datetime]
+
+# Bulk operations: clinics import and reschedule hundreds of appointments per request.
+# Every item gets its own result; one failing item does not fail the batch.
+
+MAX_BULK_ITEMS = 500
+
+class AppointmentBulkUpdate(AppointmentUpdate):
+    id: str
+
+class BulkAppointmentCreate(BaseModel):
+    items: List[AppointmentCreate] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class BulkAppointmentUpdate(BaseModel):
+    items: List[AppointmentBulkUpdate] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class BulkAppointmentCancel(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class BulkItemStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    CANCELLED = "cancelled"
+    CONFLICT = "conflict"
+    NOT_FOUND = "not_found"
+    FORBIDDEN = "forbidden"
+    FAILED = "failed"
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: BulkItemStatus
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseModel
 
 class Doctor(BaseModel):
@@ -7,6 +8,25 @@ class Doctor(BaseModel):
     latitude: float
     longitude: float
 
+class NearbyDoctor(Doctor):
+    distance_km: float
+
+class DoctorSearchResult(BaseModel):
+    id: str
+    name: Optional[str] = None
+    specialty: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    languages: Optional[str] = None
+    qualifications: Optional[str] = None
+    clinicAffiliation: Optional[str] = None
+    yearsOfExperience: Optional[str] = None
+    distance_km: Optional[float] = None
+
+class DoctorSearchPage(BaseModel):
+    items: List[DoctorSearchResult]
+    next_offset: Optional[int] = None
+
 class DoctorProfile(BaseModel):
     firstName: str
     lastName: str
@@ -0,0 +1,205 @@
+import json
+import struct
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+import numpy as np
+from pydantic_core import core_schema
+
+# Columnar representation of wearable samples.
+# A series keeps timestamps (int64 epoch milliseconds, UTC) and values (float64)
+# in two contiguous NumPy arrays instead of one Pydantic object per sample.
+# Slicing by time returns views, and the JSON/binary encoders work on whole arrays.
+
+_BINARY_MAGIC = b"WSR1"
+_BINARY_HEADER = struct.Struct("<4sIH")
+
+def _to_epoch_ms(value: Any) -> int:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    if isinstance(value, (int, float)):
+        # Accept epoch seconds as well as epoch milliseconds
+        return int(value * 1000) if abs(value) < 1e11 else int(value)
+    text = str(value)
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    return _to_epoch_ms(datetime.fromisoformat(text))
+
+def parse_timestamps(values: Sequence[Any]) -> np.ndarray:
+    """Convert datetimes, ISO-8601 strings or epoch numbers into epoch milliseconds"""
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    if isinstance(values[0], str):
+        # Vectorised fast path for the UTC strings Vital and devices send
+        suffix = "Z" if values[0].endswith("Z") else "+00:00"
+        if all(isinstance(v, str) and v.endswith(suffix) for v in values):
+            cut = -len(suffix)
+            return np.array([v[:cut] for v in values], dtype="datetime64[ms]").astype(np.int64)
+    return np.fromiter((_to_epoch_ms(v) for v in values), dtype=np.int64, count=len(values))
+
+class WearableSeries:
+    """Array-backed series of wearable samples sharing one unit"""
+
+    __slots__ = ("timestamps", "values", "unit")
+
+    def __init__(self, timestamps: Any, values: Any, unit: str = ""):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if timestamps.shape != values.shape or timestamps.ndim != 1:
+            raise ValueError("timestamps and values must be 1-D arrays of the same length")
+        if timestamps.size > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, values = timestamps[order], values[order]
+        self.timestamps = timestamps
+        self.values = values
+        self.unit = unit
+
+    # -- construction -----------------------------------------------------
+
+    @classmethod
+    def _wrap(cls, timestamps: np.ndarray, values: np.ndarray, unit: str) -> "WearableSeries":
+        """Wrap arrays already known to be sorted and aligned, without checks or copies"""
+        series = cls.__new__(cls)
+        series.timestamps = timestamps
+        series.values = values
+        series.unit = unit
+        return series
+
+    @classmethod
+    def empty(cls, unit: str = "") -> "WearableSeries":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), unit)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any], unit: str = "") -> "WearableSeries":
+        """Build a series from WearableDataPoint objects or {"timestamp", "value", "unit"} dicts"""
+        timestamps: List[Any] = []
+        values: List[float] = []
+        for record in records:
+            if isinstance(record, dict):
+                value, timestamp = record.get("value"), record.get("timestamp")
+                record_unit = record.get("unit")
+            else:
+                value, timestamp = record.value, record.timestamp
+                record_unit = record.unit
+            if value is None or timestamp is None:
+                continue
+            timestamps.append(timestamp)
+            values.append(value)
+            unit = unit or record_unit or ""
+        return cls(parse_timestamps(timestamps), np.asarray(values, dtype=np.float64), unit)
+
+    @classmethod
+    def concat(cls, series: Sequence["WearableSeries"], unit: str = "") -> "WearableSeries":
+        parts = [s for s in series if len(s)]
+        if not parts:
+            return cls.empty(unit or next((s.unit for s in series if s.unit), ""))
+        return cls(np.concatenate([s.timestamps for s in parts]),
+                   np.concatenate([s.values for s in parts]),
+                   unit or parts[0].unit)
+
+    # -- access -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return int(self.timestamps.size)
+
+    def __eq__(self, other: Any) -> bool:
+        return (isinstance(other, WearableSeries) and self.unit == other.unit
+                and np.array_equal(self.timestamps, other.timestamps)
+                and np.array_equal(self.values, other.values))
+
+    def __repr__(self) -> str:
+        return f"WearableSeries(len={len(self)}, unit={self.unit!r})"
+
+    def slice(self, start: Optional[Union[datetime, int]] = None,
+              end: Optional[Union[datetime, int]] = None) -> "WearableSeries":
+        """Samples with start <= timestamp < end, as zero-copy views of this series"""
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, _to_epoch_ms(start), "left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.timestamps, _to_epoch_ms(end), "left"))
+        return WearableSeries._wrap(self.timestamps[lo:hi], self.values[lo:hi], self.unit)
+
+    def to_points(self) -> List[Any]:
+        from .wearable_data import WearableDataPoint
+        return [WearableDataPoint(value=v, unit=self.unit, timestamp=t)
+                for t, v in zip(self.iso_timestamps(), self.values.tolist())]
+
+    def iso_timestamps(self) -> List[str]:
+        return np.datetime_as_string(self.timestamps.astype("datetime64[ms]"), unit="ms",
+                                     timezone="UTC").tolist()
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """JSON-ready list in the WearableDataPoint shape ({"value", "unit", "timestamp"})"""
+        unit = self.unit
+        return [{"value": v, "unit": unit, "timestamp": t}
+                for t, v in zip(self.iso_timestamps(), self.values.tolist())]
+
+    # -- encoding ---------------------------------------------------------
+
+    def to_json_bytes(self, columnar: bool = True) -> bytes:
+        """Serialise to JSON; the columnar form is {"unit", "timestamps": [ms...], "values": [...]}"""
+        if columnar:
+            return json.dumps({
+                "unit": self.unit,
+                "timestamps": self.timestamps.tolist(),
+                "values": self.values.tolist(),
+            }, separators=(",", ":")).encode()
+        return json.dumps(self.to_records(), separators=(",", ":")).encode()
+
+    def to_bytes(self) -> bytes:
+        """Compact little-endian binary: header, unit, int64 timestamps, float64 values"""
+        unit = self.unit.encode()
+        return b"".join((
+            _BINARY_HEADER.pack(_BINARY_MAGIC, len(self), len(unit)),
+            unit,
+            self.timestamps.astype("<i8", copy=False).tobytes(),
+            self.values.astype("<f8", copy=False).tobytes(),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WearableSeries":
+        """Decode `to_bytes` output; the arrays are views over `data`, no copy is made"""
+        magic, count, unit_len = _BINARY_HEADER.unpack_from(data)
+        if magic != _BINARY_MAGIC:
+            raise ValueError("Not a wearable series payload")
+        offset = _BINARY_HEADER.size
+        unit = bytes(data[offset:offset + unit_len]).decode()
+        offset += unit_len
+        timestamps = np.frombuffer(data, dtype="<i8", count=count, offset=offset)
+        values = np.frombuffer(data, dtype="<f8", count=count, offset=offset + 8 * count)
+        return cls(timestamps, values, unit)
+
+    # -- pydantic integration ---------------------------------------------
+
+    @classmethod
+    def validate(cls, value: Any) -> "WearableSeries":
+        if isinstance(value, WearableSeries):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(value)
+        if isinstance(value, dict) and "timestamps" in value:
+            return cls(parse_timestamps(value["timestamps"]), value.get("values", []),
+                       value.get("unit") or "")
+        if isinstance(value, (list, tuple)):
+            return cls.from_records(value)
+        raise ValueError("Expected a WearableSeries, a list of data points or a columnar dict")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls.validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda s: s.to_records()),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: Any, handler: Any) -> Dict[str, Any]:
+        return {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "value": {"type": "number"},
+                    "unit": {"type": "string"},
+                    "timestamp": {"type": "string", "format": "date-time"},
+                },
+            },
+        }
@@ -1,9 +1,14 @@
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from .timeseries import WearableSeries
 
 class WearableDataPoint(BaseModel):
-    """Model for a single data point from a wearable device"""
+    """Model for a single data point from a wearable device.
+
+    Series of samples are held as a columnar WearableSeries; lists of data
+    points (or dicts in this shape) are accepted wherever a series is expected.
+    """
     value: float
     unit: str
     timestamp: datetime
@@ -14,7 +19,7 @@ class HeartRateData(BaseModel):
     max: Optional[float] = None
     min: Optional[float] = None
     resting: Optional[float] = None
-    data_points: Optional[List[WearableDataPoint]] = None
+    data_points: Optional[WearableSeries] = None
 
 class ActivityData(BaseModel):
     """Model for activity data from wearable devices"""
@@ -23,7 +28,7 @@ class ActivityData(BaseModel):
     distance: Optional[float] = None
     active_minutes: Optional[int] = None
     exercise_time: Optional[int] = None
-    data_points: Optional[Dict[str, List[WearableDataPoint]]] = None
+    data_points: Optional[Dict[str, WearableSeries]] = None
 
 class SleepData(BaseModel):
     """Model for sleep data from wearable devices"""
@@ -33,7 +38,7 @@ class SleepData(BaseModel):
     deep_sleep: Optional[float] = None
     rem_sleep: Optional[float] = None
     light_sleep: Optional[float] = None
-    data_points: Optional[Dict[str, List[WearableDataPoint]]] = None
+    data_points: Optional[Dict[str, WearableSeries]] = None
 
 class VitalSigns(BaseModel):
     """Model for vital signs from wearable devices"""
@@ -41,7 +46,7 @@ class VitalSigns(BaseModel):
     respiratory_rate: Optional[float] = None
     temperature: Optional[float] = None
     blood_glucose: Optional[float] = None
-    data_points: Optional[Dict[str, List[WearableDataPoint]]] = None
+    data_points: Optional[Dict[str, WearableSeries]] = None
 
 class WearableData(BaseModel):
     """Model for wearable device data"""
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+from fastapi import Depends, HTTPException
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+from ..models.appointment import AppointmentStatus
+from ..utils.pagination import Cursor, keyset_condition
+from ..utils.supabase_client import get_async_db
+from ..utils.scheduling import MAX_APPOINTMENT_MINUTES
+from ..utils.booking import ReservationRetry, SlotConflict
+from .base import BaseRepository
+
+# Postgres error codes: exclusion constraint violation, and transient errors worth retrying
+EXCLUSION_VIOLATION = "23P01"
+RETRYABLE_CODES = ("40001", "40P01")
+
+class AppointmentRepository(BaseRepository):
+    """Async access to the `appointments` table"""
+
+    table = "appointments"
+
+    async def list_for_patient(self, patient_id: str) -> List[Dict[str, Any]]:
+        query = self.query().select("*").eq("patient_id", patient_id)\
+            .order("appointment_date", desc=True)
+        return await self.execute(query)
+
+    async def page_for_user(self, user_id: str, limit: int, after: Optional[Cursor] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` appointments the user is patient or doctor of, past `after` in (created_at, id) order"""
+        conditions = [f"or(patient_id.eq.{user_id},doctor_id.eq.{user_id})"]
+        if after is not None:
+            conditions.append(keyset_condition("created_at", after, desc=False))
+        query = self.all_of(self.query().select("*"), *conditions)
+        return await self.execute(self.order_by(query, "created_at", "id").limit(limit))
+
+    async def find_starting_between(self, doctor_id: str, start: datetime,
+                                    end: datetime) -> List[Dict[str, Any]]:
+        """Active (non-cancelled) appointments of a doctor starting within [start, end]"""
+        query = self.query().select("*")\
+            .eq("doctor_id", doctor_id)\
+            .neq("status", AppointmentStatus.CANCELLED.value)\
+            .gte("appointment_date", start.isoformat())\
+            .lte("appointment_date", end.isoformat())
+        return await self.execute(query)
+
+    async def find_overlapping(self, doctor_ids: Sequence[str], start: datetime,
+                               end: datetime) -> List[Dict[str, Any]]:
+        """Active appointments of the given doctors that may overlap [start, end), in one query"""
+        query = self.query().select("id,doctor_id,appointment_date,duration_minutes,status")\
+            .in_("doctor_id", list(doctor_ids))\
+            .neq("status", AppointmentStatus.CANCELLED.value)\
+            .gte("appointment_date", (start - timedelta(minutes=MAX_APPOINTMENT_MINUTES)).isoformat())\
+            .lt("appointment_date", end.isoformat())
+        return await self.execute(query)
+
+    async def load_day(self, doctor_id: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Bookings of one doctor that may overlap [start, end) (loader for the booking ledger)"""
+        return await self.find_overlapping([doctor_id], start, end)
+
+    async def list_by_ids(self, appointment_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        return await self.execute(self.query().select("*").in_("id", list(appointment_ids)))
+
+    async def _write_exclusive(self, query) -> List[Dict[str, Any]]:
+        """Run a write guarded by `appointments_no_overlap`, mapping its errors for the booking ledger"""
+        try:
+            result = await query.execute()
+        except APIError as e:
+            if e.code == EXCLUSION_VIOLATION:
+                raise SlotConflict(e.message)
+            if e.code in RETRYABLE_CODES:
+                raise ReservationRetry(e.message)
+            raise HTTPException(status_code=400, detail=e.message)
+        return result.data or []
+
+    async def insert_exclusive(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert one appointment; overlapping bookings are rejected by `appointments_no_overlap`"""
+        rows = await self._write_exclusive(self.query().insert(self.encode(data)))
+        if not rows:
+            raise HTTPException(status_code=500, detail="Failed to create appointment")
+        return rows[0]
+
+    async def insert_many_exclusive(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert many appointments in one statement; any overlap rejects the whole batch"""
+        return await self._write_exclusive(self.query().insert(self.encode(rows)))
+
+    async def update_exclusive(self, appointment_id: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self._write_exclusive(self.query().update(self.encode(data)).eq("id", appointment_id))
+
+    async def upsert_many_exclusive(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rewrite many full appointment rows in one statement (bulk reschedule)"""
+        return await self._write_exclusive(self.query().upsert(self.encode(rows), on_conflict="id"))
+
+    async def cancel(self, appointment_id: str) -> List[Dict[str, Any]]:
+        return await self.update(appointment_id, {
+            "status": AppointmentStatus.CANCELLED,
+            "updated_at": datetime.utcnow()
+        })
+
+    async def cancel_many(self, appointment_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """Cancel several appointments in one request; returns the rows that were found"""
+        query = self.query().update(self.encode({
+            "status": AppointmentStatus.CANCELLED,
+            "updated_at": datetime.utcnow()
+        })).in_("id", list(appointment_ids))
+        return await self.execute(query)
+
+def get_appointment_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> AppointmentRepository:
+    return AppointmentRepository(db)
@@ -0,0 +1,87 @@
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+from ..utils.pagination import Cursor
+
+# Base class for the async data-access layer.
+# Repositories wrap one Supabase table each and run every query through the
+# worker's pooled async PostgREST client, so handlers never block the event loop.
+
+class BaseRepository:
+    """Common helpers shared by all table repositories"""
+
+    table: str = ""
+
+    def __init__(self, db: AsyncPostgrestClient):
+        self.db = db
+
+    def query(self):
+        """Start a request builder on this repository's table"""
+        return self.db.from_(self.table)
+
+    @staticmethod
+    def encode(data: Any) -> Any:
+        """Make rows JSON-safe (datetimes, enums, models) before sending them"""
+        return jsonable_encoder(data)
+
+    @staticmethod
+    def any_of(query, *conditions: str):
+        """Add a PostgREST `or=(...)` filter, e.g. any_of(q, "patient_id.eq.1", "doctor_id.eq.1")"""
+        query.params = query.params.add("or", f"({','.join(conditions)})")
+        return query
+
+    @staticmethod
+    def order_by(query, *terms: str):
+        """Sort by several columns, e.g. order_by(q, "sent_at.desc", "id.desc").
+
+        PostgREST reads a single `order` parameter, so chained .order() calls would
+        drop every key but one; tie-breaks must be sent together.
+        """
+        query.params = query.params.set("order", ",".join(terms))
+        return query
+
+    @staticmethod
+    def all_of(query, *conditions: str):
+        """Add a PostgREST `and=(...)` filter whose conditions may themselves be or(...) groups"""
+        query.params = query.params.add("and", f"({','.join(conditions)})")
+        return query
+
+    async def execute(self, query) -> List[Dict[str, Any]]:
+        """Run a query and return its rows, turning PostgREST errors into HTTP errors"""
+        try:
+            result = await query.execute()
+        except APIError as e:
+            raise HTTPException(status_code=400, detail=e.message)
+        return result.data or []
+
+    async def count(self, query) -> int:
+        """Run a select built with `count=` and return only the row count PostgREST reports"""
+        try:
+            result = await query.limit(1).execute()
+        except APIError as e:
+            raise HTTPException(status_code=400, detail=e.message)
+        return result.count or 0
+
+    async def first(self, query) -> Optional[Dict[str, Any]]:
+        """Run a select and return its first row (or None)"""
+        rows = await self.execute(query.limit(1))
+        return rows[0] if rows else None
+
+    async def get(self, row_id: Any, columns: str = "*") -> Optional[Dict[str, Any]]:
+        return await self.first(self.query().select(columns).eq("id", row_id))
+
+    async def resume_cursor(self, row_id: Any, column: str) -> Cursor:
+        """Keyset cursor (column value, id) of the row an interrupted export stopped at"""
+        row = await self.get(row_id, f"id,{column}")
+        if row is None:
+            raise HTTPException(status_code=400, detail="Unknown row to resume after")
+        return str(row[column]), str(row["id"])
+
+    async def insert(self, data: Any) -> List[Dict[str, Any]]:
+        """Insert one row (dict) or many rows (list) in a single request"""
+        return await self.execute(self.query().insert(self.encode(data)))
+
+    async def update(self, row_id: Any, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self.execute(self.query().update(self.encode(data)).eq("id", row_id))
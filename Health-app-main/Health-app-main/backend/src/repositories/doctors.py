@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Sequence
+from fastapi import Depends, HTTPException
+from postgrest import AsyncPostgrestClient
+from ..utils.supabase_client import get_async_db
+from ..utils.scheduling import WorkingHours, parse_working_hours
+from .base import BaseRepository
+
+class DoctorRepository(BaseRepository):
+    """Async access to the `doctors` table"""
+
+    table = "doctors"
+
+    async def list_all(self) -> List[Dict[str, Any]]:
+        return await self.execute(self.query().select("*"))
+
+    async def list_by_ids(self, doctor_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        return await self.execute(self.query().select("*").in_("id", list(doctor_ids)))
+
+class DoctorAvailabilityRepository(BaseRepository):
+    """Async access to the `doctor_availability` table (weekly working hours)"""
+
+    table = "doctor_availability"
+
+    async def working_hours(self, doctor_ids: Sequence[str]) -> Dict[str, WorkingHours]:
+        """Working hours per doctor; doctors without rows are left out (default hours apply)"""
+        query = self.query().select("doctor_id,day_of_week,start_time,end_time,is_available")\
+            .in_("doctor_id", list(doctor_ids))
+        try:
+            rows = await self.execute(query)
+        except HTTPException:
+            # The table is optional; without it every doctor works the default hours
+            return {}
+        return parse_working_hours(rows)
+
+def get_doctor_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> DoctorRepository:
+    return DoctorRepository(db)
+
+
+def get_doctor_availability_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> DoctorAvailabilityRepository:
+    return DoctorAvailabilityRepository(db)
@@ -0,0 +1,76 @@
+from typing import Any, Dict, List, Optional
+from fastapi import Depends
+from postgrest import AsyncPostgrestClient
+from ..utils.pagination import Cursor, keyset_condition
+from ..utils.supabase_client import get_async_db
+from .base import BaseRepository
+
+class ConversationRepository(BaseRepository):
+    """Async access to the `conversations` table"""
+
+    table = "conversations"
+
+    # Columns of an inbox entry; the last_message_* summary is kept up to date by a trigger on `messages`
+    SUMMARY_COLUMNS = "id,patient_id,doctor_id,created_at,last_message_id,last_message_preview,last_message_at"
+
+    async def find(self, patient_id: str, doctor_id: str) -> Optional[Dict[str, Any]]:
+        query = self.query().select("*").eq("patient_id", patient_id).eq("doctor_id", doctor_id)
+        return await self.first(query)
+
+    async def page_for_user(self, user_id: str, limit: int, before: Optional[Cursor] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` of the user's conversations, most recent activity first, older than `before`"""
+        query = self.query().select(self.SUMMARY_COLUMNS)
+        conditions = [f"or(patient_id.eq.{user_id},doctor_id.eq.{user_id})"]
+        if before is not None:
+            conditions.append(keyset_condition("last_message_at", before, desc=True))
+        query = self.all_of(query, *conditions)
+        query = self.order_by(query, "last_message_at.desc", "id.desc").limit(limit)
+        return await self.execute(query)
+
+    async def ids_for_user(self, user_id: str) -> List[str]:
+        query = self.any_of(self.query().select("id"), f"patient_id.eq.{user_id}", f"doctor_id.eq.{user_id}")
+        return [str(row["id"]) for row in await self.execute(query)]
+
+    async def changed_since(self, user_id: str, since: str) -> List[Dict[str, Any]]:
+        """The user's conversations created or with a new message at or after `since`"""
+        query = self.query().select(self.SUMMARY_COLUMNS).gte("last_message_at", since)
+        query = self.any_of(query, f"patient_id.eq.{user_id}", f"doctor_id.eq.{user_id}")
+        return await self.execute(self.order_by(query, "last_message_at", "id"))
+
+class MessageRepository(BaseRepository):
+    """Async access to the `messages` table"""
+
+    table = "messages"
+
+    async def page(self, conversation_id: str, limit: int, before: Optional[Cursor] = None,
+                   after: Optional[Cursor] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` messages next to a cursor in (sent_at, id) order.
+
+        With `after` they are the oldest messages past it, ascending; otherwise the newest
+        messages before `before` (or overall), descending.
+        """
+        desc = after is None
+        query = self.query().select("*").eq("conversation_id", conversation_id)
+        cursor = after if after is not None else before
+        if cursor is not None:
+            query = self.all_of(query, keyset_condition("sent_at", cursor, desc=desc))
+        direction = ".desc" if desc else ""
+        query = self.order_by(query, f"sent_at{direction}", f"id{direction}").limit(limit)
+        return await self.execute(query)
+
+    async def since(self, conversation_ids: List[str], after: Optional[Cursor], limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` messages of the conversations past `after` (or from the first) in (sent_at, id) order"""
+        query = self.query().select("*").in_("conversation_id", conversation_ids)
+        if after is not None:
+            query = self.all_of(query, keyset_condition("sent_at", after, desc=False))
+        return await self.execute(self.order_by(query, "sent_at", "id").limit(limit))
+
+    async def list_for_user(self, user_id: str) -> List[Dict[str, Any]]:
+        query = self.query().select("*").eq("user_id", user_id).order("id", desc=True)
+        return await self.execute(query)
+
+def get_conversation_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> ConversationRepository:
+    return ConversationRepository(db)
+
+def get_message_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> MessageRepository:
+    return MessageRepository(db)
@@ -0,0 +1,20 @@
+from typing import Any, Dict, List
+from fastapi import Depends
+from postgrest import AsyncPostgrestClient
+from postgrest.types import ReturnMethod
+from ..utils.supabase_client import get_async_db
+from .base import BaseRepository
+
+class NotificationRepository(BaseRepository):
+    """Async access to the `notifications` table"""
+
+    table = "notifications"
+
+    async def insert_new(self, rows: List[Dict[str, Any]]):
+        """Insert notifications in one request, skipping ids that already exist (idempotent retries)"""
+        query = self.query().upsert(self.encode(rows), on_conflict="id", ignore_duplicates=True,
+                                    returning=ReturnMethod.minimal)
+        await self.execute(query)
+
+def get_notification_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> NotificationRepository:
+    return NotificationRepository(db)
@@ -0,0 +1,83 @@
+from typing import Any, Dict, List, Optional, Sequence
+from fastapi import Depends
+from postgrest import AsyncPostgrestClient
+from postgrest.types import CountMethod
+from ..utils.pagination import Cursor, quote
+from ..utils.supabase_client import get_async_db
+from .base import BaseRepository
+
+class PatientRepository(BaseRepository):
+    """Async access to the `patients` table"""
+
+    table = "patients"
+
+    @staticmethod
+    def _contains(text: str) -> str:
+        """ilike pattern matching `text` anywhere; wildcards typed by the user match literally"""
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"*{escaped}*"
+
+    def _filtered(self, query, search: Optional[str], name: Optional[str], email: Optional[str]):
+        if search:
+            pattern = quote(self._contains(search))
+            query = self.any_of(query, f"full_name.ilike.{pattern}", f"email.ilike.{pattern}")
+        if name:
+            query = query.ilike("full_name", self._contains(name))
+        if email:
+            query = query.eq("email", email)
+        return query
+
+    async def page(self, columns: str, limit: int, after: Optional[Cursor] = None, search: Optional[str] = None,
+                   name: Optional[str] = None, email: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` patients past `after` in (full_name, id) order, unnamed patients last"""
+        query = self._filtered(self.query().select(columns), search, name, email)
+        if after is not None:
+            value, row_id = after
+            if value is None:
+                query = self.all_of(query, "full_name.is.null", f"id.gt.{row_id}")
+            else:
+                value = quote(value)
+                query = self.all_of(query, f"or(full_name.gt.{value},and(full_name.eq.{value},id.gt.{row_id}),"
+                                           f"full_name.is.null)")
+        query = self.order_by(query, "full_name.nullslast", "id").limit(limit)
+        return await self.execute(query)
+
+    async def estimate_count(self, search: Optional[str] = None, name: Optional[str] = None,
+                             email: Optional[str] = None) -> int:
+        """Planner estimate of the matching rows (exact for small results), not a full scan"""
+        query = self._filtered(self.query().select("id", count=CountMethod.estimated), search, name, email)
+        return await self.count(query)
+
+    async def upsert(self, data: Any) -> List[Dict[str, Any]]:
+        """Upsert one row (dict) or many rows (list) in a single request"""
+        return await self.execute(self.query().upsert(self.encode(data)))
+
+class UserRepository(BaseRepository):
+    """Async access to the `users` table"""
+
+    table = "users"
+
+    async def get_full_name(self, user_id: str) -> Optional[str]:
+        user = await self.get(user_id, "full_name")
+        return user.get("full_name") if user else None
+
+    async def get_full_names(self, user_ids: Sequence[str]) -> Dict[str, str]:
+        """Full names of several users in one query, keyed by user id"""
+        if not user_ids:
+            return {}
+        rows = await self.execute(self.query().select("id,full_name").in_("id", list(set(user_ids))))
+        return {str(row["id"]): row["full_name"] for row in rows if row.get("full_name")}
+
+class ProfileRepository(BaseRepository):
+    """Async access to the `profiles` table"""
+
+    table = "profiles"
+
+def get_patient_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> PatientRepository:
+    return PatientRepository(db)
+
+def get_user_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> UserRepository:
+    return UserRepository(db)
+
+def get_profile_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> ProfileRepository:
+    return ProfileRepository(db)
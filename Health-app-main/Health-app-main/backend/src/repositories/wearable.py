@@ -0,0 +1,57 @@
+from typing import Any, Dict, List, Optional
+from fastapi import Depends
+from postgrest import AsyncPostgrestClient
+from postgrest.types import ReturnMethod
+from ..utils.pagination import Cursor, keyset_condition
+from ..utils.supabase_client import get_async_db
+from .base import BaseRepository
+
+class VitalUserRepository(BaseRepository):
+    """Async access to the `vital_users` table (our user id -> Vital user id)"""
+
+    table = "vital_users"
+
+class HealthReportRepository(BaseRepository):
+    """Async access to the `health_reports` table"""
+
+    table = "health_reports"
+
+    async def page_for_user(self, user_id: str, limit: int, after: Optional[Cursor] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` of the user's reports past `after` in (created_at, id) order"""
+        query = self.query().select("*").eq("user_id", user_id)
+        if after is not None:
+            query = self.all_of(query, keyset_condition("created_at", after, desc=False))
+        return await self.execute(self.order_by(query, "created_at", "id").limit(limit))
+
+class WearableSampleRepository(BaseRepository):
+    """Async access to the `wearable_samples` table (samples pushed by devices)"""
+
+    table = "wearable_samples"
+
+    async def insert_samples(self, rows: List[Dict[str, Any]]):
+        """Bulk insert already JSON-safe rows without echoing them back"""
+        await self.execute(self.query().insert(rows, returning=ReturnMethod.minimal))
+
+    async def page_for_user(self, user_id: str, limit: int, after: Optional[Cursor] = None,
+                            metric: Optional[str] = None, start: Optional[str] = None,
+                            end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` of the user's samples in [start, end) past `after` in (timestamp, id) order"""
+        query = self.query().select("*").eq("user_id", user_id)
+        if metric:
+            query = query.eq("metric", metric)
+        if start:
+            query = query.gte("timestamp", start)
+        if end:
+            query = query.lt("timestamp", end)
+        if after is not None:
+            query = self.all_of(query, keyset_condition("timestamp", after, desc=False))
+        return await self.execute(self.order_by(query, "timestamp", "id").limit(limit))
+
+def get_vital_user_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> VitalUserRepository:
+    return VitalUserRepository(db)
+
+def get_health_report_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> HealthReportRepository:
+    return HealthReportRepository(db)
+
+def get_wearable_sample_repository(db: AsyncPostgrestClient = Depends(get_async_db)) -> WearableSampleRepository:
+    return WearableSampleRepository(db)
@@ -1,10 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from ..models.appointment import Appointment, AppointmentCreate, AppointmentUpdate, AppointmentStatus
-from ..utils.supabase_client import get_supabase_client
-import uuid
-from src.utils.supabase_client import supabase
+from itertools import islice
+from ..models.appointment import (Appointment, AppointmentCreate, AppointmentUpdate, AppointmentStatus,
+                                  BulkAppointmentCancel, BulkAppointmentCreate, BulkAppointmentUpdate,
+                                  BulkItemResult, BulkItemStatus, BulkResult, DoctorAvailability)
+from ..models.doctor import Doctor
+from ..repositories.appointments import AppointmentRepository, get_appointment_repository
+from ..repositories.doctors import (DoctorAvailabilityRepository, DoctorRepository, get_doctor_availability_repository,
+                                   get_doctor_repository)
+from ..utils.scheduling import SlotEngine, booking_interval, days_touched, parse_datetime
+from ..utils.booking import ReservationRetry, SlotConflict, booking_ledger
+from ..utils.availability_cache import availability_cache
+from ..utils.doctor_directory import doctor_directory
+from ..utils.outbox import PATIENT_NAME, notification_outbox
+from ..utils.exports import FORMAT_PATTERN, export_response, iter_pages
+from .. import config
 from src.utils.auth import get_current_user_id
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
@@ -12,186 +25,418 @@ router = APIRouter(prefix="/appointments", tags=["appointments"])
 # Router for appointment-related API endpoints.
 # This file defines the routes for creating, updating, and retrieving appointments.
 
+def booked_notification(appointment: Dict[str, Any]) -> Dict[str, Any]:
+    """Outbox event telling the doctor a patient booked an appointment"""
+    return notification_outbox.event(
+        appointment["doctor_id"], "New Appointment Booked",
+        f"{PATIENT_NAME} has booked an appointment with you.",
+        patient_id=appointment["patient_id"]
+    )
+
 @router.post("/", response_model=Appointment)
 async def create_appointment(
-    appointment: AppointmentCreate
+    appointment: AppointmentCreate,
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
 ):
-    supabase = get_supabase_client()
     """Create a new appointment"""
-    # Check if the time slot is available
-    existing = await check_availability(
-        appointment.doctor_id,
-        appointment.appointment_date,
-        appointment.duration_minutes
-    )
-    if existing:
-        raise HTTPException(status_code=400, detail="Time slot not available")
-
-    # Create appointment in database
     data = {
         **appointment.model_dump(),
         "status": AppointmentStatus.SCHEDULED,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
+
+    # Check and insert atomically: the ledger serializes overlapping requests for
+    # this doctor and the insert is the only database round trip
+    start = appointment.appointment_date
+    end = start + timedelta(minutes=appointment.duration_minutes)
+    try:
+        created = await booking_ledger.reserve(appointment.doctor_id, start, end, data,
+                                               load=appointments.load_day,
+                                               insert=appointments.insert_exclusive)
+    except SlotConflict:
+        raise HTTPException(status_code=400, detail="Time slot not available")
+    except ReservationRetry:
+        raise HTTPException(status_code=503, detail="Booking is busy, retry later",
+                            headers={"Retry-After": "1"})
+    await availability_cache.invalidate(appointment.doctor_id, start, end)
+
+    # Notify the doctor in the background; the patient's name is filled in at dispatch
+    await notification_outbox.publish([booked_notification(created)])
     
-    result = supabase.table("appointments").insert(data).execute()
-    
-    if not result.data:
-        raise HTTPException(status_code=500, detail="Failed to create appointment")
-    
-    # Send notification to doctor
-    # Fetch patient name (assuming patient_id is in appointment)
-    patient = supabase.table("users").select("full_name").eq("id", appointment.patient_id).single().execute().data
-    patient_name = patient["full_name"] if patient and "full_name" in patient else "A patient"
-    notification = {
-        "id": str(uuid.uuid4()),
-        "user_id": appointment.doctor_id,
-        "title": "New Appointment Booked",
-        "message": f"{patient_name} has booked an appointment with you.",
-        "created_at": datetime.utcnow(),
-        "read": False
-    }
-    supabase.table("notifications").insert(notification).execute()
-    
-    return result.data[0]
+    return created
 
 # Endpoint to create a new appointment.
 # It validates the appointment data and stores it in the database.
 
 @router.get("/", response_model=List[Appointment])
-async def get_appointments(user_id: str = Depends(get_current_user_id)):
-    result = supabase.table('appointments').select('*').eq('user_id', user_id).order('date', desc=True).execute()
-    if result.error:
-        raise HTTPException(status_code=400, detail=result.error.message)
-    return result.data
+async def get_appointments(
+    user_id: str = Depends(get_current_user_id),
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
+):
+    return await appointments.list_for_patient(user_id)
 
 # Endpoint to retrieve appointments for a specific user.
 # It filters appointments based on user ID and returns the results.
 
+@router.get("/export")
+async def export_appointments(
+    request: Request,
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN, description="ndjson or csv"),
+    after: Optional[str] = Query(None, description="Resume after this appointment id (the last one received)"),
+    user_id: str = Depends(get_current_user_id),
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
+):
+    """Full history of the caller's appointments (as patient or doctor), oldest first, streamed"""
+    cursor = await appointments.resume_cursor(after, "created_at") if after else None
+
+    async def fetch(after, limit):
+        return await appointments.page_for_user(user_id, limit, after)
+
+    pages = iter_pages(fetch, lambda row: (str(row["created_at"]), str(row["id"])),
+                       config.EXPORT_PAGE_SIZE, after=cursor)
+    return export_response(request, pages, format, "appointments")
+
 @router.get("/availability")
 async def check_availability(
     doctor_id: str,
     date: datetime,
-    duration: int = 30
+    duration: int = 30,
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
 ):
-    supabase = get_supabase_client()
     """Check if a time slot is available"""
+    date = parse_datetime(date)
     end_time = date + timedelta(minutes=duration)
     
-    # Check for overlapping appointments
-    result = supabase.table("appointments")\
-        .select("*")\
-        .eq("doctor_id", doctor_id)\
-        .neq("status", AppointmentStatus.CANCELLED)\
-        .lte("appointment_date", end_time)\
-        .gte("appointment_date", date)\
-        .execute()
+    # Busy intervals of the days the slot touches, from the doctor-day cache
+    days = days_touched(date, end_time)
+    bookings = await availability_cache.bookings([doctor_id], days[0], days[-1], appointments.find_overlapping)
         
-    return len(result.data) == 0
+    return not bookings[doctor_id].overlaps(date, end_time)
 
 @router.get("/slots")
 async def get_available_slots(
     doctor_id: str,
     date: datetime,
-    duration: int = 30
+    duration: int = Query(30, ge=15, le=120),
+    end_date: Optional[datetime] = Query(None, description="Last day of a multi-day range (inclusive)"),
+    step: int = Query(30, ge=5, le=240, description="Minutes between candidate slot starts"),
+    appointments: AppointmentRepository = Depends(get_appointment_repository),
+    availability: DoctorAvailabilityRepository = Depends(get_doctor_availability_repository)
 ):
-    supabase = get_supabase_client()
-    """Get available time slots for a given day"""
-    # Get doctor's schedule (assuming 9 AM to 5 PM)
-    start_time = date.replace(hour=9, minute=0)
-    end_time = date.replace(hour=17, minute=0)
-    
-    # Get all appointments for that day
-    result = supabase.table("appointments")\
-        .select("*")\
-        .eq("doctor_id", doctor_id)\
-        .neq("status", AppointmentStatus.CANCELLED)\
-        .gte("appointment_date", start_time)\
-        .lte("appointment_date", end_time)\
-        .execute()
-    
-    booked_slots = [(a["appointment_date"], 
-                     a["appointment_date"] + timedelta(minutes=a["duration_minutes"]))
-                    for a in result.data]
-    
-    # Generate available slots
-    available_slots = []
-    current = start_time
-    
-    while current + timedelta(minutes=duration) <= end_time:
-        slot_end = current + timedelta(minutes=duration)
-        is_available = True
-        
-        for booked_start, booked_end in booked_slots:
-            if (current < booked_end and slot_end > booked_start):
-                is_available = False
-                break
-                
-        if is_available:
-            available_slots.append(current)
-            
-        current += timedelta(minutes=30)  # 30-minute intervals
-        
-    return available_slots
+    """Get available time slots for a day (or a range of days) within the doctor's working hours"""
+    start_day = date.date()
+    end_day = end_date.date() if end_date else start_day
+    if end_day < start_day or (end_day - start_day).days >= config.MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+
+    # Cached doctor-days plus at most one query for the rest, then a single merge
+    # pass per working window
+    bookings = (await availability_cache.bookings([doctor_id], start_day, end_day,
+                                                  appointments.find_overlapping))[doctor_id]
+
+    engine = SlotEngine(await availability.working_hours([doctor_id]))
+    return engine.free_slots(doctor_id, bookings, start_day, end_day, duration, step)
+
+@router.get("/availability/search", response_model=List[DoctorAvailability])
+async def search_availability(
+    start_date: datetime,
+    end_date: datetime,
+    specialty: Optional[str] = None,
+    doctor_ids: Optional[List[str]] = Query(None),
+    duration: int = Query(30, ge=15, le=120),
+    step: int = Query(30, ge=5, le=240, description="Minutes between candidate slot starts"),
+    slots_per_doctor: int = Query(20, ge=1, le=500),
+    doctors: DoctorRepository = Depends(get_doctor_repository),
+    appointments: AppointmentRepository = Depends(get_appointment_repository),
+    availability: DoctorAvailabilityRepository = Depends(get_doctor_availability_repository)
+):
+    """Free slots of every matching doctor over a date range, streamed as NDJSON earliest first"""
+    if not specialty and not doctor_ids:
+        raise HTTPException(status_code=400, detail="Provide a specialty or doctor_ids")
+    start_day, end_day = start_date.date(), end_date.date()
+    if end_day < start_day or (end_day - start_day).days >= config.MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+
+    await doctor_directory.ensure_loaded(doctors.list_all)
+    if doctor_ids:
+        rows = doctor_directory.by_ids(doctor_ids)
+        # Doctors registered on another worker since the last directory reload
+        missing = [doctor_id for doctor_id in doctor_ids if doctor_directory.get(doctor_id) is None]
+        if missing:
+            rows += await doctors.list_by_ids(missing)
+    else:
+        rows = doctor_directory.by_specialty(specialty)
+    if specialty and doctor_ids:
+        rows = [row for row in rows if str(row.get("specialty", "")).lower() == specialty.lower()]
+    candidates: List[Doctor] = []
+    for row in rows:
+        try:
+            candidates.append(Doctor.model_validate(row))
+        except ValidationError:
+            continue  # incomplete directory entries (e.g. no location yet) are skipped
+    if len(candidates) > config.MAX_AVAILABILITY_DOCTORS:
+        raise HTTPException(status_code=400, detail="Too many doctors; narrow the search")
+    ids = [doctor.id for doctor in candidates]
+
+    # Cached doctor-days, one appointments query for the missing ones and one
+    # working-hours query for every doctor
+    bookings = await availability_cache.bookings(ids, start_day, end_day, appointments.find_overlapping)
+    engine = SlotEngine(await availability.working_hours(ids) if ids else {})
+
+    # Only each doctor's first free slot is needed to rank them; the rest are
+    # generated while that doctor's line is being written
+    now = datetime.utcnow()
+    ranked = []
+    for index, doctor in enumerate(candidates):
+        slots = engine.iter_free_slots(doctor.id, bookings[doctor.id], start_day, end_day,
+                                       duration, step, not_before=now)
+        earliest = next(slots, None)
+        if earliest is not None:
+            ranked.append((earliest, index, doctor, slots))
+    ranked.sort(key=lambda item: item[:2])
+
+    def lines():
+        for earliest, _, doctor, slots in ranked:
+            entry = DoctorAvailability(doctor=doctor, earliest=earliest,
+                                       slots=[earliest, *islice(slots, slots_per_doctor - 1)])
+            yield entry.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def forget_bookings(rows: List[Dict[str, Any]]):
+    """Drop cached availability of the doctor-days these appointment rows occupy (or occupied)"""
+    for row in rows:
+        start, end = booking_interval(row)
+        booking_ledger.invalidate(str(row["doctor_id"]), start, end)
+        await availability_cache.invalidate(str(row["doctor_id"]), start, end)
+
+def involves(row: Dict[str, Any], user_id: str) -> bool:
+    """Whether the user is the patient or the doctor of this appointment"""
+    return user_id in (str(row["patient_id"]), str(row["doctor_id"]))
+
+def forbidden(index: int, appointment_id: Optional[str] = None) -> BulkItemResult:
+    return BulkItemResult(index=index, status=BulkItemStatus.FORBIDDEN, id=appointment_id,
+                          detail="Not a participant of this appointment")
+
+def bulk_result(results: List[BulkItemResult]) -> BulkResult:
+    done = (BulkItemStatus.CREATED, BulkItemStatus.UPDATED, BulkItemStatus.CANCELLED)
+    succeeded = sum(result.status in done for result in results)
+    return BulkResult(succeeded=succeeded, failed=len(results) - succeeded,
+                      results=sorted(results, key=lambda result: result.index))
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_appointments(
+    batch: BulkAppointmentCreate,
+    user_id: str = Depends(get_current_user_id),
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
+):
+    """Create many appointments with one conflict check, one insert and one notification write"""
+    now = datetime.utcnow()
+    rows = [{**item.model_dump(), "status": AppointmentStatus.SCHEDULED, "created_at": now, "updated_at": now}
+            for item in batch.items]
+    # Callers may only book appointments they take part in
+    permitted = [index for index, row in enumerate(rows) if involves(row, user_id)]
+    slots = [(rows[i]["doctor_id"], *booking_interval(rows[i])) for i in permitted]
+
+    # Conflicts (with existing bookings and within the batch) are found in memory
+    # against one fetch of the affected doctors' bookings
+    accepted = await booking_ledger.hold_many(slots, appointments.find_overlapping)
+    pending = [index for index, free in zip(permitted, accepted) if free]
+    created: Dict[int, Dict[str, Any]] = {}
+    errors: Dict[int, BulkItemResult] = {}
+    try:
+        if pending:
+            try:
+                created = dict(zip(pending, await appointments.insert_many_exclusive([rows[i] for i in pending])))
+            except (SlotConflict, ReservationRetry, HTTPException):
+                # Another worker took one of the slots or a row was rejected: insert one by one
+                for index in pending:
+                    try:
+                        created[index] = await appointments.insert_exclusive(rows[index])
+                    except SlotConflict:
+                        errors[index] = BulkItemResult(index=index, status=BulkItemStatus.CONFLICT,
+                                                       detail="Time slot not available")
+                    except (ReservationRetry, HTTPException) as e:
+                        errors[index] = BulkItemResult(index=index, status=BulkItemStatus.FAILED,
+                                                       detail=getattr(e, "detail", str(e)))
+    finally:
+        booking_ledger.release_many(slots, accepted, [index in created for index in permitted])
+
+    created_rows = list(created.values())
+    for row in created_rows:
+        await availability_cache.invalidate(str(row["doctor_id"]), *booking_interval(row))
+    await notification_outbox.publish(booked_notification(row) for row in created_rows)
+
+    results = []
+    allowed = set(permitted)
+    for index in range(len(rows)):
+        if index in created:
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.CREATED, id=str(created[index]["id"])))
+        elif index in errors:
+            results.append(errors[index])
+        elif index not in allowed:
+            results.append(forbidden(index))
+        else:
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.CONFLICT, detail="Time slot not available"))
+    return bulk_result(results)
+
+@router.put("/bulk", response_model=BulkResult)
+async def bulk_update_appointments(
+    batch: BulkAppointmentUpdate,
+    user_id: str = Depends(get_current_user_id),
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
+):
+    """Reschedule or edit many appointments with one fetch, one conflict check and one write"""
+    now = datetime.utcnow()
+    existing = {str(row["id"]): row for row in await appointments.list_by_ids([item.id for item in batch.items])}
+    results: List[BulkItemResult] = []
+    updates: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+    seen = set()
+    for index, item in enumerate(batch.items):
+        if item.id not in existing:
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.NOT_FOUND, id=item.id,
+                                          detail="Appointment not found"))
+        elif not involves(existing[item.id], user_id):
+            results.append(forbidden(index, item.id))
+        elif item.id in seen:
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.FAILED, id=item.id,
+                                          detail="Appointment appears more than once in the batch"))
+        else:
+            seen.add(item.id)
+            changes = {**item.model_dump(exclude_unset=True, exclude={"id"}), "updated_at": now}
+            updates[index] = (changes, {**existing[item.id], **changes})
+
+    # Only items that take up a new time need a conflict check; their old slots are free
+    moving = []
+    for index, (changes, row) in updates.items():
+        old = existing[str(row["id"])]
+        active = row.get("status") != AppointmentStatus.CANCELLED
+        if active and (booking_interval(row) != booking_interval(old)
+                       or old.get("status") == AppointmentStatus.CANCELLED.value):
+            moving.append(index)
+    slots = [(str(updates[i][1]["doctor_id"]), *booking_interval(updates[i][1])) for i in moving]
+    accepted = await booking_ledger.hold_many(slots, appointments.find_overlapping,
+                                              ignore_ids={str(updates[i][1]["id"]) for i in moving})
+    for index, free in zip(moving, accepted):
+        if not free:
+            del updates[index]
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.CONFLICT,
+                                          id=batch.items[index].id, detail="Time slot not available"))
+
+    written: Dict[int, Dict[str, Any]] = {}
+    try:
+        if updates:
+            try:
+                rows = await appointments.upsert_many_exclusive([row for _, row in updates.values()])
+                by_id = {str(row["id"]): row for row in rows}
+                written = {index: by_id[str(row["id"])] for index, (_, row) in updates.items()
+                           if str(row["id"]) in by_id}
+            except (SlotConflict, ReservationRetry, HTTPException):
+                # Fall back to one update per item to find out which ones fail
+                for index, (changes, row) in updates.items():
+                    try:
+                        rows = await appointments.update_exclusive(str(row["id"]), changes)
+                        if rows:
+                            written[index] = rows[0]
+                    except SlotConflict:
+                        results.append(BulkItemResult(index=index, status=BulkItemStatus.CONFLICT,
+                                                      id=str(row["id"]), detail="Time slot not available"))
+                    except (ReservationRetry, HTTPException) as e:
+                        results.append(BulkItemResult(index=index, status=BulkItemStatus.FAILED,
+                                                      id=str(row["id"]), detail=getattr(e, "detail", str(e))))
+    finally:
+        booking_ledger.release_many(slots, accepted, [i in written for i in moving])
+
+    await forget_bookings([existing[str(row["id"])] for row in written.values()] + list(written.values()))
+    reported = {result.index for result in results}
+    for index, (_, row) in updates.items():
+        if index in written:
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.UPDATED, id=str(row["id"])))
+        elif index not in reported:
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.FAILED, id=str(row["id"]),
+                                          detail="Failed to update appointment"))
+    return bulk_result(results)
+
+@router.post("/bulk/cancel", response_model=BulkResult)
+async def bulk_cancel_appointments(
+    batch: BulkAppointmentCancel,
+    user_id: str = Depends(get_current_user_id),
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
+):
+    """Cancel many of the caller's appointments in one request"""
+    existing = {str(row["id"]): row for row in await appointments.list_by_ids(batch.ids)}
+    owned = {appointment_id for appointment_id, row in existing.items() if involves(row, user_id)}
+    rows = await appointments.cancel_many(sorted(owned)) if owned else []
+    await forget_bookings(rows)
+    cancelled = {str(row["id"]) for row in rows}
+    results = []
+    for index, appointment_id in enumerate(batch.ids):
+        if appointment_id in cancelled:
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.CANCELLED, id=appointment_id))
+        elif appointment_id in existing and appointment_id not in owned:
+            results.append(forbidden(index, appointment_id))
+        else:
+            results.append(BulkItemResult(index=index, status=BulkItemStatus.NOT_FOUND, id=appointment_id,
+                                          detail="Appointment not found"))
+    return bulk_result(results)
 
 @router.put("/{appointment_id}", response_model=Appointment)
 async def update_appointment(
     appointment_id: str,
-    appointment: AppointmentUpdate
+    appointment: AppointmentUpdate,
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
 ):
-    supabase = get_supabase_client()
     """Update an appointment"""
     # Check if appointment exists
-    existing = supabase.table("appointments")\
-        .select("*")\
-        .eq("id", appointment_id)\
-        .execute()
+    existing = await appointments.get(appointment_id)
         
-    if not existing.data:
+    if not existing:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    # If changing date/time, check availability
-    if appointment.appointment_date:
-        is_available = await check_availability(
-            existing.data[0]["doctor_id"],
-            appointment.appointment_date,
-            appointment.duration_minutes or existing.data[0]["duration_minutes"]
-        )
-        if not is_available:
-            raise HTTPException(status_code=400, detail="Time slot not available")
-    
-    # Update appointment
     data = {
         **appointment.model_dump(exclude_unset=True),
         "updated_at": datetime.utcnow()
     }
-    
-    result = supabase.table("appointments")\
-        .update(data)\
-        .eq("id", appointment_id)\
-        .execute()
+    updated = {**existing, **data}
+
+    # A new time (or a cancelled appointment made active again) is checked and written
+    # under the doctor's booking lock, like a new booking
+    start, end = booking_interval(updated)
+    active = updated.get("status") != AppointmentStatus.CANCELLED
+    if active and ((start, end) != booking_interval(existing)
+                   or existing.get("status") == AppointmentStatus.CANCELLED.value):
+        try:
+            result = await booking_ledger.move(str(existing["doctor_id"]), appointment_id, start, end,
+                                               load=appointments.load_day,
+                                               write=lambda: appointments.update_exclusive(appointment_id, data))
+        except SlotConflict:
+            raise HTTPException(status_code=409, detail="Time slot not available")
+        except ReservationRetry:
+            raise HTTPException(status_code=503, detail="Booking is busy, retry later",
+                                headers={"Retry-After": "1"})
+    else:
+        result = await appointments.update(appointment_id, data)
         
-    if not result.data:
+    if not result:
         raise HTTPException(status_code=500, detail="Failed to update appointment")
+
+    # The doctor's cached busy intervals for the old and new days are stale now
+    await forget_bookings([existing, result[0]])
         
-    return result.data[0]
+    return result[0]
 
 @router.delete("/{appointment_id}")
 async def cancel_appointment(
-    appointment_id: str
+    appointment_id: str,
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
 ):
-    supabase = get_supabase_client()
     """Cancel an appointment"""
-    result = supabase.table("appointments")\
-        .update({
-            "status": AppointmentStatus.CANCELLED,
-            "updated_at": datetime.utcnow()
-        })\
-        .eq("id", appointment_id)\
-        .execute()
+    result = await appointments.cancel(appointment_id)
         
-    if not result.data:
+    if not result:
         raise HTTPException(status_code=404, detail="Appointment not found")
+
+    await forget_bookings(result)
         
     return {"message": "Appointment cancelled successfully"} 
\ No newline at end of file
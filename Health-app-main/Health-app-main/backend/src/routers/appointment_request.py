@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from src.utils.supabase_client import supabase
+from src.repositories.appointments import AppointmentRepository, get_appointment_repository
 from src.utils.auth import get_current_user_id
 
 router = APIRouter(prefix="/appointment-requests", tags=["Appointment Requests"])
@@ -9,21 +9,22 @@ async def request_appointment(
     request: Request,
     doctor_id: int,
     message: str,
-    user_id: str = Depends(get_current_user_id)
+    user_id: str = Depends(get_current_user_id),
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
 ):
     data = {
         "doctor_id": doctor_id,
         "patient_id": user_id,
         "message": message,
     }
-    result = supabase.table("appointments").insert(data).execute()
-    if result.error:
-        raise HTTPException(status_code=500, detail=result.error.message)
-    return {"success": True, "appointment": result.data[0]}
+    result = await appointments.insert(data)
+    if not result:
+        raise HTTPException(status_code=500, detail="Failed to create appointment request")
+    return {"success": True, "appointment": result[0]}
 
 @router.get("/")
-async def get_appointments(user_id: str = Depends(get_current_user_id)):
-    result = supabase.table("appointments").select("*").eq("patient_id", user_id).execute()
-    if result.error:
-        raise HTTPException(status_code=500, detail=result.error.message)
-    return result.data 
\ No newline at end of file
+async def get_appointments(
+    user_id: str = Depends(get_current_user_id),
+    appointments: AppointmentRepository = Depends(get_appointment_repository)
+):
+    return await appointments.list_for_patient(user_id) 
\ No newline at end of file
@@ -1,37 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from typing import List
-from ..models.doctor import Doctor
-from ..utils.supabase_client import get_supabase_client
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, Response
+from typing import List, Optional
+from ..models.doctor import Doctor, DoctorSearchPage, NearbyDoctor
+from ..repositories.doctors import DoctorRepository, get_doctor_repository
+from .. import config
+from ..utils.doctor_directory import doctor_directory
 
 router = APIRouter(prefix="/doctors", tags=["doctors"])
 
 @router.get("/locations", response_model=List[Doctor])
-async def get_doctors_locations():
-    supabase = get_supabase_client()
+async def get_doctors_locations(request: Request, doctors: DoctorRepository = Depends(get_doctor_repository)):
     """Get all doctors' locations"""
-    result = supabase.table("doctors").select("*").execute()
-    if not result.data:
+    await doctor_directory.ensure_loaded(doctors.list_all)
+    if not doctor_directory.stats()["listed"]:
         raise HTTPException(status_code=404, detail="No doctors found")
-    return result.data
+    # Served as stored bytes; the listing is only re-encoded after a doctor changes
+    body, etag = doctor_directory.listing()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
-@router.get("/nearby", response_model=List[Doctor])
+@router.get("/nearby", response_model=List[NearbyDoctor])
 async def get_doctors_nearby(
-    latitude: float = Query(..., description="User's latitude"),
-    longitude: float = Query(..., description="User's longitude"),
-    radius: float = Query(10, description="Search radius in kilometers")
+    latitude: float = Query(..., ge=-90, le=90, description="User's latitude"),
+    longitude: float = Query(..., ge=-180, le=180, description="User's longitude"),
+    radius: float = Query(10, gt=0, le=1000, description="Search radius in kilometers"),
+    limit: int = Query(20, ge=1, le=200, description="Maximum number of doctors"),
+    doctors: DoctorRepository = Depends(get_doctor_repository)
 ):
-    supabase = get_supabase_client()
-    """Get doctors near a user's location"""
-    # This is a simplified example. In a real application, you would use a more sophisticated
-    # query to find doctors within a certain radius of the user's location.
-    result = supabase.table("doctors").select("*").execute()
-    if not result.data:
+    """Get doctors within `radius` km of a user's location, nearest first"""
+    await doctor_directory.ensure_loaded(doctors.list_all)
+    result = [
+        {**doctor, "distance_km": round(distance, 3)}
+        for distance, doctor in doctor_directory.nearby(latitude, longitude, radius, limit)
+    ]
+    if not result:
         raise HTTPException(status_code=404, detail="No doctors found")
-    return result.data
+    return result
+
+@router.get("/search", response_model=DoctorSearchPage)
+async def search_doctors(
+    q: Optional[str] = Query(None, max_length=200, description="Words or word prefixes, e.g. 'card hin' for typeahead"),
+    specialty: Optional[str] = Query(None, description="Exact specialty, ignoring case"),
+    language: Optional[str] = Query(None, description="Spoken language, ignoring case"),
+    clinic: Optional[str] = Query(None, description="Exact clinic affiliation, ignoring case"),
+    latitude: Optional[float] = Query(None, ge=-90, le=90, description="Search near this point"),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    radius: float = Query(50, gt=0, le=1000, description="Kilometers around latitude/longitude"),
+    limit: int = Query(20, ge=1, le=config.MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=10000),
+    doctors: DoctorRepository = Depends(get_doctor_repository)
+):
+    """Doctors matching every word (as a prefix) and filter, by name or nearest first with a location"""
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(status_code=400, detail="Provide both latitude and longitude")
+    await doctor_directory.ensure_loaded(doctors.list_all)
+    found, more = doctor_directory.search(q, limit, offset, latitude=latitude, longitude=longitude, radius_km=radius,
+                                          specialty=specialty, language=language, clinic=clinic)
+    items = [doctor if distance is None else {**doctor, "distance_km": round(distance, 3)}
+             for distance, doctor in found]
+    return {"items": items, "next_offset": offset + limit if more else None}
 
 @router.post("/sample")
-async def create_sample_doctors():
-    supabase = get_supabase_client()
+async def create_sample_doctors(doctors: DoctorRepository = Depends(get_doctor_repository)):
     """Create sample doctors in the database for testing purposes"""
     sample_doctors = [
         {"id": "1", "name": "Dr. John Doe", "specialty": "Cardiology", "latitude": 30.3165, "longitude": 78.0322},
@@ -55,8 +85,9 @@ async def create_sample_doctors():
         {"id": "19", "name": "Dr. Richard Pink", "specialty": "Urology", "latitude": 30.3165, "longitude": 78.0322},
         {"id": "20", "name": "Dr. Karen Brown", "specialty": "Rheumatology", "latitude": 30.3165, "longitude": 78.0322}
     ]
-    for doctor in sample_doctors:
-        supabase.table("doctors").insert(doctor).execute()
+    result = await doctors.insert(sample_doctors)
+    for doctor in result:
+        doctor_directory.upsert(doctor)
     return {"message": "Sample doctors created successfully"}
 
 @router.post("/register", response_model=Doctor)
@@ -65,12 +96,12 @@ async def register_doctor(
     name: str = Body(...),
     specialty: str = Body(...),
     latitude: float = Body(...),
-    longitude: float = Body(...)
+    longitude: float = Body(...),
+    doctors: DoctorRepository = Depends(get_doctor_repository)
 ):
-    supabase = get_supabase_client()
     # Check if doctor already exists
-    existing = supabase.table("doctors").select("*").eq("id", id).execute()
-    if existing.data:
+    existing = await doctors.get(id)
+    if existing:
         raise HTTPException(status_code=400, detail="Doctor already exists")
     doctor = {
         "id": id,
@@ -79,7 +110,9 @@ async def register_doctor(
         "latitude": latitude,
         "longitude": longitude
     }
-    result = supabase.table("doctors").insert(doctor).execute()
-    if not result.data:
+    result = await doctors.insert(doctor)
+    if not result:
         raise HTTPException(status_code=500, detail="Failed to register doctor")
-    return result.data[0] 
\ No newline at end of file
+    # Make the new doctor searchable right away
+    doctor_directory.upsert(result[0])
+    return result[0] 
\ No newline at end of file
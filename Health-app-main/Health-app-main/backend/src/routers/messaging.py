@@ -1,9 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from ..utils.supabase_client import get_supabase_client
-from uuid import uuid4
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, WebSocket, WebSocketDisconnect
+from ..repositories.messaging import (
+    ConversationRepository,
+    MessageRepository,
+    get_conversation_repository,
+    get_message_repository
+)
+from .. import config
+from ..utils.exports import FORMAT_PATTERN, export_response, iter_pages
+from ..utils.message_hub import Subscription, message_hub, user_topic
+from ..utils.pagination import decode_cursor, decode_token, encode_token, page
+from ..utils.scheduling import parse_datetime
+from uuid import UUID, uuid4
 from pydantic import BaseModel
-from src.utils.supabase_client import supabase
-from src.utils.auth import get_current_user_id
+from src.utils.auth import InvalidToken, get_current_user_id, token_verifier, websocket_token
 
 router = APIRouter(prefix="/messaging", tags=["messaging"])
 
@@ -16,76 +28,293 @@ class MessageBody(BaseModel):
     content: str
 
 @router.get("/conversations")
-def list_conversations():
-    supabase = get_supabase_client()
-    # user_id = current_user["id"] if isinstance(current_user, dict) else current_user.id
-    # Get conversations where user is patient or doctor
-    # You may need to adjust this logic if you want to filter by user
-    resp = supabase.table("conversations").select("*").execute()
-    return resp.data
+async def list_conversations(
+    before: Optional[str] = Query(None, description="Cursor from a previous page's `before`"),
+    limit: int = Query(config.CONVERSATIONS_PAGE_SIZE, ge=1, le=config.MAX_PAGE_SIZE),
+    user_id: str = Depends(get_current_user_id),
+    conversations: ConversationRepository = Depends(get_conversation_repository)
+):
+    """The caller's conversations, most recent activity first, with last-message previews"""
+    cursor = decode_cursor(before) if before else None
+    rows = await conversations.page_for_user(user_id, limit + 1, before=cursor)
+    return page(rows, "last_message_at", limit, desc=True, more_before=False, more_after=False,
+                chronological=False)
+
+async def participant_conversation(conversations: ConversationRepository, conversation_id: str,
+                                   user_id: str) -> Dict[str, Any]:
+    """The conversation's participants, or 403 unless the caller is its patient or doctor"""
+    conv = await conversations.get(conversation_id, "patient_id,doctor_id")
+    if not conv or user_id not in (str(conv["patient_id"]), str(conv["doctor_id"])):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return conv
 
 @router.post("/conversations")
-def create_conversation(patient_id: str, doctor_id: str):
-    supabase = get_supabase_client()
+async def create_conversation(
+    patient_id: str,
+    doctor_id: str,
+    user_id: str = Depends(get_current_user_id),
+    conversations: ConversationRepository = Depends(get_conversation_repository)
+):
+    if user_id not in (patient_id, doctor_id):
+        raise HTTPException(status_code=403, detail="Not authorized")
     # Check if conversation exists
-    resp = supabase.table("conversations").select("*") \
-        .eq("patient_id", patient_id).eq("doctor_id", doctor_id).single().execute()
-    if resp.data:
-        return resp.data
+    existing = await conversations.find(patient_id, doctor_id)
+    if existing:
+        return existing
     # Create new conversation
     new_conv = {
         "id": str(uuid4()),
         "patient_id": patient_id,
         "doctor_id": doctor_id
     }
-    supabase.table("conversations").insert(new_conv).execute()
+    await conversations.insert(new_conv)
+    # Wakes both participants' long-polling /messaging/sync requests
+    await message_hub.notify_users([patient_id, doctor_id], {"type": "conversation", "conversation": new_conv})
     return new_conv
 
 @router.get("/messages")
-def list_messages(conversation_id: str = Query(...)):
-    supabase = get_supabase_client()
-    # Check user is part of conversation (removed user check)
-    conv = supabase.table("conversations").select("*").eq("id", conversation_id).single().execute().data
-    # user_id = current_user["id"] if isinstance(current_user, dict) else current_user.id
-    # if not conv or (user_id not in [conv["patient_id"], conv["doctor_id"]]):
-    #     raise HTTPException(status_code=403, detail="Not authorized")
-    resp = supabase.table("messages").select("*").eq("conversation_id", conversation_id).order("sent_at").execute()
-    return resp.data
+async def list_messages(
+    conversation_id: str = Query(...),
+    before: Optional[str] = Query(None, description="Cursor: page of messages older than this one"),
+    after: Optional[str] = Query(None, description="Cursor: page of messages newer than this one"),
+    limit: int = Query(config.MESSAGES_PAGE_SIZE, ge=1, le=config.MAX_PAGE_SIZE),
+    user_id: str = Depends(get_current_user_id),
+    conversations: ConversationRepository = Depends(get_conversation_repository),
+    messages: MessageRepository = Depends(get_message_repository)
+):
+    """One page of a conversation, oldest first; without a cursor, its latest messages"""
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    await participant_conversation(conversations, conversation_id, user_id)
+    before_cursor = decode_cursor(before) if before else None
+    after_cursor = decode_cursor(after) if after else None
+    rows = await messages.page(conversation_id, limit + 1, before=before_cursor, after=after_cursor)
+    return page(rows, "sent_at", limit, desc=after_cursor is None,
+                more_before=after_cursor is not None, more_after=before_cursor is not None)
 
 @router.post("/messages")
-def send_message(body: MessageBody):
+async def send_message(
+    body: MessageBody,
+    user_id: str = Depends(get_current_user_id),
+    conversations: ConversationRepository = Depends(get_conversation_repository),
+    messages: MessageRepository = Depends(get_message_repository)
+):
     try:
-        supabase = get_supabase_client()
-        conv = supabase.table("conversations").select("*").eq("id", body.conversation_id).single().execute().data
-        if not conv:
-            raise HTTPException(status_code=404, detail="Conversation not found")
+        conv = await participant_conversation(conversations, body.conversation_id, user_id)
         msg = {
             "id": str(uuid4()),
             "conversation_id": body.conversation_id,
             "content": body.content
         }
-        result = supabase.table("messages").insert(msg).execute()
-        if hasattr(result, 'error') and result.error:
-            raise HTTPException(status_code=400, detail=result.error.message)
+        stored = await messages.insert(msg)
+        # Push to sockets connected to this conversation (on every worker)
+        await message_hub.publish(body.conversation_id, stored[0] if stored else msg,
+                                  user_ids=[conv.get("patient_id"), conv.get("doctor_id")])
         return msg
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Delta sync.
+# A sync cursor is the (timestamp, id) of the last change the client has seen. The
+# conversations whose last_message_at moved past it are the only ones that can hold
+# new messages, so one indexed query finds them and a second fetches their new
+# messages in (sent_at, id) order. sent_at is taken when the inserting transaction
+# starts, so a message can commit after a client has synced past a later one. Each
+# sync therefore re-reads SYNC_OVERLAP seconds behind the cursor, and the cursor
+# remembers the ids it already delivered in that window. Replaying a response is
+# harmless: clients apply conversations and messages by id.
+
+NIL_ID = "00000000-0000-0000-0000-000000000000"
+EPOCH = "1970-01-01T00:00:00+00:00"
+
+SyncKey = Tuple[datetime, str]
+
+def _sync_key(timestamp: Any, row_id: Optional[str]) -> SyncKey:
+    return parse_datetime(timestamp).replace(tzinfo=timezone.utc), str(row_id or NIL_ID)
+
+def _sync_cursor(key: SyncKey, seen: List[str]) -> str:
+    return encode_token([key[0].isoformat(), key[1], seen])
+
+def _decode_sync_cursor(cursor: str) -> Tuple[SyncKey, List[str]]:
+    """(high-water key, ids delivered within the overlap window); a 400 if malformed"""
+    try:
+        value, row_id, *rest = decode_token(cursor)
+        # Cursors issued before the overlap window was added carry no ids
+        seen = [str(UUID(str(item))) for item in (rest[0] if rest else [])]
+        return _sync_key(value, str(UUID(str(row_id)))), seen
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _changes(user_id: str, since: SyncKey, seen: List[str], conversations: ConversationRepository,
+                   messages: MessageRepository) -> Dict[str, Any]:
+    window = (since[0] - timedelta(seconds=config.SYNC_OVERLAP)).isoformat()
+    changed = await conversations.changed_since(user_id, window)
+    rows = []
+    if changed:
+        # Enough rows that, after skipping those already delivered, one more than a response is left
+        rows = await messages.since([conv["id"] for conv in changed], (window, NIL_ID),
+                                    config.SYNC_MAX_MESSAGES + 1 + len(seen))
+    delivered = set(seen)
+    new = [row for row in rows if str(row["id"]) not in delivered]
+    has_more = len(new) > config.SYNC_MAX_MESSAGES
+    new = new[:config.SYNC_MAX_MESSAGES]
+
+    conv_keys = [(_sync_key(conv["last_message_at"], conv.get("last_message_id")), conv) for conv in changed]
+    latest = since
+    if new:
+        latest = max(latest, max(_sync_key(row["sent_at"], row["id"]) for row in new))
+    if not has_more:
+        # Everything up to the newest conversation change has been returned
+        latest = max([latest] + [key for key, _ in conv_keys])
+    sent = {str(row["id"]) for row in new}
+    # Delivered messages still inside the next window; the rest can no longer be re-read
+    horizon = (latest[0] - timedelta(seconds=config.SYNC_OVERLAP), NIL_ID)
+    remembered = [str(row["id"]) for row in rows
+                  if (str(row["id"]) in delivered or str(row["id"]) in sent)
+                  and horizon <= _sync_key(row["sent_at"], row["id"]) <= latest]
+    return {
+        "conversations": [conv for key, conv in conv_keys
+                          if key > since or str(conv.get("last_message_id")) in sent],
+        "messages": new,
+        "cursor": _sync_cursor(latest, remembered[-config.SYNC_MAX_SEEN:]),
+        "has_more": has_more,
+    }
+
+@router.get("/export")
+async def export_messages(
+    request: Request,
+    conversation_id: Optional[str] = Query(None, description="One conversation; omit for all of the caller's"),
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN, description="ndjson or csv"),
+    after: Optional[str] = Query(None, description="Resume after this message id (the last one received)"),
+    user_id: str = Depends(get_current_user_id),
+    conversations: ConversationRepository = Depends(get_conversation_repository),
+    messages: MessageRepository = Depends(get_message_repository)
+):
+    """Every message of the caller's conversations, oldest first, streamed"""
+    if conversation_id:
+        await participant_conversation(conversations, conversation_id, user_id)
+        conversation_ids = [conversation_id]
+    else:
+        conversation_ids = await conversations.ids_for_user(user_id)
+    cursor = await messages.resume_cursor(after, "sent_at") if after else None
+
+    async def fetch(after, limit):
+        if not conversation_ids:
+            return []
+        return await messages.since(conversation_ids, after, limit)
+
+    pages = iter_pages(fetch, lambda row: (str(row["sent_at"]), str(row["id"])),
+                       config.EXPORT_PAGE_SIZE, after=cursor)
+    return export_response(request, pages, format, "messages")
+
+@router.get("/sync")
+async def sync(
+    since: Optional[str] = Query(None, description="Cursor from the previous sync; omit to get a starting cursor"),
+    wait: float = Query(0, ge=0, le=config.SYNC_MAX_WAIT, description="Seconds to hold the request until something changes"),
+    user_id: str = Depends(get_current_user_id),
+    conversations: ConversationRepository = Depends(get_conversation_repository),
+    messages: MessageRepository = Depends(get_message_repository)
+):
+    """Conversations and messages of the caller that changed after `since`, across all conversations"""
+    if not since:
+        # Start from the caller's most recent change; earlier history is read with /messages pages
+        latest = await conversations.page_for_user(user_id, 1)
+        key = (_sync_key(latest[0]["last_message_at"], latest[0].get("last_message_id")) if latest
+               else _sync_key(EPOCH, None))
+        # Messages already inside the overlap window belong to that history, not to the next sync
+        window = (key[0] - timedelta(seconds=config.SYNC_OVERLAP)).isoformat()
+        recent = await conversations.changed_since(user_id, window)
+        rows = (await messages.since([conv["id"] for conv in recent], (window, NIL_ID), config.SYNC_MAX_SEEN)
+                if recent else [])
+        seen = [str(row["id"]) for row in rows if _sync_key(row["sent_at"], row["id"]) <= key]
+        return {"conversations": [], "messages": [], "cursor": _sync_cursor(key, seen), "has_more": False}
+
+    cursor, seen = _decode_sync_cursor(since)
+    if not wait:
+        return await _changes(user_id, cursor, seen, conversations, messages)
+
+    # Subscribed before the first query, so a message sent in between still wakes us
+    subscription = message_hub.subscribe(user_topic(user_id))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    try:
+        while True:
+            result = await _changes(user_id, cursor, seen, conversations, messages)
+            remaining = deadline - loop.time()
+            if result["conversations"] or result["messages"] or remaining <= 0:
+                return result
+            try:
+                await asyncio.wait_for(subscription.next(), remaining)
+            except asyncio.TimeoutError:
+                return result
+    finally:
+        message_hub.unsubscribe(subscription)
+
+async def _forward(websocket: WebSocket, subscription: Subscription):
+    """Send the subscription's events to the socket until it is dropped as too slow"""
+    while True:
+        text = await subscription.next()
+        if text is None:
+            await websocket.close(code=1013)  # try again later: resync over HTTP and reconnect
+            return
+        await websocket.send_text(text)
+
+@router.websocket("/ws/{conversation_id}")
+async def conversation_socket(
+    websocket: WebSocket,
+    conversation_id: str,
+    token: Optional[str] = Query(None),
+    conversations: ConversationRepository = Depends(get_conversation_repository)
+):
+    """Stream new messages of a conversation to its participants as they are sent"""
+    token, subprotocol = websocket_token(token, websocket.headers.get("sec-websocket-protocol"))
+    try:
+        claims = await token_verifier.verify(token) if token else None
+    except InvalidToken:
+        claims = None
+    if claims is None:
+        await websocket.close(code=4401)
+        return
+    conv = await conversations.get(conversation_id, "patient_id,doctor_id")
+    if not conv:
+        await websocket.close(code=4404)
+        return
+    if str(claims["sub"]) not in (str(conv["patient_id"]), str(conv["doctor_id"])):
+        await websocket.close(code=4403)
+        return
+    await websocket.accept(subprotocol=subprotocol)
+    subscription = message_hub.subscribe(conversation_id)
+    sender = asyncio.create_task(_forward(websocket, subscription))
+    try:
+        # Nothing is expected from the client; reading detects the disconnect
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        message_hub.unsubscribe(subscription)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
 @router.post("/")
-async def send_message_new(msg: MessageIn, user_id: str = Depends(get_current_user_id)):
+async def send_message_new(
+    msg: MessageIn,
+    user_id: str = Depends(get_current_user_id),
+    messages: MessageRepository = Depends(get_message_repository)
+):
     # Save message to supabase
-    result = supabase.table('messages').insert({
+    await messages.insert({
         'user_id': user_id,
         'doctor_id': msg.doctorId,
         'message': msg.message
-    }).execute()
-    if result.error:
-        raise HTTPException(status_code=400, detail=result.error.message)
+    })
     return {"message": "Message sent"}
 
 @router.get("/")
-async def get_messages(user_id: str = Depends(get_current_user_id)):
-    result = supabase.table('messages').select('*').eq('user_id', user_id).order('id', desc=True).execute()
-    if result.error:
-        raise HTTPException(status_code=400, detail=result.error.message)
-    return result.data 
\ No newline at end of file
+async def get_messages(
+    user_id: str = Depends(get_current_user_id),
+    messages: MessageRepository = Depends(get_message_repository)
+):
+    return await messages.list_for_user(user_id) 
\ No newline at end of file
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+from ..utils.metrics import metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/", response_model=Dict[str, Any])
+async def get_metrics():
+    """Snapshot of this worker's cache, queue and throughput metrics"""
+    return metrics.snapshot()
@@ -1,25 +1,109 @@
-from fastapi import APIRouter, HTTPException
-from src.utils.supabase_client import get_supabase_client
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from src import config
+from src.repositories.patients import PatientRepository, get_patient_repository
+from src.utils.cache import MemoryCache
+from src.utils.exports import iter_pages, json_array
+from src.utils.metrics import metrics
+from src.utils.pagination import decode_cursor, encode_cursor, text_value
+from src.utils.user_utils import AuthenticatedUser, get_current_user
 import logging
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
+# Count estimates per filter, so paging through a listing does not re-count it
+patient_counts = MemoryCache(ttl=config.PATIENT_COUNT_TTL, max_entries=1000)
+metrics.register("patient_count_cache", patient_counts.stats)
+
+# Roles allowed to list and export patient records
+STAFF_ROLES = ("DOCTOR", "ADMIN")
+
+FIELD_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+# Columns the keyset cursor is built from; always read, returned only when asked for
+CURSOR_FIELDS = ("id", "full_name")
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, Optional[List[str]]]:
+    """(select clause, requested columns or None for all) from a `fields=` list"""
+    if not fields:
+        return "*", None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    invalid = [field for field in requested if not FIELD_NAME.match(field)]
+    if invalid or not requested:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(invalid) or fields}")
+    columns = list(dict.fromkeys([*requested, *CURSOR_FIELDS]))
+    return ",".join(columns), requested
+
+def project(rows: List[Dict[str, Any]], requested: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if requested is None or all(field in requested for field in CURSOR_FIELDS):
+        return rows
+    return [{field: row.get(field) for field in requested} for row in rows]
+
+async def get_staff_user(user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
+    if user.role not in STAFF_ROLES:
+        raise HTTPException(status_code=403, detail='Not authorized')
+    return user
+
 @router.get("/")
-def get_all_patients():
+async def get_all_patients(
+    limit: int = Query(config.PATIENTS_PAGE_SIZE, ge=1, le=config.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's `after`"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,full_name,email"),
+    q: Optional[str] = Query(None, min_length=2, description="Search name and email"),
+    name: Optional[str] = Query(None, description="Name contains"),
+    email: Optional[str] = Query(None, description="Exact email"),
+    user: AuthenticatedUser = Depends(get_staff_user),
+    patients: PatientRepository = Depends(get_patient_repository)
+):
+    """One page of patients ordered by name, with an estimated total for the same filters"""
     try:
-        supabase = get_supabase_client()
-        if not supabase:
-            raise HTTPException(status_code=500, detail="Failed to initialize Supabase client")
-            
-        logging.info("Fetching all patients from Supabase")
-        resp = supabase.table("patients").select("*").execute()
-        
-        if hasattr(resp, 'error') and resp.error:
-            logging.error(f"Supabase error: {resp.error.message}")
-            raise HTTPException(status_code=400, detail=resp.error.message)
-            
-        logging.info(f"Successfully fetched {len(resp.data)} patients")
-        return resp.data
+        columns, requested = parse_fields(fields)
+        cursor = decode_cursor(after, text_value) if after else None
+        page = patients.page(columns, limit + 1, after=cursor, search=q, name=name, email=email)
+        count_key = json.dumps([q, name, email])
+        total = patient_counts.get(count_key)
+        if total is None:
+            rows, total = await asyncio.gather(page, patients.estimate_count(search=q, name=name, email=email))
+            patient_counts.set(count_key, total)
+        else:
+            rows = await page
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        logging.info(f"Fetched {len(rows)} patients")
+        return {
+            "items": project(rows, requested),
+            "after": encode_cursor(rows[-1], "full_name") if more else None,
+            "total_estimate": total,
+        }
+    except HTTPException as e:
+        logging.error(f"Supabase error: {e.detail}")
+        raise
     except Exception as e:
         logging.error(f"Error fetching patients: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/export")
+async def export_patients(
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    q: Optional[str] = Query(None, min_length=2, description="Search name and email"),
+    name: Optional[str] = Query(None, description="Name contains"),
+    email: Optional[str] = Query(None, description="Exact email"),
+    user: AuthenticatedUser = Depends(get_staff_user),
+    patients: PatientRepository = Depends(get_patient_repository)
+):
+    """Every matching patient as one JSON array, streamed page by page"""
+    columns, requested = parse_fields(fields)
+
+    async def fetch(after, limit):
+        return await patients.page(columns, limit, after=after, search=q, name=name, email=email)
+
+    async def projected():
+        async for rows in iter_pages(fetch, lambda row: (row.get("full_name"), str(row["id"])),
+                                     config.PATIENTS_EXPORT_PAGE_SIZE):
+            yield project(rows, requested)
+
+    return StreamingResponse(json_array(projected()), media_type="application/json")
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional
-from src.utils.supabase_client import supabase
+from src.repositories.patients import ProfileRepository, get_profile_repository
+from src.repositories.doctors import DoctorRepository, get_doctor_repository
 from src.utils.auth import get_current_user_id
+from src.utils.doctor_directory import doctor_directory
 from src.models.doctor import DoctorProfile
 
 router = APIRouter(prefix="/profile", tags=["profile"])
@@ -26,42 +28,52 @@ class EmergencyContact(BaseModel):
     phone: str
 
 @router.put("/address")
-async def update_address(address: Address, user_id: str = Depends(get_current_user_id)):
-    result = supabase.table('profiles').update(address.dict()).eq('id', user_id).execute()
-    if result.error:
-        raise HTTPException(status_code=400, detail=result.error.message)
+async def update_address(
+    address: Address,
+    user_id: str = Depends(get_current_user_id),
+    profiles: ProfileRepository = Depends(get_profile_repository)
+):
+    await profiles.update(user_id, address.dict())
     return {"message": "Address updated", "address": address}
 
 @router.put("/insurance")
-async def update_insurance(insurance: Insurance, user_id: str = Depends(get_current_user_id)):
-    result = supabase.table('profiles').update(insurance.dict()).eq('id', user_id).execute()
-    if result.error:
-        raise HTTPException(status_code=400, detail=result.error.message)
+async def update_insurance(
+    insurance: Insurance,
+    user_id: str = Depends(get_current_user_id),
+    profiles: ProfileRepository = Depends(get_profile_repository)
+):
+    await profiles.update(user_id, insurance.dict())
     return {"message": "Insurance updated", "insurance": insurance}
 
 @router.put("/emergency-contact")
-async def update_emergency_contact(contact: EmergencyContact, user_id: str = Depends(get_current_user_id)):
-    result = supabase.table('profiles').update(contact.dict()).eq('id', user_id).execute()
-    if result.error:
-        raise HTTPException(status_code=400, detail=result.error.message)
+async def update_emergency_contact(
+    contact: EmergencyContact,
+    user_id: str = Depends(get_current_user_id),
+    profiles: ProfileRepository = Depends(get_profile_repository)
+):
+    await profiles.update(user_id, contact.dict())
     return {"message": "Emergency contact updated", "contact": contact}
 
 @router.put("/doctor")
 async def update_doctor_profile(
     profile: DoctorProfile,
-    user_id: str = Depends(get_current_user_id)
+    user_id: str = Depends(get_current_user_id),
+    doctors: DoctorRepository = Depends(get_doctor_repository)
 ):
     print("[DEBUG] Incoming doctor profile update:", profile.dict())
     print("[DEBUG] user_id:", user_id)
     if not user_id:
         print("[DEBUG] No user_id provided!")
         raise HTTPException(status_code=401, detail="User authentication failed. No user ID.")
-    result = supabase.table('doctors').update(profile.dict()).eq('id', user_id).execute()
+    try:
+        result = await doctors.update(user_id, profile.dict())
+    except HTTPException as e:
+        print("[DEBUG] Supabase error:", e.detail)
+        raise
     print("[DEBUG] Supabase update result:", result)
-    if result.error:
-        print("[DEBUG] Supabase error:", result.error)
-        raise HTTPException(status_code=400, detail=str(result.error))
-    if not result.data or (isinstance(result.data, list) and len(result.data) == 0):
+    if not result:
         print("[DEBUG] No doctor record updated for user_id:", user_id)
         raise HTTPException(status_code=404, detail="Doctor profile not found for this user.")
+    # Specialty and other directory fields are served from memory; refresh this doctor's entry
+    doctor_directory.upsert(result[0])
     return {"message": "Doctor profile updated", "profile": profile} 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends, Request, BackgroundTasks
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from ..models.wearable_data import (
@@ -11,17 +11,59 @@ from ..models.wearable_data import (
     VitalSigns
 )
 from ..utils.vital_client import get_vital_client
-from ..utils.supabase_client import get_supabase_client
+from ..utils.wearable_store import wearable_store, extract_samples
+from ..utils.rollups import RESOLUTIONS
+from ..utils.aggregation import build_report_stats
+from ..utils.ingest import IngestBackpressure, ingest_buffer, parser_for
+from ..utils.anomaly import anomaly_detector, publish_alerts
+from ..utils.exports import FORMAT_PATTERN, export_response, iter_pages
+from ..repositories.wearable import (
+    HealthReportRepository,
+    VitalUserRepository,
+    WearableSampleRepository,
+    get_health_report_repository,
+    get_vital_user_repository,
+    get_wearable_sample_repository
+)
 from ..utils.user_utils import get_current_user
+from ..utils.auth import get_current_user_id
+from .. import config
 
 router = APIRouter(prefix="/wearable", tags=["wearable"])
 
+RESOLUTION_PATTERN = f"^({'|'.join(RESOLUTIONS)})$"
+
+async def get_stored_timeseries(user_id: str, metric: str, start_dt: Optional[datetime],
+                                end_dt: Optional[datetime], resolution: str = "auto") -> Dict[str, Any]:
+    """Serve a timeseries from the local store, syncing only days after the watermark from Vital.
+
+    Long ranges are returned as min/max/mean/count buckets of a rollup tier
+    so the payload stays bounded.
+    """
+    client = get_vital_client()
+    end_dt = end_dt or datetime.now()
+    start_dt = start_dt or end_dt - timedelta(days=7)
+
+    async def fetch(span_start: datetime, span_end: datetime):
+        return await client.get_timeseries(user_id, metric, span_start, span_end)
+
+    resolution, data = await wearable_store.query(user_id, metric, start_dt.date(), end_dt.date(),
+                                                  fetch, resolution)
+    return {
+        "user_id": user_id,
+        "metric": metric,
+        "start_date": start_dt.strftime("%Y-%m-%d"),
+        "end_date": end_dt.strftime("%Y-%m-%d"),
+        "resolution": resolution,
+        "data": data.to_records()
+    }
+
 @router.get("/connect/{user_id}", response_model=Dict[str, Any])
 async def get_connection_link(user_id: str = Path(..., description="User ID")):
     """Get a link for a user to connect their wearable devices"""
     try:
         client = get_vital_client()
-        link_data = client.get_user_link(user_id)
+        link_data = await client.get_user_link(user_id)
         return link_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get connection link: {str(e)}")
@@ -31,7 +73,7 @@ async def get_user_devices(user_id: str = Path(..., description="User ID")):
     """Get a list of connected devices for a user"""
     try:
         client = get_vital_client()
-        devices = client.get_user_devices(user_id)
+        devices = await client.get_user_devices(user_id)
         return devices
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user devices: {str(e)}")
@@ -41,7 +83,7 @@ async def get_connected_sources(user_id: str = Path(..., description="User ID"))
     """Get a list of connected data sources for a user"""
     try:
         client = get_vital_client()
-        sources = client.get_connected_sources(user_id)
+        sources = await client.get_connected_sources(user_id)
         return sources
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get connected sources: {str(e)}")
@@ -49,41 +91,119 @@ async def get_connected_sources(user_id: str = Path(..., description="User ID"))
 @router.post("/users", response_model=Dict[str, Any])
 async def create_vital_user(
     client_user_id: str = Body(..., description="Client user ID"),
-    profile: Dict[str, Any] = Body(..., description="User profile")
+    profile: Dict[str, Any] = Body(..., description="User profile"),
+    vital_users: VitalUserRepository = Depends(get_vital_user_repository)
 ):
     """Create a new user in Vital API"""
     try:
         client = get_vital_client()
-        user_data = client.create_user(client_user_id, profile)
+        user_data = await client.create_user(client_user_id, profile)
         
         # Store the Vital user ID in Supabase for future reference
-        supabase = get_supabase_client()
-        supabase.table("vital_users").insert({
+        await vital_users.insert({
             "user_id": client_user_id,
             "vital_user_id": user_data.get("user_id"),
             "created_at": datetime.now().isoformat()
-        }).execute()
+        })
         
         return user_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create user: {str(e)}")
 
+@router.post("/ingest", response_model=Dict[str, Any], status_code=202)
+async def ingest_samples(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Accept the caller's samples pushed as NDJSON or binary frames and buffer them for batched writes"""
+    parser = parser_for(request.headers.get("content-type", ""))
+    if parser is None:
+        raise HTTPException(status_code=415, detail="Use application/x-ndjson or application/octet-stream")
+    accepted = rejected = forbidden = 0
+    alerts = []
+    try:
+        # Parse the body chunk by chunk; a full buffer makes us stop reading until it drains
+        async for chunk in request.stream():
+            batch = parser.feed(chunk)
+            # Samples can only be pushed for the authenticated user
+            forbidden += batch.restrict_to(user_id)
+            rejected += batch.rejected
+            accepted += await ingest_buffer.add(batch)
+            alerts.extend(anomaly_detector.observe_batch(batch.series))
+        batch = parser.close()
+        forbidden += batch.restrict_to(user_id)
+        rejected += batch.rejected
+        accepted += await ingest_buffer.add(batch)
+        alerts.extend(anomaly_detector.observe_batch(batch.series))
+    except IngestBackpressure:
+        raise HTTPException(status_code=503, detail="Ingest buffer is full, retry later",
+                            headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Alerts are written after the response is sent
+    background_tasks.add_task(publish_alerts, alerts)
+    return {"accepted": accepted, "rejected": rejected, "forbidden": forbidden, "pending": ingest_buffer.pending,
+            "alerts": len(alerts)}
+
+@router.get("/export/samples")
+async def export_samples(
+    request: Request,
+    metric: Optional[str] = Query(None, description="Only this metric, e.g. heart_rate"),
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD), exclusive"),
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN, description="ndjson or csv"),
+    after: Optional[str] = Query(None, description="Resume after this sample id (the last one received)"),
+    user_id: str = Depends(get_current_user_id),
+    samples: WearableSampleRepository = Depends(get_wearable_sample_repository)
+):
+    """The caller's pushed device samples, oldest first, streamed"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").isoformat() if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d").isoformat() if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    cursor = await samples.resume_cursor(after, "timestamp") if after else None
+
+    async def fetch(after, limit):
+        return await samples.page_for_user(user_id, limit, after, metric=metric, start=start, end=end)
+
+    pages = iter_pages(fetch, lambda row: (str(row["timestamp"]), str(row["id"])),
+                       config.EXPORT_PAGE_SIZE, after=cursor)
+    return export_response(request, pages, format, "wearable_samples")
+
+@router.get("/export/reports")
+async def export_health_reports(
+    request: Request,
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN, description="ndjson or csv"),
+    after: Optional[str] = Query(None, description="Resume after this report id (the last one received)"),
+    user_id: str = Depends(get_current_user_id),
+    health_reports: HealthReportRepository = Depends(get_health_report_repository)
+):
+    """The caller's generated health reports, oldest first, streamed"""
+    cursor = await health_reports.resume_cursor(after, "created_at") if after else None
+
+    async def fetch(after, limit):
+        return await health_reports.page_for_user(user_id, limit, after)
+
+    pages = iter_pages(fetch, lambda row: (str(row["created_at"]), str(row["id"])),
+                       config.EXPORT_PAGE_SIZE, after=cursor)
+    return export_response(request, pages, format, "health_reports")
+
 @router.get("/data/heart-rate/{user_id}", response_model=Dict[str, Any])
 async def get_heart_rate_data(
     user_id: str = Path(..., description="User ID"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    resolution: str = Query("auto", pattern=RESOLUTION_PATTERN, description="auto, raw, 1m, 1h or 1d")
 ):
     """Get heart rate data for a user"""
     try:
-        client = get_vital_client()
-        
         # Convert string dates to datetime if provided
         start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
         end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
         
-        heart_rate_data = client.get_heart_rate_data(user_id, start_dt, end_dt)
-        return heart_rate_data
+        return await get_stored_timeseries(user_id, "heart_rate", start_dt, end_dt, resolution)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get heart rate data: {str(e)}")
 
@@ -91,18 +211,16 @@ async def get_heart_rate_data(
 async def get_activity_data(
     user_id: str = Path(..., description="User ID"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    resolution: str = Query("auto", pattern=RESOLUTION_PATTERN, description="auto, raw, 1m, 1h or 1d")
 ):
     """Get activity data for a user"""
     try:
-        client = get_vital_client()
-        
         # Convert string dates to datetime if provided
         start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
         end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
         
-        activity_data = client.get_activity_data(user_id, start_dt, end_dt)
-        return activity_data
+        return await get_stored_timeseries(user_id, "activity", start_dt, end_dt, resolution)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get activity data: {str(e)}")
 
@@ -110,18 +228,16 @@ async def get_activity_data(
 async def get_sleep_data(
     user_id: str = Path(..., description="User ID"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    resolution: str = Query("auto", pattern=RESOLUTION_PATTERN, description="auto, raw, 1m, 1h or 1d")
 ):
     """Get sleep data for a user"""
     try:
-        client = get_vital_client()
-        
         # Convert string dates to datetime if provided
         start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
         end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
         
-        sleep_data = client.get_sleep_data(user_id, start_dt, end_dt)
-        return sleep_data
+        return await get_stored_timeseries(user_id, "sleep", start_dt, end_dt, resolution)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get sleep data: {str(e)}")
 
@@ -129,18 +245,16 @@ async def get_sleep_data(
 async def get_blood_oxygen_data(
     user_id: str = Path(..., description="User ID"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    resolution: str = Query("auto", pattern=RESOLUTION_PATTERN, description="auto, raw, 1m, 1h or 1d")
 ):
     """Get blood oxygen data for a user"""
     try:
-        client = get_vital_client()
-        
         # Convert string dates to datetime if provided
         start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
         end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
         
-        blood_oxygen_data = client.get_blood_oxygen_data(user_id, start_dt, end_dt)
-        return blood_oxygen_data
+        return await get_stored_timeseries(user_id, "blood_oxygen", start_dt, end_dt, resolution)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get blood oxygen data: {str(e)}")
 
@@ -163,11 +277,15 @@ async def get_health_summary(
             
         end_date = datetime.now()
         
-        # Get data from different sources
-        heart_rate = client.get_heart_rate_data(user_id, start_date, end_date)
-        activity = client.get_activity_data(user_id, start_date, end_date)
-        sleep = client.get_sleep_data(user_id, start_date, end_date)
-        blood_oxygen = client.get_blood_oxygen_data(user_id, start_date, end_date)
+        # Get data from the different sources concurrently
+        timeseries = await client.get_all_timeseries(user_id, start_date, end_date)
+        heart_rate = timeseries["heart_rate"]
+        activity = timeseries["activity"]
+        sleep = timeseries["sleep"]
+        blood_oxygen = timeseries["blood_oxygen"]
+        
+        # Our own statistics from the raw samples, alongside Vital's summaries
+        stats = build_report_stats({metric: extract_samples(payload) for metric, payload in timeseries.items()})
         
         # Combine into a summary
         summary = {
@@ -178,7 +296,8 @@ async def get_health_summary(
             "heart_rate": heart_rate.get("summary", {}),
             "activity": activity.get("summary", {}),
             "sleep": sleep.get("summary", {}),
-            "blood_oxygen": blood_oxygen.get("summary", {})
+            "blood_oxygen": blood_oxygen.get("summary", {}),
+            "statistics": stats
         }
         
         return summary
@@ -190,7 +309,8 @@ async def generate_health_report(
     user_id: str = Path(..., description="User ID"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    user = Depends(get_current_user)
+    user = Depends(get_current_user),
+    health_reports: HealthReportRepository = Depends(get_health_report_repository)
 ):
     """Generate a comprehensive health report for a user"""
     if user.role != 'PATIENT':
@@ -202,11 +322,17 @@ async def generate_health_report(
         start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else datetime.now() - timedelta(days=30)
         end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.now()
         
-        # Get all health data
-        heart_rate = client.get_heart_rate_data(user_id, start_dt, end_dt)
-        activity = client.get_activity_data(user_id, start_dt, end_dt)
-        sleep = client.get_sleep_data(user_id, start_dt, end_dt)
-        blood_oxygen = client.get_blood_oxygen_data(user_id, start_dt, end_dt)
+        # Get all health data concurrently
+        timeseries = await client.get_all_timeseries(user_id, start_dt, end_dt)
+        heart_rate = timeseries["heart_rate"]
+        activity = timeseries["activity"]
+        sleep = timeseries["sleep"]
+        blood_oxygen = timeseries["blood_oxygen"]
+        
+        # Compute statistics from the raw samples; Vital's summary only fills gaps
+        stats = build_report_stats({metric: extract_samples(payload) for metric, payload in timeseries.items()})
+        hr_stats = stats["heart_rate"]
+        spo2_stats = stats["blood_oxygen"]
         
         # Process data into a report format
         report = {
@@ -217,40 +343,46 @@ async def generate_health_report(
                 "duration_days": (end_dt - start_dt).days
             },
             "heart_rate": {
-                "average": heart_rate.get("summary", {}).get("average_hr", 0),
-                "resting": heart_rate.get("summary", {}).get("resting_hr", 0),
-                "max": heart_rate.get("summary", {}).get("max_hr", 0),
-                "min": heart_rate.get("summary", {}).get("min_hr", 0)
+                "average": hr_stats.get("average", heart_rate.get("summary", {}).get("average_hr", 0)),
+                "resting": hr_stats.get("resting", heart_rate.get("summary", {}).get("resting_hr", 0)),
+                "max": hr_stats.get("max", heart_rate.get("summary", {}).get("max_hr", 0)),
+                "min": hr_stats.get("min", heart_rate.get("summary", {}).get("min_hr", 0)),
+                "percentiles": hr_stats.get("percentiles", {}),
+                "hrv": hr_stats.get("hrv", {}),
+                "daily": hr_stats.get("daily", [])
             },
             "activity": {
                 "total_steps": activity.get("summary", {}).get("total_steps", 0),
                 "total_calories": activity.get("summary", {}).get("total_calories", 0),
                 "total_distance": activity.get("summary", {}).get("total_distance", 0),
-                "active_minutes": activity.get("summary", {}).get("active_minutes", 0)
+                "active_minutes": activity.get("summary", {}).get("active_minutes", 0),
+                "daily": stats["activity"].get("daily", [])
             },
             "sleep": {
                 "average_duration": sleep.get("summary", {}).get("average_duration", 0),
                 "average_efficiency": sleep.get("summary", {}).get("average_efficiency", 0),
                 "average_deep_sleep": sleep.get("summary", {}).get("average_deep_sleep", 0),
-                "average_rem_sleep": sleep.get("summary", {}).get("average_rem_sleep", 0)
+                "average_rem_sleep": sleep.get("summary", {}).get("average_rem_sleep", 0),
+                "daily": stats["sleep"].get("daily", [])
             },
             "blood_oxygen": {
-                "average": blood_oxygen.get("summary", {}).get("average", 0),
-                "min": blood_oxygen.get("summary", {}).get("min", 0)
+                "average": spo2_stats.get("average", blood_oxygen.get("summary", {}).get("average", 0)),
+                "min": spo2_stats.get("min", blood_oxygen.get("summary", {}).get("min", 0)),
+                "percentiles": spo2_stats.get("percentiles", {}),
+                "dips": spo2_stats.get("dips", {})
             },
             "generated_at": datetime.now().isoformat()
         }
         
         # Save report to Supabase
-        supabase = get_supabase_client()
         report_id = f"{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
-        supabase.table("health_reports").insert({
+        await health_reports.insert({
             "id": report_id,
             "user_id": user_id,
             "report_data": report,
             "created_at": datetime.now().isoformat()
-        }).execute()
+        })
         
         report["report_id"] = report_id
         return report
@@ -0,0 +1,188 @@
+from typing import Any, Dict, Optional, Sequence
+import numpy as np
+from ..models.timeseries import WearableSeries
+
+# Vectorised aggregation engine for wearable timeseries.
+# Every statistic is computed with whole-array NumPy operations on a
+# WearableSeries (sorted int64 epoch-ms timestamps + float64 values), so a
+# 30-day multi-metric report for one user takes milliseconds.
+
+MS_PER_MINUTE = 60_000
+MS_PER_DAY = 86_400_000
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+def _round(value: float, digits: int = 2) -> float:
+    return round(float(value), digits)
+
+def percentiles_of(values: np.ndarray, ps: Sequence[float]) -> np.ndarray:
+    """Linearly interpolated percentiles (same as np.percentile) from one full sort.
+
+    A single sort is cheaper than np.percentile's repeated partitioning when
+    several percentiles are needed at once.
+    """
+    ordered = np.sort(values)
+    rank = (ordered.size - 1) * np.asarray(ps, dtype=np.float64) / 100
+    lo = np.floor(rank).astype(np.int64)
+    hi = np.ceil(rank).astype(np.int64)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+def describe(series: WearableSeries, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    """Count, min, max, mean, standard deviation and percentiles of a series"""
+    values = series.values
+    if values.size == 0:
+        return {"count": 0}
+    pct = percentiles_of(values, percentiles)
+    return {
+        "count": int(values.size),
+        "min": _round(values.min()),
+        "max": _round(values.max()),
+        "mean": _round(values.mean()),
+        "std": _round(values.std()),
+        "percentiles": {f"p{p:g}": _round(v) for p, v in zip(percentiles, pct)},
+    }
+
+def rolling_mean(series: WearableSeries, window_ms: int) -> np.ndarray:
+    """Mean of the samples in (t - window, t] for every sample t (trailing time window)"""
+    ts, values = series.timestamps, series.values
+    if values.size == 0:
+        return values
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    left = np.searchsorted(ts, ts - window_ms, side="right")
+    right = np.arange(1, values.size + 1)
+    return (cumulative[right] - cumulative[left]) / (right - left)
+
+def bucket_stats(series: WearableSeries, bucket_ms: int) -> Dict[str, np.ndarray]:
+    """Min, max, sum, mean and count per fixed-width time bucket (only non-empty buckets)"""
+    ts, values = series.timestamps, series.values
+    if values.size == 0:
+        empty = np.empty(0)
+        return {"start": empty.astype(np.int64), "min": empty, "max": empty,
+                "sum": empty, "mean": empty, "count": empty.astype(np.int64)}
+    buckets = ts // bucket_ms
+    # Timestamps are sorted, so each bucket is one contiguous run
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    counts = np.diff(np.concatenate((starts, [values.size])))
+    sums = np.add.reduceat(values, starts)
+    return {
+        "start": buckets[starts] * bucket_ms,
+        "min": np.minimum.reduceat(values, starts),
+        "max": np.maximum.reduceat(values, starts),
+        "sum": sums,
+        "mean": sums / counts,
+        "count": counts,
+    }
+
+def daily_buckets(series: WearableSeries) -> list:
+    """Per-day (UTC) min/max/mean/sum/count as JSON-ready rows"""
+    stats = bucket_stats(series, MS_PER_DAY)
+    days = np.datetime_as_string(stats["start"].astype("datetime64[ms]"), unit="D").tolist()
+    return [
+        {"date": day, "min": _round(lo), "max": _round(hi), "mean": _round(mean),
+         "sum": _round(total), "count": int(count)}
+        for day, lo, hi, mean, total, count in zip(
+            days, stats["min"].tolist(), stats["max"].tolist(), stats["mean"].tolist(),
+            stats["sum"].tolist(), stats["count"].tolist())
+    ]
+
+def resting_heart_rate(series: WearableSeries, window_ms: int = 5 * MS_PER_MINUTE,
+                       percentile: float = 5) -> Optional[float]:
+    """Low percentile of the 5-minute rolling mean heart rate (robust to single low readings)"""
+    if len(series) == 0:
+        return None
+    return _round(percentiles_of(rolling_mean(series, window_ms), (percentile,))[0])
+
+def hrv_rmssd(series: WearableSeries, window_ms: int = 5 * MS_PER_MINUTE) -> Dict[str, Any]:
+    """RMSSD of beat intervals estimated from heart rate, per window and overall median.
+
+    Wearables usually expose heart rate rather than raw RR intervals, so the
+    interval is approximated as 60000 / bpm for each sample.
+    """
+    ts, hr = series.timestamps, series.values
+    valid = hr > 0
+    ts, hr = ts[valid], hr[valid]
+    if hr.size < 2:
+        return {"windows": 0, "median_rmssd_ms": None}
+    rr = 60_000.0 / hr
+    windows = ts // window_ms
+    same_window = windows[1:] == windows[:-1]
+    squared = np.diff(rr)[same_window] ** 2
+    if squared.size == 0:
+        return {"windows": 0, "median_rmssd_ms": None}
+    # Windows are sorted, so each one is a contiguous run of successive differences
+    paired = windows[1:][same_window]
+    starts = np.flatnonzero(np.concatenate(([True], paired[1:] != paired[:-1])))
+    counts = np.diff(np.concatenate((starts, [paired.size])))
+    rmssd = np.sqrt(np.add.reduceat(squared, starts) / counts)
+    return {"windows": int(rmssd.size), "median_rmssd_ms": _round(np.median(rmssd))}
+
+def spo2_dips(series: WearableSeries, threshold: float = 90.0,
+              min_duration_ms: int = MS_PER_MINUTE) -> Dict[str, Any]:
+    """Episodes where SpO2 stays below `threshold` for at least `min_duration_ms`"""
+    ts, values = series.timestamps, series.values
+    below = values < threshold
+    if not below.any():
+        return {"count": 0, "total_minutes": 0.0, "lowest": None}
+    edges = np.diff(np.concatenate(([0], below.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    durations = ts[ends] - ts[starts]
+    sustained = durations >= min_duration_ms
+    return {
+        "count": int(sustained.sum()),
+        "total_minutes": _round(durations[sustained].sum() / MS_PER_MINUTE),
+        "lowest": _round(values[below].min()),
+    }
+
+def heart_rate_report(series: WearableSeries) -> Dict[str, Any]:
+    stats = describe(series)
+    if not stats["count"]:
+        return {}
+    return {
+        "average": stats["mean"],
+        "resting": resting_heart_rate(series),
+        "max": stats["max"],
+        "min": stats["min"],
+        "percentiles": stats["percentiles"],
+        "hrv": hrv_rmssd(series),
+        "daily": daily_buckets(series),
+    }
+
+def blood_oxygen_report(series: WearableSeries) -> Dict[str, Any]:
+    stats = describe(series)
+    if not stats["count"]:
+        return {}
+    return {
+        "average": stats["mean"],
+        "min": stats["min"],
+        "percentiles": stats["percentiles"],
+        "dips": spo2_dips(series),
+    }
+
+def activity_report(series: WearableSeries) -> Dict[str, Any]:
+    if len(series) == 0:
+        return {}
+    daily = daily_buckets(series)
+    return {
+        "total": _round(series.values.sum()),
+        "daily_average": _round(np.mean([d["sum"] for d in daily])),
+        "daily": daily,
+    }
+
+def sleep_report(series: WearableSeries) -> Dict[str, Any]:
+    if len(series) == 0:
+        return {}
+    daily = daily_buckets(series)
+    return {
+        "average_per_day": _round(np.mean([d["sum"] for d in daily])),
+        "daily": daily,
+    }
+
+def build_report_stats(timeseries: Dict[str, WearableSeries]) -> Dict[str, Dict[str, Any]]:
+    """Server-side statistics for each metric of a health report (empty dict when no samples)"""
+    empty = WearableSeries.empty()
+    return {
+        "heart_rate": heart_rate_report(timeseries.get("heart_rate", empty)),
+        "activity": activity_report(timeseries.get("activity", empty)),
+        "sleep": sleep_report(timeseries.get("sleep", empty)),
+        "blood_oxygen": blood_oxygen_report(timeseries.get("blood_oxygen", empty)),
+    }
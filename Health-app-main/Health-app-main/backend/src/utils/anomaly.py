@@ -0,0 +1,230 @@
+import math
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from ..models.timeseries import WearableSeries
+from ..models.wearable_data import WearableData
+from .. import config
+from .metrics import metrics
+from .outbox import notification_outbox
+
+# Streaming vital-sign anomaly detection.
+# Samples are evaluated as they arrive, one at a time and in O(1) each: every
+# rule keeps a time-bounded rolling window with a running sum, and every
+# (user, metric) stream keeps an exponentially weighted baseline for z-scores.
+# Alerts are rate limited per user and rule, and delivered through the notification outbox.
+
+class Rule:
+    """A rolling-window rule on one metric.
+
+    The rule fires when the mean over `window_ms` crosses `threshold` in
+    `direction` ("above" or "below"), or, if `z_threshold` is set, when that
+    mean is more than `z_threshold` standard deviations from the user's baseline.
+    """
+
+    def __init__(self, name: str, metric: str, window_ms: int, title: str, message: str,
+                 threshold: Optional[float] = None, direction: str = "above",
+                 z_threshold: Optional[float] = None, min_coverage: float = 0.8):
+        self.name = name
+        self.metric = metric
+        self.window_ms = window_ms
+        self.title = title
+        self.message = message
+        self.threshold = threshold
+        self.direction = direction
+        self.z_threshold = z_threshold
+        # Fraction of the window that must be covered by samples before the rule can fire
+        self.min_coverage_ms = int(window_ms * min_coverage)
+
+DEFAULT_RULES = (
+    Rule("sustained_tachycardia", "heart_rate", 10 * 60_000, "Sustained High Heart Rate",
+         "Heart rate averaged {value:.0f} bpm over the last 10 minutes.", threshold=100.0),
+    Rule("low_spo2", "blood_oxygen", 2 * 60_000, "Low Blood Oxygen",
+         "Blood oxygen averaged {value:.0f}% over the last 2 minutes.", threshold=90.0,
+         direction="below"),
+    Rule("heart_rate_deviation", "heart_rate", 5 * 60_000, "Unusual Heart Rate",
+         "Heart rate averaged {value:.0f} bpm, well outside your usual range.", z_threshold=4.0),
+)
+
+class RollingWindow:
+    """Samples within the last `span_ms`, with a running sum (amortised O(1) per sample)"""
+
+    __slots__ = ("span_ms", "samples", "total")
+
+    def __init__(self, span_ms: int):
+        self.span_ms = span_ms
+        self.samples: Deque[Tuple[int, float]] = deque()
+        self.total = 0.0
+
+    def push(self, timestamp: int, value: float):
+        samples = self.samples
+        samples.append((timestamp, value))
+        self.total += value
+        cutoff = timestamp - self.span_ms
+        while samples[0][0] <= cutoff:
+            self.total -= samples.popleft()[1]
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.samples)
+
+    @property
+    def covered_ms(self) -> float:
+        """Time span the samples represent, counting one average interval per sample"""
+        count = len(self.samples)
+        if count < 2:
+            return 0.0
+        return (self.samples[-1][0] - self.samples[0][0]) * count / (count - 1)
+
+class Baseline:
+    """Exponentially weighted mean and variance of a stream.
+
+    Once warmed up, values more than 3 standard deviations from the mean are
+    left out, so an ongoing episode does not become the new normal.
+    """
+
+    __slots__ = ("alpha", "mean", "var", "count")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, value: float, warm: bool = False):
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            if warm and diff * diff > 9 * self.var:
+                return
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.count += 1
+
+class StreamState:
+    """Detector state for one (user, metric) stream"""
+
+    __slots__ = ("rules", "windows", "baseline", "last_timestamp")
+
+    def __init__(self, rules: List[Rule], baseline_alpha: float):
+        self.rules = rules
+        self.windows = [RollingWindow(rule.window_ms) for rule in rules]
+        self.baseline = Baseline(baseline_alpha)
+        self.last_timestamp = -1
+
+class AnomalyDetector:
+    """Evaluates the rules incrementally on every incoming sample"""
+
+    def __init__(self, rules=DEFAULT_RULES, cooldown_ms: int = config.ANOMALY_COOLDOWN_MS,
+                 baseline_alpha: float = config.ANOMALY_BASELINE_ALPHA,
+                 min_baseline_samples: int = config.ANOMALY_MIN_BASELINE_SAMPLES,
+                 max_streams: int = config.ANOMALY_MAX_STREAMS):
+        self.rules_by_metric: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            self.rules_by_metric.setdefault(rule.metric, []).append(rule)
+        self.cooldown_ms = cooldown_ms
+        self.baseline_alpha = baseline_alpha
+        self.min_baseline_samples = min_baseline_samples
+        self.max_streams = max_streams
+        self._streams: "OrderedDict[Tuple[str, str], StreamState]" = OrderedDict()
+        self._last_alert: Dict[Tuple[str, str], int] = {}
+        self.samples = 0
+        self.alerts = 0
+
+    def _state(self, user_id: str, metric: str) -> Optional[StreamState]:
+        rules = self.rules_by_metric.get(metric)
+        if not rules:
+            return None
+        key = (user_id, metric)
+        state = self._streams.get(key)
+        if state is None:
+            state = self._streams[key] = StreamState(rules, self.baseline_alpha)
+            if len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+        else:
+            self._streams.move_to_end(key)
+        return state
+
+    def observe(self, user_id: str, metric: str, series: WearableSeries) -> List[Dict[str, Any]]:
+        """Feed samples of one stream (in time order) and return the alerts they raised"""
+        state = self._state(user_id, metric)
+        if state is None or len(series) == 0:
+            return []
+        alerts: List[Dict[str, Any]] = []
+        rules, windows, baseline = state.rules, state.windows, state.baseline
+        min_baseline = self.min_baseline_samples
+        last_timestamp = state.last_timestamp
+        for timestamp, value in zip(series.timestamps.tolist(), series.values.tolist()):
+            # Late or duplicate samples would corrupt the rolling windows
+            if timestamp <= last_timestamp:
+                continue
+            last_timestamp = timestamp
+            for rule, window in zip(rules, windows):
+                window.push(timestamp, value)
+                if window.covered_ms < rule.min_coverage_ms:
+                    continue
+                mean = window.mean
+                fired = False
+                if rule.threshold is not None:
+                    fired = mean > rule.threshold if rule.direction == "above" else mean < rule.threshold
+                if not fired and rule.z_threshold is not None and baseline.count >= min_baseline and baseline.var > 0:
+                    fired = abs(mean - baseline.mean) / math.sqrt(baseline.var) > rule.z_threshold
+                if fired:
+                    alert = self._alert(user_id, rule, timestamp, mean)
+                    if alert:
+                        alerts.append(alert)
+            baseline.update(value, baseline.count >= min_baseline)
+            self.samples += 1
+        state.last_timestamp = last_timestamp
+        return alerts
+
+    def observe_batch(self, series: Dict[Tuple[str, str], WearableSeries]) -> List[Dict[str, Any]]:
+        """Feed a parsed ingest batch ({(user_id, metric): series})"""
+        alerts: List[Dict[str, Any]] = []
+        for (user_id, metric), samples in series.items():
+            alerts.extend(self.observe(user_id, metric, samples))
+        return alerts
+
+    def observe_wearable_data(self, data: WearableData) -> List[Dict[str, Any]]:
+        """Feed the heart-rate and vital-sign series of a WearableData payload"""
+        alerts: List[Dict[str, Any]] = []
+        if data.heart_rate and data.heart_rate.data_points is not None:
+            alerts.extend(self.observe(data.user_id, "heart_rate", data.heart_rate.data_points))
+        if data.vitals and data.vitals.data_points:
+            for metric, samples in data.vitals.data_points.items():
+                alerts.extend(self.observe(data.user_id, metric, samples))
+        return alerts
+
+    def _alert(self, user_id: str, rule: Rule, timestamp: int, value: float) -> Optional[Dict[str, Any]]:
+        key = (user_id, rule.name)
+        last = self._last_alert.get(key)
+        if last is not None and timestamp - last < self.cooldown_ms:
+            return None
+        self._last_alert[key] = timestamp
+        self.alerts += 1
+        metrics.incr(f"anomaly.{rule.name}")
+        return {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "title": rule.title,
+            "message": rule.message.format(value=value),
+            "created_at": datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc),
+            "read": False
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"streams": len(self._streams), "samples": self.samples, "alerts": self.alerts}
+
+async def publish_alerts(alerts: List[Dict[str, Any]]):
+    """Hand alerts to the notification outbox, which writes them in batches"""
+    await notification_outbox.publish(
+        notification_outbox.event(alert["user_id"], alert["title"], alert["message"],
+                                  created_at=alert["created_at"], event_id=alert["id"])
+        for alert in alerts
+    )
+
+anomaly_detector = AnomalyDetector()
+metrics.register("anomaly", anomaly_detector.stats)
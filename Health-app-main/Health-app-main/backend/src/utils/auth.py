@@ -1,15 +1,184 @@
-import jwt
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import httpx
 from fastapi import Depends, HTTPException, Header
+from jose import jwt
+from jose.exceptions import JOSEError
 from starlette.status import HTTP_401_UNAUTHORIZED
+from .. import config
+from .metrics import metrics
 
-SUPABASE_JWT_SECRET = "YOUR_SUPABASE_JWT_SECRET"  # Replace with your actual secret
+# Local verification of Supabase access tokens.
+# Tokens are checked in process instead of asking Supabase Auth on every request.
+# HS256 tokens are checked with the project's JWT secret. Asymmetric tokens
+# (RS256/ES256) are checked with the project's JWKS, which is cached and fetched
+# again when a token names a key id it has not seen, so key rotation needs no
+# restart. Verified claims are kept in a bounded LRU keyed by the token's hash
+# until the token expires, so a repeat request costs one hash and one dict lookup.
 
-def get_current_user_id(authorization: str = Header(...)):
+class InvalidToken(Exception):
+    """The token is malformed, expired, or not signed by the project"""
+
+def _jwks_url() -> str:
+    if config.SUPABASE_JWKS_URL:
+        return config.SUPABASE_JWKS_URL
+    supabase_url = os.getenv("SUPABASE_URL", "")
+    return f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else ""
+
+class TokenVerifier:
+    """Per-worker verifier with a cached signing key set and an LRU of verified claims"""
+
+    def __init__(self, secret: Optional[str] = None, jwks_url: Optional[str] = None,
+                 audience: Optional[str] = config.JWT_AUDIENCE, leeway: int = config.JWT_LEEWAY,
+                 max_tokens: int = config.AUTH_CLAIMS_CACHE_SIZE, jwks_ttl: float = config.JWKS_CACHE_TTL,
+                 jwks_min_refresh: float = config.JWKS_REFRESH_MIN_INTERVAL):
+        self.secret = secret if secret is not None else config.SUPABASE_JWT_SECRET
+        self.jwks_url = jwks_url
+        self.audience = audience or None
+        self.leeway = leeway
+        self.max_tokens = max_tokens
+        self.jwks_ttl = jwks_ttl
+        self.jwks_min_refresh = jwks_min_refresh
+        self._claims: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._keys_fetched_at: Optional[float] = None
+        self._keys_lock: Optional[asyncio.Lock] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.hits = 0
+        self.verified = 0
+        self.rejected = 0
+        self.jwks_fetches = 0
+
+    async def _fetch_keys(self) -> Dict[str, Dict[str, Any]]:
+        url = self.jwks_url or _jwks_url()
+        if not url:
+            raise InvalidToken("No JWKS URL configured")
+        # One client per worker, so refreshes reuse its pooled connection
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=config.SUPABASE_TIMEOUT)
+        response = await self._client.get(url)
+        response.raise_for_status()
+        body = response.json()
+        if not isinstance(body, dict) or not isinstance(body.get("keys", []), list):
+            raise ValueError("JWKS response is not a key set")
+        return {key["kid"]: key for key in body.get("keys", []) if isinstance(key, dict) and key.get("kid")}
+
+    async def aclose(self):
+        """Close the JWKS client (worker shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _signing_key(self, kid: Optional[str]) -> Dict[str, Any]:
+        """The JWK for `kid`, refetching the key set when it is stale or the kid is new"""
+        now = time.monotonic()
+        fresh = self._keys_fetched_at is not None and now - self._keys_fetched_at < self.jwks_ttl
+        if kid in self._keys and fresh:
+            return self._keys[kid]
+        # asyncio primitives are created on first use, inside the worker's event loop
+        if self._keys_lock is None:
+            self._keys_lock = asyncio.Lock()
+        async with self._keys_lock:
+            now = time.monotonic()
+            fetched_at = self._keys_fetched_at
+            # An unknown kid refetches at most once per interval, so forged kids cannot flood Supabase
+            if fetched_at is None or now - fetched_at >= self.jwks_ttl or (
+                    kid not in self._keys and now - fetched_at >= self.jwks_min_refresh):
+                try:
+                    self._keys = await self._fetch_keys()
+                    self.jwks_fetches += 1
+                except (httpx.HTTPError, ValueError, KeyError) as e:
+                    # Keep serving the previous keys if the endpoint is briefly unavailable or
+                    # answers with something other than a key set (e.g. a proxy's HTML page)
+                    print(f"JWKS refresh failed: {str(e)}")
+                finally:
+                    # Stamped even on failure, so a broken endpoint is retried once per interval
+                    self._keys_fetched_at = now
+        key = self._keys.get(kid)
+        if key is None:
+            raise InvalidToken("Unknown signing key")
+        return key
+
+    async def _decode(self, token: str) -> Dict[str, Any]:
+        try:
+            header = jwt.get_unverified_header(token)
+            algorithm = header.get("alg")
+            if algorithm == "HS256":
+                if not self.secret:
+                    raise InvalidToken("No JWT secret configured")
+                key: Any = self.secret
+            elif algorithm in ("RS256", "ES256"):
+                key = await self._signing_key(header.get("kid"))
+            else:
+                raise InvalidToken(f"Unsupported algorithm {algorithm}")
+            return jwt.decode(token, key, algorithms=[algorithm], audience=self.audience,
+                              options={"verify_aud": self.audience is not None, "leeway": self.leeway,
+                                       "require_exp": True, "require_sub": True})
+        except JOSEError as e:
+            raise InvalidToken(str(e))
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid token, or InvalidToken"""
+        digest = hashlib.sha256(token.encode()).digest()
+        entry = self._claims.get(digest)
+        now = time.time()
+        if entry is not None:
+            if entry[0] > now:
+                self._claims.move_to_end(digest)
+                self.hits += 1
+                return entry[1]
+            del self._claims[digest]
+        try:
+            claims = await self._decode(token)
+        except InvalidToken:
+            self.rejected += 1
+            raise
+        self.verified += 1
+        self._claims[digest] = (float(claims["exp"]), claims)
+        while len(self._claims) > self.max_tokens:
+            self._claims.popitem(last=False)
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.verified
+        return {
+            "cached_tokens": len(self._claims),
+            "hits": self.hits,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "jwks_keys": len(self._keys),
+            "jwks_fetches": self.jwks_fetches,
+        }
+
+token_verifier = TokenVerifier()
+metrics.register("auth", token_verifier.stats)
+
+def bearer_token(authorization: str) -> str:
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid auth header")
-    token = authorization.split(" ")[1]
+    return authorization.split(" ")[1]
+
+def websocket_token(query_token: Optional[str], protocols: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Access token of a WebSocket handshake and the subprotocol to accept it with"""
+    # Browsers cannot set headers on a WebSocket, so the token comes as the `token`
+    # query parameter or as `Sec-WebSocket-Protocol: bearer, <token>`
+    if query_token:
+        return query_token, None
+    offered = [protocol.strip() for protocol in (protocols or "").split(",")]
+    if len(offered) == 2 and offered[0].lower() == "bearer" and offered[1]:
+        return offered[1], offered[0]
+    return None, None
+
+async def get_current_claims(authorization: str = Header(...)) -> Dict[str, Any]:
     try:
-        payload = jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=["HS256"])
-        return payload["sub"]
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid token") 
\ No newline at end of file
+        return await token_verifier.verify(bearer_token(authorization))
+    except InvalidToken:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+async def get_current_user_id(claims: Dict[str, Any] = Depends(get_current_claims)) -> str:
+    return claims["sub"]
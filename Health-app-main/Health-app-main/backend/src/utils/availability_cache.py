@@ -0,0 +1,118 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from .. import config
+from .cache import MemoryCache, RedisCache
+from .metrics import metrics
+from .redis_client import get_redis
+from .scheduling import BookingIntervals, Interval, booking_interval, days_touched, parse_datetime
+
+# Cached availability per doctor and day.
+# The availability and slot endpoints read a doctor's busy intervals for each day
+# from this cache. Only the doctor-days that are missing are loaded, with one
+# appointments query covering all of them. Slots for any duration or step are then
+# computed from those intervals. Creating, rescheduling or cancelling an
+# appointment invalidates exactly the doctor-days it occupies. A load that races
+# with an invalidation does not write its result back, so stale bookings are
+# never cached. Within a worker an epoch counter detects the race. With Redis,
+# an invalidation from any worker bumps the doctor-day's version there, and the
+# write-back is a compare-and-set against the version read before loading.
+
+Loader = Callable[[Sequence[str], datetime, datetime], Awaitable[List[Dict[str, Any]]]]
+Store = Any  # MemoryCache or RedisCache
+
+def _encode(intervals: List[Interval]) -> List[List[str]]:
+    return [[start.isoformat(), end.isoformat()] for start, end in intervals]
+
+def _decode(value: List[List[str]]) -> List[Interval]:
+    return [(datetime.fromisoformat(start), datetime.fromisoformat(end)) for start, end in value]
+
+class AvailabilityCache:
+    """Busy intervals keyed by (doctor_id, day), in-process or on Redis"""
+
+    def __init__(self, store: Optional[Store] = None,
+                 ttl: float = config.AVAILABILITY_CACHE_TTL,
+                 max_entries: int = config.AVAILABILITY_CACHE_MAX_ENTRIES):
+        self.store = store
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._epoch = 0
+        self._floor = 0
+        self._invalidated: Dict[str, int] = {}
+        self.loads = 0
+
+    @staticmethod
+    def key(doctor_id: str, day: date) -> str:
+        return f"{doctor_id}:{day.isoformat()}"
+
+    def _store(self) -> Store:
+        # Chosen on first use so REDIS_URL from the environment is honoured
+        if self.store is None:
+            redis = get_redis()
+            self.store = (RedisCache(redis, "availability", self.ttl) if redis is not None
+                          else MemoryCache(self.ttl, self.max_entries))
+        return self.store
+
+    async def bookings(self, doctor_ids: Sequence[str], start_day: date, end_day: date,
+                       load: Loader) -> Dict[str, BookingIntervals]:
+        """Busy intervals of each doctor over [start_day, end_day], loading only uncached doctor-days"""
+        store = self._store()
+        days = [start_day + timedelta(days=n) for n in range((end_day - start_day).days + 1)]
+        keys: Dict[Tuple[str, date], str] = {
+            (doctor_id, day): self.key(doctor_id, day) for doctor_id in doctor_ids for day in days
+        }
+        cached = await store.get_many(keys.values())
+
+        intervals: Dict[str, List[Interval]] = {doctor_id: [] for doctor_id in doctor_ids}
+        missing: List[Tuple[str, date]] = []
+        for (doctor_id, day), key in keys.items():
+            if key in cached:
+                intervals[doctor_id].extend(_decode(cached[key]))
+            else:
+                missing.append((doctor_id, day))
+
+        if missing:
+            epoch = self._epoch
+            versions = await store.versions(keys[item] for item in missing)
+            first = min(day for _, day in missing)
+            last = max(day for _, day in missing)
+            range_start = datetime.combine(first, datetime.min.time())
+            rows = await load(sorted({doctor_id for doctor_id, _ in missing}),
+                              range_start, datetime.combine(last + timedelta(days=1), datetime.min.time()))
+            self.loads += 1
+
+            loaded: Dict[str, List[Interval]] = {}
+            for row in rows:
+                loaded.setdefault(str(row["doctor_id"]), []).append(booking_interval(row))
+            fresh: Dict[str, Any] = {}
+            for doctor_id, day in missing:
+                day_start = datetime.combine(day, datetime.min.time())
+                day_end = day_start + timedelta(days=1)
+                day_intervals = [(s, e) for s, e in loaded.get(doctor_id, ()) if s < day_end and e > day_start]
+                intervals[doctor_id].extend(day_intervals)
+                key = keys[(doctor_id, day)]
+                # Skip doctor-days that were invalidated while the query was running
+                if epoch >= self._floor and self._invalidated.get(key, -1) <= epoch:
+                    fresh[key] = _encode(day_intervals)
+            await store.set_many_unchanged(fresh, versions)
+
+        # Bookings spanning midnight appear on both days; BookingIntervals merges them
+        return {doctor_id: BookingIntervals(items) for doctor_id, items in intervals.items()}
+
+    async def invalidate(self, doctor_id: str, start: datetime, end: datetime):
+        """Drop the cached doctor-days an appointment [start, end) occupies"""
+        start, end = parse_datetime(start), parse_datetime(end)
+        self._epoch += 1
+        if len(self._invalidated) >= self.max_entries:
+            # Forget old markers; loads that started before now will not be cached
+            self._invalidated.clear()
+            self._floor = self._epoch
+        keys = [self.key(str(doctor_id), day) for day in days_touched(start, end)]
+        for key in keys:
+            self._invalidated[key] = self._epoch
+        await self._store().invalidate_many(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._store().stats(), "loads": self.loads}
+
+availability_cache = AvailabilityCache()
+metrics.register("availability_cache", availability_cache.stats)
@@ -0,0 +1,232 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional, Sequence, Tuple
+from .. import config
+from .metrics import metrics
+from .scheduling import BookingIntervals, Interval, booking_interval, days_touched, parse_datetime
+
+# Atomic appointment reservation.
+# Each doctor has an asyncio lock and a cached copy of their busy intervals per
+# day. Under the lock a request is checked against those intervals and the
+# reservations still in flight, then it holds its slot. The insert runs after
+# the lock is released, so bookings for different times never wait on each other.
+# A conflict inside one worker is rejected without a database round trip.
+# An accepted booking costs one insert. Across workers the `appointments_no_overlap`
+# exclusion constraint (db/schema_summary.md) decides: a violation means another
+# worker took the slot, so the cached days are dropped and the request fails.
+# Reschedules take the same lock and holds, but are checked against a fresh read
+# that leaves out the appointment's own booking.
+
+DayKey = Tuple[str, date]
+Loader = Callable[[str, datetime, datetime], Awaitable[List[Dict[str, Any]]]]
+ManyLoader = Callable[[Sequence[str], datetime, datetime], Awaitable[List[Dict[str, Any]]]]
+Inserter = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+Writer = Callable[[], Awaitable[Any]]
+
+class SlotConflict(Exception):
+    """The requested time overlaps an existing or in-flight booking of the doctor"""
+
+class ReservationRetry(Exception):
+    """The database rejected the insert with a transient error (serialization failure, deadlock)"""
+
+class BookingLedger:
+    """Per-worker guard that serializes conflicting bookings and holds slots while they are inserted"""
+
+    def __init__(self, ttl: float = config.BOOKING_CACHE_TTL,
+                 max_days: int = config.BOOKING_CACHE_MAX_DAYS,
+                 max_retries: int = config.BOOKING_MAX_RETRIES):
+        self.ttl = ttl
+        self.max_days = max_days
+        self.max_retries = max_retries
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._days: "OrderedDict[DayKey, Tuple[float, BookingIntervals]]" = OrderedDict()
+        self._held: Dict[str, List[Interval]] = {}
+        self.reserved = 0
+        self.moved = 0
+        self.conflicts = 0
+        self.db_conflicts = 0
+        self.retries = 0
+        self.loads = 0
+        self.hits = 0
+
+    def _lock(self, doctor_id: str) -> asyncio.Lock:
+        lock = self._locks.get(doctor_id)
+        if lock is None:
+            lock = self._locks[doctor_id] = asyncio.Lock()
+        return lock
+
+    async def _day(self, doctor_id: str, day: date, load: Loader) -> BookingIntervals:
+        """Busy intervals of a doctor on one day, from the cache or loaded with one query"""
+        key = (doctor_id, day)
+        entry = self._days.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self.ttl:
+            self._days.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        day_start = datetime.combine(day, datetime.min.time())
+        intervals = BookingIntervals.from_appointments(
+            await load(doctor_id, day_start, day_start + timedelta(days=1)))
+        self._days[key] = (now, intervals)
+        self._days.move_to_end(key)
+        while len(self._days) > self.max_days:
+            self._days.popitem(last=False)
+        self.loads += 1
+        return intervals
+
+    def invalidate(self, doctor_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """Forget cached days of a doctor: all of them, or the days [start, end) touches"""
+        if start is None:
+            keys = [key for key in self._days if key[0] == doctor_id]
+        else:
+            start = parse_datetime(start)
+            end = parse_datetime(end) if end is not None else start
+            keys = [(doctor_id, day) for day in days_touched(start, end)]
+        for key in keys:
+            self._days.pop(key, None)
+
+    def _release(self, doctor_id: str, hold: Interval):
+        held = self._held.get(doctor_id)
+        if held is not None:
+            held.remove(hold)
+            if not held:
+                del self._held[doctor_id]
+
+    def _hold(self, doctor_id: str, hold: Interval, busy: bool):
+        """Hold a slot for the doctor unless it is `busy` or overlaps an in-flight hold (lock held)"""
+        start, end = hold
+        if busy or any(s < end and start < e for s, e in self._held.get(doctor_id, ())):
+            self.conflicts += 1
+            raise SlotConflict("Time slot not available")
+        self._held.setdefault(doctor_id, []).append(hold)
+
+    async def _write(self, doctor_id: str, hold: Interval, write: Writer) -> Any:
+        """Run the write for a held slot, retrying transient errors, then release the hold"""
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await write()
+                except ReservationRetry:
+                    if attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                    await asyncio.sleep(random.uniform(0, 0.005 * 2 ** attempt))
+        except SlotConflict:
+            # Another worker booked an overlapping slot first; resync those days
+            self.db_conflicts += 1
+            self.invalidate(doctor_id, *hold)
+            raise
+        finally:
+            self._release(doctor_id, hold)
+
+    async def reserve(self, doctor_id: str, start: datetime, end: datetime, row: Dict[str, Any],
+                      load: Loader, insert: Inserter) -> Dict[str, Any]:
+        """Insert `row` as the doctor's booking for [start, end), or raise SlotConflict"""
+        start, end = parse_datetime(start), parse_datetime(end)
+        days = days_touched(start, end)
+        hold = (start, end)
+
+        async with self._lock(doctor_id):
+            busy = False
+            for day in days:
+                if (await self._day(doctor_id, day, load)).overlaps(start, end):
+                    busy = True
+                    break
+            self._hold(doctor_id, hold, busy)
+
+        created = await self._write(doctor_id, hold, lambda: insert(row))
+        for day in days:
+            entry = self._days.get((doctor_id, day))
+            if entry is not None:
+                entry[1].add(start, end)
+        self.reserved += 1
+        return created
+
+    async def move(self, doctor_id: str, appointment_id: str, start: datetime, end: datetime,
+                   load: Loader, write: Writer) -> Any:
+        """Run `write` to move an appointment to [start, end), or raise SlotConflict.
+
+        The appointment's own current booking does not count as busy, so it can move
+        within its own slot. Cached days cannot tell bookings apart, so the check reads
+        the doctor's bookings around the new time afresh.
+        """
+        start, end = parse_datetime(start), parse_datetime(end)
+        hold = (start, end)
+        async with self._lock(doctor_id):
+            rows = await load(doctor_id, start, end)
+            others = BookingIntervals(booking_interval(row) for row in rows if str(row.get("id")) != appointment_id)
+            self._hold(doctor_id, hold, others.overlaps(start, end))
+
+        written = await self._write(doctor_id, hold, write)
+        # The caller drops the days of the old time as well
+        self.invalidate(doctor_id, start, end)
+        self.moved += 1
+        return written
+
+    async def hold_many(self, items: Sequence[Tuple[str, datetime, datetime]], load: ManyLoader,
+                        ignore_ids: Collection[str] = ()) -> List[bool]:
+        """Check a batch of (doctor_id, start, end) against one fetch and hold the free ones.
+
+        Bookings whose id is in `ignore_ids` (appointments being moved) do not count as
+        busy. Items are checked in order, so later items also conflict with earlier ones.
+        Every accepted item must be passed back to `release_many` once written.
+        """
+        if not items:
+            return []
+        doctors = sorted({doctor_id for doctor_id, _, _ in items})
+        # Locks are always taken in doctor-id order, so two batches cannot deadlock
+        acquired: List[asyncio.Lock] = []
+        try:
+            for doctor_id in doctors:
+                lock = self._lock(doctor_id)
+                await lock.acquire()
+                acquired.append(lock)
+            rows = await load(doctors, min(start for _, start, _ in items), max(end for _, _, end in items))
+            busy: Dict[str, List[Interval]] = {doctor_id: list(self._held.get(doctor_id, ())) for doctor_id in doctors}
+            for row in rows:
+                if str(row.get("id")) not in ignore_ids:
+                    busy[str(row["doctor_id"])].append(booking_interval(row))
+            intervals = {doctor_id: BookingIntervals(busy[doctor_id]) for doctor_id in doctors}
+
+            accepted = []
+            for doctor_id, start, end in items:
+                free = not intervals[doctor_id].overlaps(start, end)
+                if free:
+                    intervals[doctor_id].add(start, end)
+                    self._held.setdefault(doctor_id, []).append((start, end))
+                else:
+                    self.conflicts += 1
+                accepted.append(free)
+            return accepted
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def release_many(self, items: Sequence[Tuple[str, datetime, datetime]], accepted: Sequence[bool],
+                     written: Sequence[bool]):
+        """Drop the holds taken by `hold_many`; written items make their cached days stale"""
+        for (doctor_id, start, end), held, done in zip(items, accepted, written):
+            if held:
+                self._release(doctor_id, (start, end))
+            if done:
+                self.reserved += 1
+                self.invalidate(doctor_id, start, end)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reserved": self.reserved,
+            "moved": self.moved,
+            "conflicts": self.conflicts,
+            "db_conflicts": self.db_conflicts,
+            "retries": self.retries,
+            "cached_days": len(self._days),
+            "day_hits": self.hits,
+            "day_loads": self.loads,
+            "in_flight": sum(len(held) for held in self._held.values()),
+        }
+
+booking_ledger = BookingLedger()
+metrics.register("booking_ledger", booking_ledger.stats)
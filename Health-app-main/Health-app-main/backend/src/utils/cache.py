@@ -0,0 +1,222 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Key/value caches shared by the read-heavy endpoints.
+# MemoryCache is a per-worker TTL + LRU map. RedisCache has the same async
+# interface over a shared Redis, so every worker sees the same entries and
+# invalidations. Values in Redis are stored as JSON. Both count hits and misses
+# for GET /metrics.
+# For loaders that must not write back a value computed before a concurrent
+# invalidation, RedisCache also keeps a version per key: invalidate_many bumps
+# it, and set_many_unchanged only writes keys whose version is still the one
+# read before loading. MemoryCache has a single worker as its only writer, so
+# its callers guard it themselves and these methods reduce to plain set/delete.
+
+# Write each value only if its key's version is unchanged.
+# KEYS: n entry keys then their n version keys. ARGV: TTL in ms, n expected
+# versions ("" for none), n values.
+SET_IF_UNCHANGED = """
+local n = #KEYS / 2
+local written = 0
+for i = 1, n do
+    if (redis.call('GET', KEYS[n + i]) or '') == ARGV[1 + i] then
+        redis.call('SET', KEYS[i], ARGV[1 + n + i], 'PX', ARGV[1])
+        written = written + 1
+    end
+end
+return written
+"""
+
+class MemoryCache:
+    """In-process cache with a TTL per entry and least-recently-used eviction"""
+
+    backend = "memory"
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    async def set_many(self, items: Dict[str, Any]):
+        for key, value in items.items():
+            self.set(key, value)
+
+    async def delete_many(self, keys: Iterable[str]):
+        for key in keys:
+            self.delete(key)
+
+    async def versions(self, keys: Iterable[str]) -> Dict[str, str]:
+        return {}
+
+    async def set_many_unchanged(self, items: Dict[str, Any], versions: Dict[str, str]):
+        await self.set_many(items)
+
+    async def invalidate_many(self, keys: Iterable[str]):
+        await self.delete_many(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+class RedisCache:
+    """Cache entries in Redis under a key prefix, expiring after the TTL"""
+
+    backend = "redis"
+
+    def __init__(self, redis: Any, prefix: str, ttl: float):
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_writes = 0
+        self.errors = 0
+        self._set_if_unchanged = None
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _version_key(self, key: str) -> str:
+        return f"{self.prefix}:version:{key}"
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = await self.redis.mget([self._key(key) for key in keys])
+        except Exception:
+            # Redis is an optimization: when it is unreachable, treat everything as a miss
+            self.errors += 1
+            self.misses += len(keys)
+            return {}
+        found = {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, items: Dict[str, Any]):
+        if not items:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(self._key(key), json.dumps(value), px=int(self.ttl * 1000))
+                await pipe.execute()
+        except Exception:
+            self.errors += 1
+
+    async def delete_many(self, keys: Iterable[str]):
+        keys = [self._key(key) for key in keys]
+        if not keys:
+            return
+        try:
+            self.invalidations += await self.redis.delete(*keys)
+        except Exception:
+            self.errors += 1
+
+    async def versions(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Current version of each key ("" if never invalidated); read before loading its value"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = await self.redis.mget([self._version_key(key) for key in keys])
+        except Exception:
+            self.errors += 1
+            return {}
+        return {key: value.decode() if value is not None else "" for key, value in zip(keys, values)}
+
+    async def set_many_unchanged(self, items: Dict[str, Any], versions: Dict[str, str]):
+        """Write only the items whose key was not invalidated (by any worker) since `versions`"""
+        items = {key: value for key, value in items.items() if key in versions}
+        if not items:
+            return
+        if self._set_if_unchanged is None:
+            self._set_if_unchanged = self.redis.register_script(SET_IF_UNCHANGED)
+        keys = list(items)
+        try:
+            written = await self._set_if_unchanged(
+                keys=[self._key(key) for key in keys] + [self._version_key(key) for key in keys],
+                args=[int(self.ttl * 1000), *(versions[key] for key in keys),
+                      *(json.dumps(items[key]) for key in keys)])
+            self.stale_writes += len(keys) - int(written)
+        except Exception:
+            self.errors += 1
+
+    async def invalidate_many(self, keys: Iterable[str]):
+        """Delete the keys and bump their versions, so loads already in flight are not written back"""
+        keys = list(keys)
+        if not keys:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for key in keys:
+                    pipe.incr(self._version_key(key))
+                    # Versions outlive any load that could have read them
+                    pipe.pexpire(self._version_key(key), int(self.ttl * 2000))
+                pipe.delete(*(self._key(key) for key in keys))
+                results = await pipe.execute()
+            self.invalidations += results[-1]
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "stale_writes": self.stale_writes,
+            "errors": self.errors,
+        }
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pydantic import ValidationError
+from .. import config
+from ..models.doctor import Doctor
+from .doctor_search import DoctorSearchIndex
+from .geo_index import GeoGridIndex, Loader, doctor_geo_index
+from .metrics import metrics
+
+# In-process directory of the `doctors` table.
+# The table is read once per worker and kept as one record per doctor, indexed
+# by id, by specialty, by location (the geo grid) and by search term (the
+# inverted index behind /doctors/search). Writes made through this
+# worker (/doctors/register, /profile/doctor) update the indexes in place; a
+# TTL reload picks up writes made by other workers. The reload runs in the
+# background while requests keep reading the current copy, and writes that land
+# during it are replayed on top of the fresh snapshot.
+# The full /doctors/locations listing is kept as pre-serialized JSON: every
+# doctor's fragment is encoded once when it changes and the list is only joined
+# again after a change.
+
+def _specialty_key(specialty: Any) -> str:
+    return str(specialty or "").strip().lower()
+
+class DoctorDirectory:
+    """Doctors by id, specialty, location and search term, with the full listing pre-serialized"""
+
+    def __init__(self, geo: Optional[GeoGridIndex] = None, ttl: float = config.DOCTOR_INDEX_TTL):
+        self.geo = geo or GeoGridIndex(ttl=ttl)
+        self.text = DoctorSearchIndex()
+        self.ttl = ttl
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        # Values are insertion-ordered dicts used as sets, so results keep table order
+        self._by_specialty: Dict[str, Dict[str, None]] = {}
+        self._fragments: Dict[str, bytes] = {}
+        self._listing: Optional[Tuple[bytes, str]] = None
+        self._loaded_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh: Optional[asyncio.Task] = None
+        # Writes seen while a reload is in flight: doctor id -> new record (None when removed)
+        self._changed: Optional[Dict[str, Optional[Dict[str, Any]]]] = None
+        self.reloads = 0
+        self.upserts = 0
+        self.listing_builds = 0
+
+    # -- maintenance --------------------------------------------------------
+
+    def _unindex(self, doctor_id: str, doctor: Dict[str, Any]):
+        key = _specialty_key(doctor.get("specialty"))
+        members = self._by_specialty.get(key)
+        if members is not None:
+            members.pop(doctor_id, None)
+            if not members:
+                del self._by_specialty[key]
+
+    def _index(self, doctor: Dict[str, Any]):
+        # Assigning an existing key keeps its place, so an updated doctor keeps their position in the listing
+        doctor_id = str(doctor.get("id"))
+        self._by_id[doctor_id] = doctor
+        self._by_specialty.setdefault(_specialty_key(doctor.get("specialty")), {})[doctor_id] = None
+        try:
+            self._fragments[doctor_id] = Doctor.model_validate(doctor).model_dump_json().encode()
+        except ValidationError:
+            # Incomplete entries (e.g. no location yet) stay out of the listing
+            self._fragments.pop(doctor_id, None)
+
+    def upsert(self, doctor: Dict[str, Any]):
+        """Add a doctor or replace their record after a write"""
+        doctor_id = str(doctor.get("id"))
+        previous = self._by_id.get(doctor_id)
+        if previous is not None:
+            self._unindex(doctor_id, previous)
+        self._index(doctor)
+        self.geo.upsert(doctor)
+        self.text.upsert(doctor)
+        self._listing = None
+        self.upserts += 1
+        if self._changed is not None:
+            self._changed[doctor_id] = doctor
+
+    def remove(self, doctor_id: str):
+        doctor = self._by_id.pop(doctor_id, None)
+        if doctor is not None:
+            self._unindex(doctor_id, doctor)
+        self._fragments.pop(doctor_id, None)
+        self.geo.remove(doctor_id)
+        self.text.remove(doctor_id)
+        self._listing = None
+        if self._changed is not None:
+            self._changed[doctor_id] = None
+
+    def load(self, doctors: List[Dict[str, Any]]):
+        """Replace the whole directory with a fresh list of doctors"""
+        self._by_id, self._by_specialty, self._fragments = {}, {}, {}
+        for doctor in doctors:
+            self._index(doctor)
+        self.geo.load(doctors)
+        self.text.load(doctors)
+        self._listing = None
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def _reload(self, loader: Loader):
+        self._changed = {}
+        try:
+            doctors = await loader()
+            changed = self._changed
+            self._changed = None
+            self.load(doctors)
+            # Writes made while the snapshot was being read win over it
+            for doctor_id, doctor in changed.items():
+                if doctor is None:
+                    self.remove(doctor_id)
+                else:
+                    self.upsert(doctor)
+        finally:
+            self._changed = None
+
+    async def _background_reload(self, loader: Loader):
+        try:
+            await self._reload(loader)
+        except Exception as e:
+            # Keep serving the current copy; the next request past the TTL tries again
+            print(f"Doctor directory reload failed: {str(e)}")
+
+    async def ensure_loaded(self, loader: Loader):
+        """Load on first use; once the TTL has passed, reload in the background"""
+        if self._loaded_at is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._loaded_at is None:
+                    await self._reload(loader)
+            return
+        if time.monotonic() - self._loaded_at >= self.ttl and (self._refresh is None or self._refresh.done()):
+            self._refresh = asyncio.get_running_loop().create_task(self._background_reload(loader))
+
+    # -- queries ------------------------------------------------------------
+
+    def get(self, doctor_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(str(doctor_id))
+
+    def by_ids(self, doctor_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Records of the given doctors that are in the directory"""
+        return [doctor for doctor in map(self.get, doctor_ids) if doctor is not None]
+
+    def by_specialty(self, specialty: str) -> List[Dict[str, Any]]:
+        """Doctors whose specialty matches, ignoring case"""
+        return [self._by_id[doctor_id] for doctor_id in self._by_specialty.get(_specialty_key(specialty), ())]
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float,
+               limit: int = 20) -> List[Tuple[float, Dict[str, Any]]]:
+        return self.geo.nearby(latitude, longitude, radius_km, limit)
+
+    def search(self, q: Optional[str] = None, limit: int = 20, offset: int = 0,
+               latitude: Optional[float] = None, longitude: Optional[float] = None,
+               radius_km: Optional[float] = None,
+               **filters: Optional[str]) -> Tuple[List[Tuple[Optional[float], Dict[str, Any]]], bool]:
+        """(page of (distance_km, doctor), whether more follow); nearest first when a location is given"""
+        if latitude is None or longitude is None:
+            return self.text.search(q, limit, offset, **filters)
+
+        def near():
+            return self.geo.nearby(latitude, longitude, radius_km, limit=max(len(self.geo), 1))
+
+        return self.text.search(q, limit, offset, location=(latitude, longitude, radius_km), near=near, **filters)
+
+    def listing(self) -> Tuple[bytes, str]:
+        """(JSON array of every listable doctor, ETag), rebuilt only after a change"""
+        if self._listing is None:
+            body = b"[" + b",".join(self._fragments.values()) + b"]"
+            self._listing = (body, f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"')
+            self.listing_builds += 1
+        return self._listing
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "doctors": len(self._by_id),
+            "specialties": len(self._by_specialty),
+            "listed": len(self._fragments),
+            "unlisted": len(self._by_id) - len(self._fragments),
+            "reloads": self.reloads,
+            "upserts": self.upserts,
+            "listing_builds": self.listing_builds,
+            "search": self.text.stats(),
+        }
+
+doctor_directory = DoctorDirectory(geo=doctor_geo_index)
+metrics.register("doctor_directory", doctor_directory.stats)
@@ -0,0 +1,291 @@
+import bisect
+import math
+import re
+from collections import OrderedDict
+from itertools import islice
+from typing import AbstractSet, Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from .geo_index import haversine_km_array
+
+# In-process inverted index for /doctors/search.
+# Every doctor is tokenized once (name, specialty, languages, qualifications,
+# clinic) into a posting set per token, plus exact facet sets for specialty,
+# language and clinic filters. Query terms are prefixes, so typeahead works on
+# partial words: a prefix is the range of the sorted vocabulary that starts with
+# it. Selective terms and filters are intersected as sets; a broad prefix such
+# as "a" is never unioned, it is checked per candidate against its token range.
+# Results come in name order, kept as a sorted list of doctors, so a broad
+# query reads that order and stops once the page is full. With a location they
+# come nearest first: distances are computed over the candidates in one numpy
+# pass, or taken from the geo grid when nothing narrows the search.
+
+SEARCH_FIELDS = ("name", "firstName", "lastName", "specialty", "languages", "qualifications", "clinicAffiliation")
+FACETS = {"specialty": "specialty", "language": "languages", "clinic": "clinicAffiliation"}
+
+TOKEN = re.compile(r"\w+")
+LIST_SEPARATOR = re.compile(r"[,;/|]")
+
+# A prefix is unioned into a candidate set only if it spans at most this many tokens
+# and, unless it is a single token, matches at most this share of doctors
+BROAD_PREFIX_TOKENS = 256
+BROAD_PREFIX_SHARE = 0.25
+# Candidate sets up to this size are sorted directly; larger ones are read in name order
+SORT_LIMIT = 500
+# Candidate sets up to this size are measured directly; larger ones are read from the geo grid
+DISTANCE_LIMIT = 50000
+PREFIX_CACHE_SIZE = 1024
+
+Location = Tuple[float, float, float]
+Nearby = Callable[[], List[Tuple[float, Dict[str, Any]]]]
+
+def tokenize(text: Any) -> List[str]:
+    return TOKEN.findall(str(text).casefold()) if text else []
+
+def facet_values(field: str, value: Any) -> List[str]:
+    """Normalized facet values of a field; languages hold a list ("English, Hindi")"""
+    if not value:
+        return []
+    parts = LIST_SEPARATOR.split(str(value)) if field == "languages" else [str(value)]
+    return [part.strip().casefold() for part in parts if part.strip()]
+
+def _sort_key(doctor: Dict[str, Any]) -> Tuple[str, str]:
+    return str(doctor.get("name") or "").casefold(), str(doctor.get("id"))
+
+def _radians(value: Any) -> float:
+    return math.radians(float(value)) if value is not None else math.nan
+
+class DoctorSearchIndex:
+    """Token and facet postings over the doctor directory, maintained incrementally"""
+
+    def __init__(self):
+        self._reset()
+        self.queries = 0
+
+    def _reset(self):
+        self._docs: List[Optional[Dict[str, Any]]] = []
+        self._doc_tokens: List[Tuple[str, ...]] = []
+        self._doc_facets: List[Tuple[Tuple[str, str], ...]] = []
+        self._keys: List[Tuple[str, str]] = []
+        self._doc_of: Dict[str, int] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._vocabulary: List[str] = []
+        self._facets: Dict[Tuple[str, str], Set[int]] = {}
+        self._order: List[int] = []
+        # Sort key of each doctor in _order, kept alongside it for bisect (key= needs Python 3.10)
+        self._order_keys: List[Tuple[str, str]] = []
+        # Coordinates in radians by doc number (NaN without a location), grown by doubling
+        self._lat = np.full(1024, np.nan)
+        self._lon = np.full(1024, np.nan)
+        self._prefix_cache: "OrderedDict[str, Tuple[FrozenSet[str], Optional[AbstractSet[int]]]]" = OrderedDict()
+        # Posting or facet set -> (the set, its doc numbers as an array), for distance searches
+        self._arrays: Dict[int, Tuple[AbstractSet[int], np.ndarray]] = {}
+
+    # -- maintenance --------------------------------------------------------
+
+    def _add_token(self, token: str, doc: int):
+        posting = self._postings.get(token)
+        if posting is None:
+            posting = self._postings[token] = set()
+            bisect.insort(self._vocabulary, token)
+        posting.add(doc)
+
+    def _drop_token(self, token: str, doc: int):
+        posting = self._postings.get(token)
+        if posting is None:
+            return
+        posting.discard(doc)
+        if not posting:
+            del self._postings[token]
+            del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    def _unindex(self, doc: int):
+        for token in self._doc_tokens[doc]:
+            self._drop_token(token, doc)
+        for facet in self._doc_facets[doc]:
+            members = self._facets.get(facet)
+            if members is not None:
+                members.discard(doc)
+                if not members:
+                    del self._facets[facet]
+        position = bisect.bisect_left(self._order_keys, self._keys[doc])
+        if position < len(self._order) and self._order[position] == doc:
+            del self._order[position]
+            del self._order_keys[position]
+
+    def _new_doc(self, doctor_id: str) -> int:
+        doc = self._doc_of[doctor_id] = len(self._docs)
+        self._docs.append(None)
+        self._doc_tokens.append(())
+        self._doc_facets.append(())
+        self._keys.append(("", ""))
+        if doc == len(self._lat):
+            self._lat = np.concatenate([self._lat, np.full(doc, np.nan)])
+            self._lon = np.concatenate([self._lon, np.full(doc, np.nan)])
+        return doc
+
+    def upsert(self, doctor: Dict[str, Any]):
+        """Index a new doctor or re-index one whose profile changed"""
+        doctor_id = str(doctor.get("id"))
+        doc = self._doc_of.get(doctor_id)
+        if doc is None:
+            doc = self._new_doc(doctor_id)
+        else:
+            self._unindex(doc)
+        tokens = tuple(dict.fromkeys(token for field in SEARCH_FIELDS for token in tokenize(doctor.get(field))))
+        facets = tuple(dict.fromkeys((facet, value) for facet, field in FACETS.items()
+                                     for value in facet_values(field, doctor.get(field))))
+        for token in tokens:
+            self._add_token(token, doc)
+        for facet in facets:
+            self._facets.setdefault(facet, set()).add(doc)
+        self._docs[doc] = doctor
+        self._doc_tokens[doc] = tokens
+        self._doc_facets[doc] = facets
+        self._keys[doc] = _sort_key(doctor)
+        self._lat[doc] = _radians(doctor.get("latitude"))
+        self._lon[doc] = _radians(doctor.get("longitude"))
+        position = bisect.bisect_right(self._order_keys, self._keys[doc])
+        self._order.insert(position, doc)
+        self._order_keys.insert(position, self._keys[doc])
+        self._prefix_cache.clear()
+        self._arrays.clear()
+
+    def remove(self, doctor_id: str):
+        doc = self._doc_of.pop(str(doctor_id), None)
+        if doc is None:
+            return
+        self._unindex(doc)
+        self._docs[doc] = None
+        self._doc_tokens[doc] = ()
+        self._doc_facets[doc] = ()
+        self._lat[doc] = self._lon[doc] = math.nan
+        self._prefix_cache.clear()
+        self._arrays.clear()
+
+    def load(self, doctors: Iterable[Dict[str, Any]]):
+        """Rebuild from scratch (numbering is compacted)"""
+        self._reset()
+        for doctor in doctors:
+            self.upsert(doctor)
+
+    # -- queries ------------------------------------------------------------
+
+    def _prefix(self, prefix: str) -> Tuple[FrozenSet[str], Optional[AbstractSet[int]]]:
+        """(vocabulary tokens starting with `prefix`, their doctors or None when too broad to union)"""
+        cached = self._prefix_cache.get(prefix)
+        if cached is not None:
+            self._prefix_cache.move_to_end(prefix)
+            return cached
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff", start)
+        tokens = self._vocabulary[start:end]
+        docs: Optional[AbstractSet[int]] = None
+        if not tokens:
+            docs = frozenset()
+        elif len(tokens) == 1:
+            docs = self._postings[tokens[0]]
+        elif len(tokens) <= BROAD_PREFIX_TOKENS:
+            postings = [self._postings[token] for token in tokens]
+            if sum(map(len, postings)) <= len(self._doc_of) * BROAD_PREFIX_SHARE:
+                docs = frozenset().union(*postings)
+        entry = self._prefix_cache[prefix] = (frozenset(tokens), docs)
+        while len(self._prefix_cache) > PREFIX_CACHE_SIZE:
+            self._prefix_cache.popitem(last=False)
+        return entry
+
+    def _conditions(self, q: Optional[str],
+                    filters: Dict[str, Optional[str]]) -> Tuple[List[AbstractSet[int]], List[FrozenSet[str]]]:
+        """(candidate sets, smallest first; token ranges of broad prefixes, checked per doctor)"""
+        sets: List[AbstractSet[int]] = []
+        broad: List[FrozenSet[str]] = []
+        for facet, value in filters.items():
+            if value:
+                sets.append(self._facets.get((facet, value.strip().casefold()), frozenset()))
+        for prefix in dict.fromkeys(tokenize(q)):
+            tokens, docs = self._prefix(prefix)
+            if docs is None:
+                broad.append(tokens)
+            else:
+                sets.append(docs)
+        sets.sort(key=len)
+        return sets, broad
+
+    def _matching(self, docs: Iterable[int], sets: List[AbstractSet[int]],
+                  broad: List[FrozenSet[str]]) -> Iterator[int]:
+        """Docs from `docs`, in order, that are in every set and match every broad prefix"""
+        for members in sets:
+            docs = filter(members.__contains__, docs)
+        doc_tokens = self._doc_tokens
+        for tokens in broad:
+            docs = filter(lambda doc, tokens=tokens: not tokens.isdisjoint(doc_tokens[doc]), docs)
+        return docs
+
+    def search(self, q: Optional[str] = None, limit: int = 20, offset: int = 0,
+               location: Optional[Location] = None, near: Optional[Nearby] = None,
+               **filters: Optional[str]) -> Tuple[List[Tuple[Optional[float], Dict[str, Any]]], bool]:
+        """(page of (distance_km or None, doctor), whether more follow) for a query and facet filters.
+
+        Without a `location` (latitude, longitude, radius_km) the page is in name order. With
+        one it is nearest first, and `near()` must list every doctor within the radius,
+        nearest first, for searches too broad to measure directly.
+        """
+        self.queries += 1
+        sets, broad = self._conditions(q, filters)
+        wanted = offset + limit + 1
+        if location is not None:
+            found = self._nearest(sets, broad, location, near, wanted)
+        else:
+            found = [(None, self._docs[doc]) for doc in self._by_name(sets, broad, wanted)]
+        return found[offset:offset + limit], len(found) == wanted
+
+    def _by_name(self, sets: List[AbstractSet[int]], broad: List[FrozenSet[str]], wanted: int) -> List[int]:
+        if sets:
+            total = max(len(self._doc_of), 1)
+            selectivity = math.prod(len(members) / total for members in sets)
+            # Intersect, unless walking the name order is expected to fill the page sooner
+            if selectivity == 0 or wanted / selectivity > len(sets[0]):
+                candidates = sets[0]
+                for members in sets[1:]:
+                    candidates = candidates & members
+                if len(candidates) <= SORT_LIMIT:
+                    return sorted(self._matching(candidates, [], broad), key=self._keys.__getitem__)[:wanted]
+                sets = [candidates]
+        return list(islice(self._matching(self._order, sets, broad), wanted))
+
+    def _array(self, members: AbstractSet[int]) -> np.ndarray:
+        cached = self._arrays.get(id(members))
+        if cached is None or cached[0] is not members:
+            if len(self._arrays) >= PREFIX_CACHE_SIZE:
+                self._arrays.clear()
+            cached = self._arrays[id(members)] = (members, np.fromiter(members, dtype=np.int64, count=len(members)))
+        return cached[1]
+
+    def _nearest(self, sets: List[AbstractSet[int]], broad: List[FrozenSet[str]], location: Location,
+                 near: Optional[Nearby], wanted: int) -> List[Tuple[float, Dict[str, Any]]]:
+        if sets and len(sets[0]) <= DISTANCE_LIMIT or near is None:
+            latitude, longitude, radius_km = location
+            docs = (self._array(sets[0]) if sets
+                    else np.fromiter(self._doc_of.values(), dtype=np.int64, count=len(self._doc_of)))
+            distances = haversine_km_array(self._lat[docs], self._lon[docs], latitude, longitude)
+            within = np.flatnonzero(distances <= radius_km)
+            within = within[np.argsort(distances[within], kind="stable")]
+            distance_of = dict(zip(docs[within].tolist(), distances[within].tolist()))
+            return [(distance_of[doc], self._docs[doc])
+                    for doc in islice(self._matching(distance_of, sets[1:], broad), wanted)]
+        found = []
+        for distance, doctor in near():
+            doc = self._doc_of.get(str(doctor.get("id")))
+            if doc is not None and next(self._matching((doc,), sets, broad), None) is not None:
+                found.append((distance, doctor))
+                if len(found) == wanted:
+                    break
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "doctors": len(self._doc_of),
+            "tokens": len(self._postings),
+            "facet_values": len(self._facets),
+            "queries": self.queries,
+            "cached_prefixes": len(self._prefix_cache),
+        }
@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from .. import config
+
+# Streaming exports.
+# Large listings are read in keyset pages and written to the response as each
+# page arrives, so memory stays at one page however many rows are exported and
+# the client starts receiving data after the first query. Bulk exports are NDJSON
+# or CSV, gzipped on the fly for clients that accept it; an interrupted download
+# resumes after the last row received instead of starting over.
+
+C = TypeVar("C")
+PageFetcher = Callable[[Optional[C], int], Awaitable[List[Dict[str, Any]]]]
+Pages = AsyncIterator[List[Dict[str, Any]]]
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+FORMAT_PATTERN = f"^({'|'.join(EXPORT_FORMATS)})$"
+
+async def iter_pages(fetch: PageFetcher, cursor_of: Callable[[Dict[str, Any]], C],
+                     page_size: int, after: Optional[C] = None) -> Pages:
+    """Pages from `fetch(after, limit)` until a short page, each starting after the previous one's last row"""
+    while True:
+        rows = await fetch(after, page_size)
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        after = cursor_of(rows[-1])
+
+def _json(row: Dict[str, Any]) -> str:
+    return json.dumps(row, default=str, separators=(",", ":"))
+
+async def json_array(pages: Pages) -> AsyncIterator[bytes]:
+    """Encode pages of rows as one JSON array, one chunk per page"""
+    opened = False
+    async for rows in pages:
+        chunk = ",".join(_json(row) for row in rows)
+        yield (("," if opened else "[") + chunk).encode()
+        opened = True
+    yield b"]" if opened else b"[]"
+
+async def ndjson(pages: Pages) -> AsyncIterator[bytes]:
+    """Encode pages of rows as newline-delimited JSON, one chunk per page"""
+    async for rows in pages:
+        yield "".join(_json(row) + "\n" for row in rows).encode()
+
+def _cell(value: Any) -> Any:
+    """CSV cell for a column value; nested objects and lists are written as JSON"""
+    if isinstance(value, (dict, list)):
+        return _json(value)
+    return value
+
+async def csv_table(pages: Pages) -> AsyncIterator[bytes]:
+    """Encode pages of rows as CSV with a header taken from the first row, one chunk per page"""
+    buffer = io.StringIO()
+    writer = None
+    async for rows in pages:
+        if writer is None:
+            writer = csv.DictWriter(buffer, list(rows[0]), extrasaction="ignore", lineterminator="\n")
+            writer.writeheader()
+        writer.writerows({column: _cell(value) for column, value in row.items()} for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+async def gzipped(chunks: AsyncIterator[bytes], level: int = config.EXPORT_GZIP_LEVEL) -> AsyncIterator[bytes]:
+    """Compress a stream into one gzip member as it is produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        # Flushed per chunk, so every page reaches the client as soon as it is encoded
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def export_response(request: Request, pages: Pages, format: str, name: str) -> StreamingResponse:
+    """Stream pages as an NDJSON or CSV download, gzipped if the client accepts it"""
+    body = ndjson(pages) if format == "ndjson" else csv_table(pages)
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{format}"', "Vary": "Accept-Encoding"}
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        body = gzipped(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format], headers=headers)
@@ -0,0 +1,188 @@
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from .. import config
+from .metrics import metrics
+
+# In-memory spatial index of doctor locations for radius search.
+# Doctors are bucketed into a fixed lat/lon grid; a query only visits the cells
+# overlapping the search circle's bounding box and computes exact haversine
+# distances, vectorised over those cells' coordinate arrays. The shared index is
+# the location part of the doctor directory (doctor_directory.py), which loads
+# it, reloads it on a TTL and updates it in place on doctor writes.
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+Loader = Callable[[], Awaitable[List[Dict[str, Any]]]]
+Cell = Tuple[int, int]
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def haversine_km_array(lat: np.ndarray, lon: np.ndarray, latitude: float, longitude: float) -> np.ndarray:
+    """Distances in km from one point to arrays of points given in radians (NaN stays NaN)"""
+    phi = math.radians(latitude)
+    a = (np.sin((lat - phi) / 2) ** 2
+         + math.cos(phi) * np.cos(lat) * np.sin((lon - math.radians(longitude)) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class _GridCell:
+    """Doctors in one grid cell, with coordinate arrays rebuilt lazily after changes"""
+
+    __slots__ = ("points", "_ids", "_lat", "_lon")
+
+    def __init__(self):
+        self.points: Dict[str, Tuple[float, float]] = {}
+        self._ids: Optional[List[str]] = None
+        self._lat: Optional[np.ndarray] = None
+        self._lon: Optional[np.ndarray] = None
+
+    def put(self, doctor_id: str, point: Tuple[float, float]):
+        self.points[doctor_id] = point
+        self._ids = None
+
+    def pop(self, doctor_id: str):
+        self.points.pop(doctor_id, None)
+        self._ids = None
+
+    def arrays(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        if self._ids is None:
+            self._ids = list(self.points)
+            coords = np.array(list(self.points.values()), dtype=np.float64).reshape(-1, 2)
+            self._lat, self._lon = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+        return self._ids, self._lat, self._lon
+
+class GeoGridIndex:
+    """Grid index of doctors by latitude/longitude"""
+
+    def __init__(self, cell_deg: float = config.DOCTOR_GEO_CELL_DEG,
+                 ttl: float = config.DOCTOR_INDEX_TTL):
+        self.cell_deg = cell_deg
+        self.columns = int(math.ceil(360 / cell_deg))
+        self.ttl = ttl
+        self._cells: Dict[Cell, _GridCell] = {}
+        self._doctors: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.queries = 0
+        self.reloads = 0
+
+    def _cell(self, latitude: float, longitude: float) -> Cell:
+        row = int(math.floor((latitude + 90) / self.cell_deg))
+        column = int(math.floor((longitude + 180) / self.cell_deg)) % self.columns
+        return row, column
+
+    # -- maintenance --------------------------------------------------------
+
+    def upsert(self, doctor: Dict[str, Any]):
+        """Add a doctor or move an existing one to its new location"""
+        doctor_id = str(doctor.get("id"))
+        latitude, longitude = doctor.get("latitude"), doctor.get("longitude")
+        self.remove(doctor_id)
+        self._doctors[doctor_id] = doctor
+        if latitude is None or longitude is None:
+            return
+        point = (float(latitude), float(longitude))
+        self._cells.setdefault(self._cell(*point), _GridCell()).put(doctor_id, point)
+
+    def remove(self, doctor_id: str):
+        doctor = self._doctors.pop(doctor_id, None)
+        if doctor is None or doctor.get("latitude") is None or doctor.get("longitude") is None:
+            return
+        cell = self._cell(float(doctor["latitude"]), float(doctor["longitude"]))
+        members = self._cells.get(cell)
+        if members is not None:
+            members.pop(doctor_id)
+            if not members.points:
+                del self._cells[cell]
+
+    def load(self, doctors: List[Dict[str, Any]]):
+        """Replace the whole index with a fresh list of doctors"""
+        self._cells = {}
+        self._doctors = {}
+        for doctor in doctors:
+            self.upsert(doctor)
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def ensure_loaded(self, loader: Loader):
+        """Load (or reload once the TTL has passed) from the database"""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            self.load(await loader())
+
+    # -- queries ------------------------------------------------------------
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float,
+               limit: int = 20) -> List[Tuple[float, Dict[str, Any]]]:
+        """(distance_km, doctor) pairs within radius_km, nearest first"""
+        self.queries += 1
+        cell = self.cell_deg
+        lat_span = radius_km / KM_PER_DEGREE
+        lat_min, lat_max = max(-90.0, latitude - lat_span), min(90.0, latitude + lat_span)
+        row_min, row_max = self._cell(lat_min, 0)[0], self._cell(lat_max, 0)[0]
+
+        # Longitude degrees shrink towards the poles; widen the box accordingly
+        widest = max(abs(lat_min), abs(lat_max))
+        cos_lat = math.cos(math.radians(widest))
+        if cos_lat <= 1e-9 or lat_span / cos_lat >= 180:
+            columns = range(self.columns)
+        else:
+            lon_span = lat_span / cos_lat
+            first = int(math.floor((longitude - lon_span + 180) / cell))
+            last = int(math.floor((longitude + lon_span + 180) / cell))
+            columns = [c % self.columns for c in range(first, min(last, first + self.columns - 1) + 1)]
+
+        ids: List[str] = []
+        lats: List[np.ndarray] = []
+        lons: List[np.ndarray] = []
+        cells = self._cells
+        for row in range(row_min, row_max + 1):
+            for column in columns:
+                members = cells.get((row, column))
+                if members is None:
+                    continue
+                cell_ids, cell_lat, cell_lon = members.arrays()
+                ids.extend(cell_ids)
+                lats.append(cell_lat)
+                lons.append(cell_lon)
+        if not ids:
+            return []
+
+        lat = np.concatenate(lats) if len(lats) > 1 else lats[0]
+        lon = np.concatenate(lons) if len(lons) > 1 else lons[0]
+        distances = haversine_km_array(lat, lon, latitude, longitude)
+        within = np.flatnonzero(distances <= radius_km)
+        if within.size > limit:
+            within = within[np.argpartition(distances[within], limit - 1)[:limit]]
+        within = within[np.argsort(distances[within], kind="stable")]
+        return [(float(distances[i]), self._doctors[ids[i]]) for i in within.tolist()]
+
+    def get(self, doctor_id: str) -> Optional[Dict[str, Any]]:
+        return self._doctors.get(doctor_id)
+
+    def __len__(self) -> int:
+        return len(self._doctors)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "doctors": len(self._doctors),
+            "cells": len(self._cells),
+            "queries": self.queries,
+            "reloads": self.reloads,
+        }
+
+doctor_geo_index = GeoGridIndex()
+metrics.register("doctor_geo_index", doctor_geo_index.stats)
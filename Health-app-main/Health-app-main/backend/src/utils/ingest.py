@@ -0,0 +1,419 @@
+import asyncio
+import json
+import re
+import struct
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+from ..models.timeseries import WearableSeries, _BINARY_HEADER, _BINARY_MAGIC, _to_epoch_ms, parse_timestamps
+from .. import config
+from .metrics import metrics
+from .supabase_client import registry
+
+# Streaming ingest of samples pushed by wearable/IoT devices.
+# Request bodies are parsed chunk by chunk into one columnar WearableSeries per
+# (user_id, metric), validated with whole-array checks, and appended to an
+# in-memory buffer. A background task flushes the buffer to the
+# `wearable_samples` table in large batched inserts; when the buffer is full,
+# producers wait (and eventually get a 503), which slows clients down instead
+# of growing memory without bound. A batch the database rejects is bisected so
+# the good series are written; a series that keeps failing is dropped after
+# INGEST_MAX_ATTEMPTS writes instead of blocking the buffer.
+
+SeriesKey = Tuple[str, str]
+# A buffered series and the number of writes of it the database has rejected
+Pending = Tuple[SeriesKey, WearableSeries, int]
+Sink = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{1,128}$")
+# wearable_samples.user_id is a uuid column
+_USER_ID_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+# Write failures that say nothing about the rows themselves; the batch is retried whole
+_TRANSIENT_ERRORS = (httpx.TransportError, asyncio.TimeoutError, OSError)
+# Samples older than 2000-01-01 or more than a day in the future are rejected
+_MIN_TIMESTAMP_MS = 946_684_800_000
+_MAX_CLOCK_SKEW_MS = 86_400_000
+
+# Binary frame: user_id length, metric length, user_id, metric, WearableSeries.to_bytes()
+_FRAME_HEADER = struct.Struct("<HH")
+
+class IngestBackpressure(Exception):
+    """Raised when the buffer stayed full for longer than the backpressure timeout"""
+
+class ParsedBatch:
+    """Series parsed from one chunk of a request body, plus the number of rejected samples"""
+
+    def __init__(self):
+        self.series: Dict[SeriesKey, WearableSeries] = {}
+        self.rejected = 0
+
+    def add(self, user_id: Any, metric: Any, timestamps: np.ndarray, values: np.ndarray, unit: str):
+        if not (isinstance(user_id, str) and isinstance(metric, str)
+                and _USER_ID_PATTERN.match(user_id) and _NAME_PATTERN.match(metric)):
+            self.rejected += len(values)
+            return
+        user_id = user_id.lower()
+        now_ms = int(time.time() * 1000)
+        valid = (np.isfinite(values) & (timestamps >= _MIN_TIMESTAMP_MS)
+                 & (timestamps <= now_ms + _MAX_CLOCK_SKEW_MS))
+        self.rejected += int(values.size - valid.sum())
+        if not valid.any():
+            return
+        series = WearableSeries(timestamps[valid], values[valid], unit)
+        key = (user_id, metric)
+        if key in self.series:
+            series = WearableSeries.concat([self.series[key], series], series.unit or self.series[key].unit)
+        self.series[key] = series
+
+    def restrict_to(self, user_id: str) -> int:
+        """Drop the series of every other user; returns how many samples were dropped"""
+        others = [key for key in self.series if key[0] != user_id.lower()]
+        dropped = sum(len(self.series.pop(key)) for key in others)
+        self.rejected += dropped
+        return dropped
+
+    @property
+    def accepted(self) -> int:
+        return sum(len(s) for s in self.series.values())
+
+def encode_frame(user_id: str, metric: str, series: WearableSeries) -> bytes:
+    """Encode one binary ingest frame (the format accepted as application/octet-stream)"""
+    user, name = user_id.encode(), metric.encode()
+    return _FRAME_HEADER.pack(len(user), len(name)) + user + name + series.to_bytes()
+
+def _values_column(values: List[Any]) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                column[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return column
+
+def _timestamps_column(timestamps: List[Any]) -> np.ndarray:
+    try:
+        return parse_timestamps(timestamps)
+    except (TypeError, ValueError, OverflowError):
+        # Fall back to per-sample parsing only when the column has bad entries;
+        # unparseable timestamps become 0 and fail the range check
+        column = np.zeros(len(timestamps), dtype=np.int64)
+        for i, timestamp in enumerate(timestamps):
+            try:
+                column[i] = _to_epoch_ms(timestamp)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return column
+
+class NDJSONParser:
+    """Incremental parser for application/x-ndjson bodies.
+
+    Each line is either one sample
+        {"user_id", "metric", "timestamp", "value", "unit"?}
+    or a columnar batch
+        {"user_id", "metric", "unit"?, "timestamps": [...], "values": [...]}
+    """
+
+    def __init__(self):
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> ParsedBatch:
+        lines = (self._tail + chunk).split(b"\n")
+        self._tail = lines.pop()
+        return self._parse(lines)
+
+    def close(self) -> ParsedBatch:
+        lines, self._tail = [self._tail], b""
+        return self._parse(lines)
+
+    @staticmethod
+    def _parse(lines: List[bytes]) -> ParsedBatch:
+        batch = ParsedBatch()
+        # Collect columns per (user_id, metric) first, then validate each column at once
+        columns: Dict[SeriesKey, Tuple[List[Any], List[Any], List[str]]] = {}
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                batch.rejected += 1
+                continue
+            if not isinstance(record, dict):
+                batch.rejected += 1
+                continue
+            key = (record.get("user_id"), record.get("metric"))
+            timestamps, values, units = columns.setdefault(key, ([], [], []))
+            if "timestamps" in record:
+                ts, vs = record.get("timestamps"), record.get("values")
+                if not isinstance(ts, list) or not isinstance(vs, list) or len(ts) != len(vs):
+                    batch.rejected += len(ts) if isinstance(ts, list) else 1
+                    continue
+                timestamps.extend(ts)
+                values.extend(vs)
+            else:
+                timestamps.append(record.get("timestamp"))
+                values.append(record.get("value"))
+            if record.get("unit"):
+                units.append(str(record["unit"]))
+
+        for (user_id, metric), (timestamps, values, units) in columns.items():
+            if timestamps:
+                batch.add(user_id, metric, _timestamps_column(timestamps), _values_column(values),
+                          units[0] if units else "")
+        return batch
+
+class BinaryFrameParser:
+    """Incremental parser for application/octet-stream bodies made of `encode_frame` frames"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> ParsedBatch:
+        self._buffer += chunk
+        batch = ParsedBatch()
+        offset = 0
+        buffer = self._buffer
+        while True:
+            if len(buffer) - offset < _FRAME_HEADER.size:
+                break
+            user_len, metric_len = _FRAME_HEADER.unpack_from(buffer, offset)
+            series_at = offset + _FRAME_HEADER.size + user_len + metric_len
+            if len(buffer) < series_at + _BINARY_HEADER.size:
+                break
+            magic, count, unit_len = _BINARY_HEADER.unpack_from(buffer, series_at)
+            if magic != _BINARY_MAGIC:
+                raise ValueError("Malformed binary ingest frame")
+            frame_end = series_at + _BINARY_HEADER.size + unit_len + 16 * count
+            if len(buffer) < frame_end:
+                break
+            names_at = offset + _FRAME_HEADER.size
+            user_id = bytes(buffer[names_at:names_at + user_len]).decode(errors="replace")
+            metric = bytes(buffer[names_at + user_len:series_at]).decode(errors="replace")
+            series = WearableSeries.from_bytes(bytes(buffer[series_at:frame_end]))
+            batch.add(user_id, metric, series.timestamps, series.values, series.unit)
+            offset = frame_end
+        del self._buffer[:offset]
+        return batch
+
+    def close(self) -> ParsedBatch:
+        if self._buffer:
+            raise ValueError("Truncated binary ingest frame")
+        return ParsedBatch()
+
+def parser_for(content_type: str):
+    """Pick a body parser from the request's Content-Type (None when unsupported)"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return NDJSONParser()
+    if media_type == "application/octet-stream":
+        return BinaryFrameParser()
+    return None
+
+async def _insert_samples(rows: List[Dict[str, Any]]):
+    from ..repositories.wearable import WearableSampleRepository
+    await WearableSampleRepository(registry.get_async()).insert_samples(rows)
+
+class IngestBuffer:
+    """Bounded in-memory buffer of pushed samples, flushed by a background task"""
+
+    def __init__(self, sink: Optional[Sink] = None, batch_size: int = config.INGEST_BATCH_SIZE,
+                 max_pending: int = config.INGEST_MAX_PENDING,
+                 flush_interval: float = config.INGEST_FLUSH_INTERVAL,
+                 backpressure_timeout: float = config.INGEST_BACKPRESSURE_TIMEOUT,
+                 max_attempts: int = config.INGEST_MAX_ATTEMPTS):
+        self.sink = sink or _insert_samples
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.backpressure_timeout = backpressure_timeout
+        self.max_attempts = max_attempts
+        self._pending: Deque[Pending] = deque()
+        self.pending = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Condition] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.batches = 0
+        self.flush_failures = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.backpressure_rejections = 0
+
+    def _ensure_worker(self):
+        # asyncio primitives are created on first use, inside the worker's event loop
+        if self._worker is None or self._worker.done():
+            self._wake = asyncio.Event()
+            self._drained = asyncio.Condition()
+            self._flush_lock = asyncio.Lock()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def add(self, batch: ParsedBatch) -> int:
+        """Buffer a parsed batch, waiting while the buffer is full; returns samples accepted"""
+        self.rejected += batch.rejected
+        count = batch.accepted
+        if not count:
+            return 0
+        self._ensure_worker()
+        if self.pending and self.pending + count > self.max_pending:
+            self.backpressure_waits += 1
+            self._wake.set()
+            try:
+                async with self._drained:
+                    await asyncio.wait_for(self._drained.wait_for(
+                        lambda: not self.pending or self.pending + count <= self.max_pending
+                    ), self.backpressure_timeout)
+            except asyncio.TimeoutError:
+                self.backpressure_rejections += 1
+                raise IngestBackpressure()
+        self._pending.extend((key, series, 0) for key, series in batch.series.items())
+        self.pending += count
+        self.accepted += count
+        if self.pending >= self.batch_size:
+            self._wake.set()
+        return count
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Samples stay buffered and are retried on the next cycle
+                self.flush_failures += 1
+                print(f"Wearable ingest flush failed: {str(e)}")
+                await asyncio.sleep(self.flush_interval)
+
+    def _rows(self, items: List[Pending]) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        for (user_id, metric), series, _ in items:
+            unit = series.unit
+            rows.extend(
+                {"user_id": user_id, "metric": metric, "timestamp": t, "value": v, "unit": unit}
+                for t, v in zip(series.iso_timestamps(), series.values.tolist())
+            )
+        return rows
+
+    def _take(self) -> List[Pending]:
+        """Pop up to batch_size samples from the head of the buffer, splitting a series if needed"""
+        taken: List[Pending] = []
+        room = self.batch_size
+        while self._pending and room:
+            key, series, attempts = self._pending[0]
+            if len(series) <= room:
+                self._pending.popleft()
+                taken.append((key, series, attempts))
+                room -= len(series)
+            else:
+                head = WearableSeries._wrap(series.timestamps[:room], series.values[:room], series.unit)
+                rest = WearableSeries._wrap(series.timestamps[room:], series.values[room:], series.unit)
+                taken.append((key, head, attempts))
+                self._pending[0] = (key, rest, attempts)
+                room = 0
+        return taken
+
+    def _reject(self, items: List[Pending]):
+        """Put rejected series back at the head, dropping those out of attempts"""
+        retry = []
+        for key, series, attempts in items:
+            if attempts + 1 < self.max_attempts:
+                retry.append((key, series, attempts + 1))
+            else:
+                self.dropped += len(series)
+                self.pending -= len(series)
+                print(f"Dropped {len(series)} wearable samples for {key} after {attempts + 1} rejected writes")
+        self._pending.extendleft(reversed(retry))
+
+    def _put_back(self, parts: List[List[Pending]], rejected: List[Pending]):
+        """Return a batch's unwritten parts to the head of the buffer as they were"""
+        unsent = [item for part in reversed(parts) for item in part]
+        self._pending.extendleft(reversed(unsent))
+        self._reject(rejected)
+
+    async def _write(self, items: List[Pending]):
+        """Write one batch; a batch the database rejects is bisected down to the series it refuses"""
+        parts, rejected, error = [items], [], None
+        while parts:
+            part = parts[-1]
+            try:
+                await self.sink(self._rows(part))
+            except _TRANSIENT_ERRORS:
+                self._put_back(parts, rejected)
+                raise
+            except Exception as e:
+                parts.pop()
+                if len(part) == 1:
+                    rejected.append(part[0])
+                    error = e
+                else:
+                    half = len(part) // 2
+                    parts.extend((part[half:], part[:half]))
+                continue
+            except BaseException:
+                # Cancelled mid-write (worker shutdown): the samples are already off the buffer
+                self._put_back(parts, rejected)
+                raise
+            parts.pop()
+            count = sum(len(series) for _, series, _ in part)
+            self.pending -= count
+            self.flushed += count
+        self.batches += 1
+        if rejected:
+            self._reject(rejected)
+            if any(attempts + 1 < self.max_attempts for _, _, attempts in rejected):
+                raise error
+
+    async def flush(self):
+        """Write everything buffered so far in batch_size inserts"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._pending:
+                try:
+                    await self._write(self._take())
+                finally:
+                    async with self._drained:
+                        self._drained.notify_all()
+
+    async def close(self):
+        """Flush what is left and stop the background task (worker shutdown)"""
+        if self._worker is None:
+            return
+        # Stopped by a flag rather than cancel(), as in ProfileSync.close
+        self._stopping = True
+        self._wake.set()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        self._stopping = False
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Wearable ingest flush failed on shutdown: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "flush_failures": self.flush_failures,
+            "dropped": self.dropped,
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_rejections": self.backpressure_rejections,
+        }
+
+ingest_buffer = IngestBuffer()
+metrics.register("ingest", ingest_buffer.stats)
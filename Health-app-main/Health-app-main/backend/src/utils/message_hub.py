@@ -0,0 +1,176 @@
+import asyncio
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set
+from .. import config
+from .metrics import metrics
+from .redis_client import get_redis
+
+# Real-time fan-out of chat messages to WebSocket subscribers.
+# Each open socket subscribes to one conversation and gets a bounded queue. A
+# published message is serialized once and its text is put on every subscriber's
+# queue; a socket that falls a full queue behind is disconnected instead of
+# buffering without limit. With REDIS_URL set, messages go through Redis pub/sub
+# so every uvicorn worker delivers them to its own sockets. Topics are
+# conversation ids, plus one `user:<id>` topic per participant for long polls.
+
+CHANNEL_PREFIX = "messaging:"
+
+def user_topic(user_id: str) -> str:
+    """Topic carrying every message and conversation event that concerns one user"""
+    return f"user:{user_id}"
+
+class Subscription:
+    """One socket's view of a conversation: a bounded queue of serialized events"""
+
+    __slots__ = ("conversation_id", "queue", "overflowed")
+
+    def __init__(self, conversation_id: str, max_queue: int):
+        self.conversation_id = conversation_id
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.overflowed = False
+
+    def offer(self, text: str) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog and tell the sender to disconnect
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    async def next(self) -> Optional[str]:
+        """The next event's text, or None once the subscriber has been dropped"""
+        return await self.queue.get()
+
+class MessageHub:
+    """Per-worker pub/sub hub keyed by conversation, optionally bridged over Redis"""
+
+    def __init__(self, redis: Optional[Any] = None, max_queue: int = config.MESSAGE_HUB_QUEUE_SIZE):
+        self.redis = redis
+        self.max_queue = max_queue
+        self._redis_checked = redis is not None
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.redis_errors = 0
+
+    def _bridge(self) -> Optional[Any]:
+        # Redis is looked up on first use so REDIS_URL from the environment is honoured
+        if not self._redis_checked:
+            self.redis = get_redis()
+            self._redis_checked = True
+        return self.redis
+
+    def subscribe(self, conversation_id: str) -> Subscription:
+        """Subscribe to a conversation id or a user_topic()"""
+        subscription = Subscription(conversation_id, self.max_queue)
+        self._subscribers.setdefault(conversation_id, set()).add(subscription)
+        if self._bridge() is not None and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.conversation_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.conversation_id]
+
+    async def publish(self, conversation_id: str, message: Dict[str, Any], user_ids: Iterable[str] = ()):
+        """Push a new message to everyone connected to the conversation, on any worker.
+
+        `user_ids` (the participants) also get it on their user topic, which wakes
+        their long-polling /messaging/sync requests.
+        """
+        self.published += 1
+        text = json.dumps({"type": "message", "message": message}, default=str)
+        await self._publish([conversation_id, *(user_topic(user_id) for user_id in user_ids if user_id)], text)
+
+    async def notify_users(self, user_ids: Iterable[str], event: Dict[str, Any]):
+        """Send an event (e.g. a new conversation) to the users' topics only"""
+        topics = [user_topic(user_id) for user_id in user_ids if user_id]
+        if topics:
+            await self._publish(topics, json.dumps(event, default=str))
+
+    async def _publish(self, topics: List[str], text: str):
+        redis = self._bridge()
+        if redis is not None:
+            try:
+                # One round trip for all topics
+                async with redis.pipeline(transaction=False) as pipe:
+                    for topic in topics:
+                        pipe.publish(f"{CHANNEL_PREFIX}{topic}", text)
+                    await pipe.execute()
+                return
+            except Exception as e:
+                # Fall back to this worker's sockets rather than losing the message
+                self.redis_errors += 1
+                print(f"Message hub publish failed: {str(e)}")
+        for topic in topics:
+            self._deliver(topic, text)
+
+    def _deliver(self, conversation_id: str, text: str):
+        for subscription in tuple(self._subscribers.get(conversation_id, ())):
+            if subscription.offer(text):
+                self.delivered += 1
+            elif subscription.overflowed:
+                self.overflows += 1
+                self.unsubscribe(subscription)
+
+    async def _listen(self):
+        """Deliver messages published by any worker to this worker's sockets"""
+        while self._subscribers:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for event in pubsub.listen():
+                    if event.get("type") != "pmessage":
+                        continue
+                    channel, data = event["channel"], event["data"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    self._deliver(channel[len(CHANNEL_PREFIX):], data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.redis_errors += 1
+                print(f"Message hub listener failed: {str(e)}")
+                await asyncio.sleep(1.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def close(self):
+        """Stop the Redis listener (worker shutdown)"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.redis is not None else "memory",
+            "conversations": len(self._subscribers),
+            "sockets": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "redis_errors": self.redis_errors,
+        }
+
+message_hub = MessageHub()
+metrics.register("message_hub", message_hub.stats)
@@ -0,0 +1,33 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+# In-process metrics for the Hospital Management System backend.
+# Components either bump counters directly or register a provider that
+# returns their current stats; GET /metrics exposes a snapshot of both.
+
+class MetricsRegistry:
+    """Per-worker counters, gauges and stats providers"""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        self._gauges[name] = value
+
+    def register(self, name: str, provider: Callable[[], Dict[str, Any]]):
+        """Register a callable returning a dict of stats, evaluated on every snapshot"""
+        self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+            **{name: provider() for name, provider in self._providers.items()},
+        }
+
+metrics = MetricsRegistry()
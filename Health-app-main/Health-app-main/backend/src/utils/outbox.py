@@ -0,0 +1,289 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+import httpx
+from .. import config
+from .metrics import metrics
+from .redis_client import get_redis
+from .supabase_client import registry
+
+# Notification outbox.
+# Request handlers publish notification events and return immediately. A
+# background dispatcher takes events off the queue in batches. It resolves every
+# patient name the batch needs with one `users` query and writes the whole batch
+# with one `notifications` insert. The queue lives in process, or in a Redis
+# list when REDIS_URL is set so events survive a worker restart. A batch the
+# database rejects is bisected so the good events are written and only the
+# refused ones go back to the front of the queue, to be retried with backoff and
+# dropped after OUTBOX_MAX_ATTEMPTS. Inserts are keyed by the event id, so a
+# retry never duplicates a notification.
+
+# Placeholder filled in with the patient's full name at dispatch time
+PATIENT_NAME = "{patient_name}"
+
+# Write failures that say nothing about the rows; the whole batch is retried
+_TRANSIENT_ERRORS = (httpx.TransportError, asyncio.TimeoutError, OSError)
+
+Sink = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+NameResolver = Callable[[List[str]], Awaitable[Dict[str, str]]]
+
+async def _insert_notifications(rows: List[Dict[str, Any]]):
+    from ..repositories.notifications import NotificationRepository
+    await NotificationRepository(registry.get_async()).insert_new(rows)
+
+async def _patient_names(user_ids: List[str]) -> Dict[str, str]:
+    from ..repositories.patients import UserRepository
+    return await UserRepository(registry.get_async()).get_full_names(user_ids)
+
+class MemoryQueue:
+    """Per-worker FIFO of pending events"""
+
+    def __init__(self):
+        self._events: Deque[Dict[str, Any]] = deque()
+
+    async def push(self, events: List[Dict[str, Any]]):
+        self._events.extend(events)
+
+    async def push_front(self, events: List[Dict[str, Any]]):
+        self._events.extendleft(reversed(events))
+
+    async def pop(self, count: int) -> List[Dict[str, Any]]:
+        events = self._events
+        return [events.popleft() for _ in range(min(count, len(events)))]
+
+    async def depth(self) -> int:
+        return len(self._events)
+
+class RedisQueue:
+    """Events as JSON in a Redis list shared by all workers"""
+
+    def __init__(self, redis: Any, key: str):
+        self.redis = redis
+        self.key = key
+
+    async def push(self, events: List[Dict[str, Any]]):
+        if events:
+            await self.redis.rpush(self.key, *(json.dumps(event) for event in events))
+
+    async def push_front(self, events: List[Dict[str, Any]]):
+        if events:
+            await self.redis.lpush(self.key, *(json.dumps(event) for event in reversed(events)))
+
+    async def pop(self, count: int) -> List[Dict[str, Any]]:
+        values = await self.redis.lpop(self.key, count)
+        return [json.loads(value) for value in values or ()]
+
+    async def depth(self) -> int:
+        return await self.redis.llen(self.key)
+
+class NotificationOutbox:
+    """Queue of notifications, written in coalesced batches by a background dispatcher"""
+
+    def __init__(self, queue: Optional[Any] = None, sink: Optional[Sink] = None,
+                 resolve_names: Optional[NameResolver] = None,
+                 batch_size: int = config.OUTBOX_BATCH_SIZE,
+                 flush_interval: float = config.OUTBOX_FLUSH_INTERVAL,
+                 max_attempts: int = config.OUTBOX_MAX_ATTEMPTS,
+                 retry_delay: float = config.OUTBOX_RETRY_DELAY):
+        self.queue = queue
+        self.sink = sink or _insert_notifications
+        self.resolve_names = resolve_names or _patient_names
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self.depth = 0
+        self.published = 0
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def _queue(self) -> Any:
+        # Chosen on first use so REDIS_URL from the environment is honoured
+        if self.queue is None:
+            redis = get_redis()
+            self.queue = RedisQueue(redis, "outbox:notifications") if redis is not None else MemoryQueue()
+        return self.queue
+
+    def _ensure_worker(self):
+        # asyncio primitives are created on first use, inside the worker's event loop
+        if self._worker is None or self._worker.done():
+            self._wake = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    @staticmethod
+    def event(user_id: str, title: str, message: str, patient_id: Optional[str] = None,
+              created_at: Optional[datetime] = None, event_id: Optional[str] = None) -> Dict[str, Any]:
+        """A JSON-safe notification event; `message` may contain {patient_name} when patient_id is set"""
+        return {
+            "id": event_id or str(uuid.uuid4()),
+            "user_id": str(user_id),
+            "title": title,
+            "message": message,
+            "patient_id": str(patient_id) if patient_id is not None else None,
+            "created_at": (created_at or datetime.now(timezone.utc)).isoformat(),
+            "enqueued_at": time.time(),
+            "attempts": 0,
+        }
+
+    async def publish(self, events: Iterable[Dict[str, Any]]):
+        """Queue events for delivery; returns as soon as they are queued"""
+        events = list(events)
+        if not events:
+            return
+        self._ensure_worker()
+        queue = self._queue()
+        await queue.push(events)
+        self.published += len(events)
+        self.depth = await queue.depth()
+        if self.depth >= self.batch_size:
+            self._wake.set()
+
+    async def notify(self, user_id: str, title: str, message: str, patient_id: Optional[str] = None):
+        await self.publish([self.event(user_id, title, message, patient_id)])
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # The failed events are back at the front of the queue; back off before retrying
+                self.failures += 1
+                print(f"Notification dispatch failed: {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+
+    async def _rows(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        patient_ids = sorted({event["patient_id"] for event in events
+                              if event.get("patient_id") and PATIENT_NAME in event["message"]})
+        names = await self.resolve_names(patient_ids) if patient_ids else {}
+        rows, seen = [], set()
+        for event in events:
+            if event["id"] in seen:
+                continue
+            seen.add(event["id"])
+            message = event["message"]
+            if PATIENT_NAME in message:
+                message = message.replace(PATIENT_NAME, names.get(event.get("patient_id") or "", "A patient"))
+            rows.append({
+                "id": event["id"],
+                "user_id": event["user_id"],
+                "title": event["title"],
+                "message": message,
+                "created_at": event["created_at"],
+                "read": False,
+            })
+        return rows
+
+    async def flush(self):
+        """Deliver everything queued so far in batch_size inserts"""
+        if self._flush_lock is None:
+            return
+        queue = self._queue()
+        async with self._flush_lock:
+            while True:
+                events = await queue.pop(self.batch_size)
+                if not events:
+                    break
+                await self._deliver(queue, events)
+            self.depth = await queue.depth()
+
+    async def _deliver(self, queue: Any, events: List[Dict[str, Any]]):
+        """Insert one batch; a batch the database rejects is bisected down to the events it refuses"""
+        parts, rejected, error = [events], [], None
+        while parts:
+            part = parts[-1]
+            try:
+                await self.sink(await self._rows(part))
+            except _TRANSIENT_ERRORS:
+                # Says nothing about the rows: the whole unsent remainder uses an attempt
+                await self._requeue(queue, rejected + [event for unsent in reversed(parts) for event in unsent])
+                raise
+            except Exception as e:
+                parts.pop()
+                if len(part) == 1:
+                    rejected.append(part[0])
+                    error = e
+                else:
+                    half = len(part) // 2
+                    parts.extend((part[half:], part[:half]))
+                continue
+            except BaseException:
+                # Cancelled mid-batch: the events are already off the queue, so put
+                # them back without counting an attempt
+                await queue.push_front([event for unsent in reversed(parts) for event in unsent])
+                await self._requeue(queue, rejected)
+                raise
+            parts.pop()
+            now = time.time()
+            self._latencies.extend(now - event["enqueued_at"] for event in part)
+            self.sent += len(part)
+        self.batches += 1
+        if rejected and await self._requeue(queue, rejected):
+            raise error
+
+    async def _requeue(self, queue: Any, events: List[Dict[str, Any]]) -> int:
+        """Put failed events back at the front, dropping those out of attempts; returns how many remain"""
+        retry = []
+        for event in events:
+            event["attempts"] = event.get("attempts", 0) + 1
+            if event["attempts"] < self.max_attempts:
+                retry.append(event)
+            else:
+                self.dropped += 1
+        self.retried += len(retry)
+        await queue.push_front(retry)
+        self.depth = await queue.depth()
+        return len(retry)
+
+    async def close(self):
+        """Deliver what is left and stop the dispatcher (worker shutdown)"""
+        if self._worker is None:
+            return
+        # Stopped by a flag rather than cancel(), as in ProfileSync.close
+        self._stopping = True
+        self._wake.set()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        self._stopping = False
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Notification dispatch failed on shutdown: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else 0.0
+
+        return {
+            "queue_depth": self.depth,
+            "published": self.published,
+            "sent": self.sent,
+            "batches": self.batches,
+            "failures": self.failures,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "dispatch_p50_ms": pct(0.5),
+            "dispatch_p99_ms": pct(0.99),
+        }
+
+notification_outbox = NotificationOutbox()
+metrics.register("notification_outbox", notification_outbox.stats)
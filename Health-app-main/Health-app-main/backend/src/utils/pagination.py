@@ -0,0 +1,86 @@
+import base64
+import json
+import uuid
+from datetime import timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from .scheduling import parse_datetime
+
+# Opaque keyset cursors.
+# A cursor names one row by its sort key and id, e.g. (sent_at, id) for messages.
+# The next page is then "rows after this key" (an index range scan), so the cost
+# of a page stays the same however deep into the history the client has paged,
+# unlike OFFSET, which reads and discards every row before the page.
+
+Cursor = Tuple[Optional[str], str]
+
+def _timestamp(value: Any) -> str:
+    return parse_datetime(value).replace(tzinfo=timezone.utc).isoformat()
+
+def text_value(value: Any) -> Optional[str]:
+    """Sort values that are free text (names); None stands for SQL NULL"""
+    if value is not None and not isinstance(value, str):
+        raise ValueError("not a string")
+    return value
+
+def quote(value: str) -> str:
+    """A PostgREST filter value in double quotes, safe for any text"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def encode_token(values: List[Any]) -> str:
+    """Opaque URL-safe form of a JSON list"""
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_token(token: str) -> Any:
+    return json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+
+def encode_cursor(row: Dict[str, Any], column: str) -> str:
+    value = row.get(column)
+    return encode_token([None if value is None else str(value), str(row["id"])])
+
+def decode_cursor(cursor: str, parse_value: Callable[[Any], Optional[str]] = _timestamp) -> Cursor:
+    """(sort value, id) named by a cursor; malformed or tampered cursors are a 400.
+
+    Sort values are timestamps unless `parse_value` says otherwise (e.g. text_value).
+    """
+    try:
+        value, row_id = decode_token(cursor)
+        # Re-parsed so nothing but a valid sort value and a UUID reaches the filter
+        return parse_value(value), str(uuid.UUID(row_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_condition(column: str, cursor: Cursor, desc: bool) -> str:
+    """PostgREST condition for rows strictly past `cursor` in (column, id) order.
+
+    The redundant `column <= value` bound is what lets the index range scan start at
+    the cursor; with the OR alone the planner walks the index from the top and filters.
+    """
+    op = "lt" if desc else "gt"
+    value, row_id = cursor
+    return f'and({column}.{op}e."{value}",or({column}.{op}."{value}",id.{op}.{row_id}))'
+
+def page(rows: List[Dict[str, Any]], column: str, limit: int, desc: bool,
+         more_before: bool, more_after: bool, chronological: bool = True) -> Dict[str, Any]:
+    """Shape `limit + 1` fetched rows into a page with cursors for its neighbours.
+
+    One extra row is fetched to learn whether more rows exist in the direction of travel;
+    `more_before`/`more_after` say what is already known about the other direction.
+    Items come oldest first when `chronological`, otherwise in the order they were fetched.
+    """
+    extra = len(rows) > limit
+    rows = rows[:limit]
+    if desc:
+        more_before = more_before or extra
+        oldest, newest = (rows[-1], rows[0]) if rows else (None, None)
+    else:
+        more_after = more_after or extra
+        oldest, newest = (rows[0], rows[-1]) if rows else (None, None)
+    if desc and chronological:
+        rows.reverse()
+    return {
+        "items": rows,
+        "before": encode_cursor(oldest, column) if oldest is not None and more_before else None,
+        "after": encode_cursor(newest, column) if newest is not None and more_after else None,
+    }
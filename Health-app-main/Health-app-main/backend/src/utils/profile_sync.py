@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .. import config
+from .metrics import metrics
+from .supabase_client import registry
+
+# Write-behind sync of the caller's profile into `patients`.
+# Every authenticated request reports the (id, email, full_name) from its token,
+# but those almost never change. A bounded LRU remembers a hash of the last row
+# queued per user, so an unchanged profile costs one dict lookup and no write.
+# Changed rows are coalesced per user (the newest wins) and upserted in batches
+# by a background task. A failed batch is retried; after `max_attempts` its users
+# are forgotten so their next request queues them again.
+
+Sink = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+async def _upsert_patients(rows: List[Dict[str, Any]]):
+    from ..repositories.patients import PatientRepository
+    await PatientRepository(registry.get_async()).upsert(rows)
+
+def _digest(row: Dict[str, Any]) -> bytes:
+    return hashlib.blake2b("\x1f".join(str(row.get(key) or "") for key in ("id", "email", "full_name")).encode(),
+                           digest_size=16).digest()
+
+class ProfileSync:
+    """Deduplicating, batching write-behind queue for patient profile upserts"""
+
+    def __init__(self, sink: Optional[Sink] = None, max_users: int = config.PROFILE_SYNC_MAX_USERS,
+                 batch_size: int = config.PROFILE_SYNC_BATCH_SIZE,
+                 flush_interval: float = config.PROFILE_SYNC_FLUSH_INTERVAL,
+                 max_attempts: int = config.PROFILE_SYNC_MAX_ATTEMPTS):
+        self.sink = sink or _upsert_patients
+        self.max_users = max_users
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._synced: "OrderedDict[str, bytes]" = OrderedDict()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._attempts: Dict[str, int] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.seen = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def _ensure_worker(self):
+        # asyncio primitives are created on first use, inside the worker's event loop
+        if self._worker is None or self._worker.done():
+            self._wake = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """Queue `row` unless it matches what was last queued for the user; True if queued"""
+        self.seen += 1
+        user_id = str(row["id"])
+        digest = _digest(row)
+        if self._synced.get(user_id) == digest:
+            self._synced.move_to_end(user_id)
+            self.skipped += 1
+            return False
+        self._synced[user_id] = digest
+        self._synced.move_to_end(user_id)
+        while len(self._synced) > self.max_users:
+            self._synced.popitem(last=False)
+        if user_id in self._pending:
+            self.coalesced += 1
+        self._pending[user_id] = row
+        self._ensure_worker()
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # The failed rows are pending again; back off before retrying
+                self.failures += 1
+                print(f"Profile sync failed: {str(e)}")
+                await asyncio.sleep(self.flush_interval)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        user_ids = list(self._pending)[:self.batch_size]
+        return [self._pending.pop(user_id) for user_id in user_ids]
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            user_id = str(row["id"])
+            attempts = self._attempts.get(user_id, 0) + 1
+            if user_id in self._pending:
+                continue  # a newer row was queued meanwhile and supersedes this one
+            if attempts < self.max_attempts:
+                self._attempts[user_id] = attempts
+                self._pending[user_id] = row
+            else:
+                self.dropped += 1
+                self._attempts.pop(user_id, None)
+                self._synced.pop(user_id, None)
+
+    async def flush(self):
+        """Upsert everything queued so far in batch_size writes"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._pending:
+                rows = self._take()
+                try:
+                    await self.sink(rows)
+                except Exception:
+                    self._requeue(rows)
+                    raise
+                for row in rows:
+                    self._attempts.pop(str(row["id"]), None)
+                self.written += len(rows)
+                self.batches += 1
+
+    async def close(self):
+        """Write what is left and stop the background task (worker shutdown)"""
+        if self._worker is None:
+            return
+        # Stopped by a flag rather than cancel(): wait_for() may swallow a cancellation
+        # that arrives just as the wake event fires, which would leave the task running
+        self._stopping = True
+        self._wake.set()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        self._stopping = False
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Profile sync failed on shutdown: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "tracked_users": len(self._synced),
+            "seen": self.seen,
+            "writes_avoided": self.skipped + self.coalesced,
+            "skipped_unchanged": self.skipped,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+profile_sync = ProfileSync()
+metrics.register("profile_sync", profile_sync.stats)
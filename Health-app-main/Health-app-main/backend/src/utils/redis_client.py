@@ -0,0 +1,29 @@
+from typing import Any, Optional
+from .. import config
+
+# Optional shared Redis connection.
+# Components that can share state across workers (caches, fan-out) use Redis when
+# REDIS_URL is set and fall back to in-process state otherwise, so the backend
+# still runs without a Redis server or without the `redis` package installed.
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency
+    aioredis = None
+
+_redis: Optional[Any] = None
+
+def get_redis() -> Optional[Any]:
+    """Get the worker's shared asyncio Redis client, or None when Redis is not configured"""
+    global _redis
+    if _redis is None and config.REDIS_URL and aioredis is not None:
+        _redis = aioredis.from_url(config.REDIS_URL, socket_timeout=config.REDIS_TIMEOUT,
+                                   socket_connect_timeout=config.REDIS_TIMEOUT)
+    return _redis
+
+async def close_redis():
+    """Release the shared client's connections (called on application shutdown)"""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,113 @@
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from ..models.timeseries import WearableSeries
+from .. import config
+
+# Downsampled rollup tiers for wearable timeseries (raw -> 1m -> 1h -> 1d).
+# A rollup keeps min, max, sum and count per fixed-width UTC bucket in
+# columnar arrays. Each tier is built from the one below it, so a day of
+# per-second samples is reduced once and the coarser tiers cost almost nothing.
+
+TIERS: Dict[str, int] = {
+    "1m": 60_000,
+    "1h": 3_600_000,
+    "1d": 86_400_000,
+}
+RESOLUTIONS = ("auto", "raw", *TIERS)
+
+def _run_starts(keys: np.ndarray) -> np.ndarray:
+    """Index where each run of equal (sorted) keys starts"""
+    return np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+
+class Rollup:
+    """Per-bucket min/max/sum/count for one tier, with buckets sorted by start time"""
+
+    __slots__ = ("width", "start", "min", "max", "sum", "count")
+
+    def __init__(self, width: int, start: np.ndarray, min: np.ndarray, max: np.ndarray,
+                 sum: np.ndarray, count: np.ndarray):
+        self.width = width
+        self.start = start
+        self.min = min
+        self.max = max
+        self.sum = sum
+        self.count = count
+
+    @classmethod
+    def empty(cls, width: int) -> "Rollup":
+        nothing = np.empty(0, dtype=np.float64)
+        return cls(width, np.empty(0, dtype=np.int64), nothing, nothing, nothing,
+                   np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_series(cls, series: WearableSeries, width: int) -> "Rollup":
+        """Reduce raw samples into buckets of `width` milliseconds"""
+        if len(series) == 0:
+            return cls.empty(width)
+        buckets = series.timestamps // width
+        starts = _run_starts(buckets)
+        values = series.values
+        return cls(width, buckets[starts] * width,
+                   np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts),
+                   np.add.reduceat(values, starts), np.diff(np.append(starts, values.size)))
+
+    def coarsen(self, width: int) -> "Rollup":
+        """Combine buckets into a coarser tier (width must be a multiple of this tier's)"""
+        if self.start.size == 0:
+            return Rollup.empty(width)
+        return self._reduce(self.start // width * width, width)
+
+    def _reduce(self, keys: np.ndarray, width: int) -> "Rollup":
+        starts = _run_starts(keys)
+        return Rollup(width, keys[starts],
+                      np.minimum.reduceat(self.min, starts), np.maximum.reduceat(self.max, starts),
+                      np.add.reduceat(self.sum, starts), np.add.reduceat(self.count, starts))
+
+    @classmethod
+    def concat(cls, parts: Sequence["Rollup"], width: int) -> "Rollup":
+        """Join rollups covering consecutive, non-overlapping time ranges"""
+        parts = [p for p in parts if p.start.size]
+        if not parts:
+            return cls.empty(width)
+        if len(parts) == 1:
+            return parts[0]
+        return cls(width, *(np.concatenate([getattr(p, name) for p in parts])
+                            for name in ("start", "min", "max", "sum", "count")))
+
+    def __len__(self) -> int:
+        return int(self.start.size)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.sum / self.count
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """JSON-ready buckets: {"timestamp", "min", "max", "mean", "count"}"""
+        timestamps = np.datetime_as_string(self.start.astype("datetime64[ms]"), unit="ms",
+                                           timezone="UTC").tolist()
+        return [
+            {"timestamp": t, "min": lo, "max": hi, "mean": round(mean, 2), "count": count}
+            for t, lo, hi, mean, count in zip(timestamps, self.min.tolist(), self.max.tolist(),
+                                               self.mean.tolist(), self.count.tolist())
+        ]
+
+def build_rollups(series: WearableSeries) -> Dict[str, Rollup]:
+    """All tiers for a series, each computed from the previous one"""
+    rollups: Dict[str, Rollup] = {}
+    previous: Optional[Rollup] = None
+    for tier, width in TIERS.items():
+        previous = Rollup.from_series(series, width) if previous is None else previous.coarsen(width)
+        rollups[tier] = previous
+    return rollups
+
+def pick_resolution(span_ms: int, raw_count: int, requested: str = "auto",
+                    max_points: int = config.WEARABLE_MAX_POINTS) -> str:
+    """Resolve "auto" to the finest resolution whose point count stays within max_points"""
+    if requested != "auto":
+        return requested
+    if raw_count <= max_points:
+        return "raw"
+    for tier, width in TIERS.items():
+        if span_ms // width <= max_points:
+            return tier
+    return "1d"
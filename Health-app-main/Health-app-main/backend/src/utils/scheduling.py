@@ -0,0 +1,189 @@
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from .. import config
+
+# Interval-based scheduling engine for appointments.
+# A doctor's bookings are loaded once into a sorted list of disjoint busy
+# intervals; overlap checks are a binary search and free slots for a whole
+# range come out of a single merge pass over working hours and bookings.
+# All times are naive UTC, so a working period may end "before" it starts
+# (e.g. 22:00-06:00); it then runs past midnight into the next day.
+
+Interval = Tuple[datetime, datetime]
+# weekday (0 = Monday) -> working periods that day
+WorkingHours = Dict[int, List[Tuple[time, time]]]
+
+# PostgREST trims trailing zeros of fractional seconds (09:00:05.12+00:00) and may
+# send hour-only offsets, which datetime.fromisoformat reads only from Python 3.11
+_FRACTION = re.compile(r"(:\d{2})\.(\d+)")
+_HOUR_OFFSET = re.compile(r"(:\d{2}(?:\.\d+)?[+-]\d{2})$")
+
+# Longest appointment allowed by the models; bookings starting this long before
+# a window can still overlap it
+MAX_APPOINTMENT_MINUTES = 120
+
+def default_working_hours() -> WorkingHours:
+    start = time.fromisoformat(config.DEFAULT_WORKDAY_START)
+    end = time.fromisoformat(config.DEFAULT_WORKDAY_END)
+    return {weekday: [(start, end)] for weekday in range(7)}
+
+def parse_datetime(value: Any) -> datetime:
+    """Parse a datetime or ISO string from Supabase into a naive UTC datetime"""
+    if not isinstance(value, datetime):
+        text = str(value)
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        text = _FRACTION.sub(lambda m: f"{m.group(1)}.{m.group(2)[:6].ljust(6, '0')}", text, count=1)
+        text = _HOUR_OFFSET.sub(r"\1:00", text)
+        value = datetime.fromisoformat(text)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def booking_interval(appointment: Dict[str, Any]) -> Interval:
+    start = parse_datetime(appointment["appointment_date"])
+    return start, start + timedelta(minutes=appointment.get("duration_minutes") or 30)
+
+def days_touched(start: datetime, end: datetime) -> List[date]:
+    """Calendar days an interval [start, end) falls on"""
+    last = (end - timedelta(microseconds=1)).date() if end > start else start.date()
+    days, day = [], start.date()
+    while day <= last:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+class BookingIntervals:
+    """Sorted, merged busy intervals of one doctor"""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    @classmethod
+    def from_appointments(cls, appointments: Iterable[Dict[str, Any]]) -> "BookingIntervals":
+        return cls(booking_interval(a) for a in appointments)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """True if [start, end) intersects any booking"""
+        # Last busy interval starting before `end`; only it can reach past `start`
+        index = bisect_left(self.starts, end) - 1
+        return index >= 0 and self.ends[index] > start
+
+    def add(self, start: datetime, end: datetime):
+        """Insert a booking, merging it with any interval it touches"""
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def free_slots(self, window_start: datetime, window_end: datetime, duration: timedelta,
+                   step: timedelta) -> Iterator[datetime]:
+        """Slot starts on the `step` grid from window_start whose slot fits between bookings"""
+        starts, ends = self.starts, self.ends
+        count = len(starts)
+        index = bisect_right(ends, window_start)
+        current = window_start
+        while current + duration <= window_end:
+            slot_end = current + duration
+            while index < count and ends[index] <= current:
+                index += 1
+            if index < count and starts[index] < slot_end:
+                # Jump to the first grid point at or after this booking ends
+                steps = -((window_start - ends[index]) // step)
+                current = window_start + steps * step
+                continue
+            yield current
+            current += step
+
+class SlotEngine:
+    """Free-slot computation over working hours for many doctors and days"""
+
+    def __init__(self, hours: Optional[Dict[str, WorkingHours]] = None,
+                 default_hours: Optional[WorkingHours] = None):
+        self.hours = hours or {}
+        self.default_hours = default_hours or default_working_hours()
+
+    def working_windows(self, doctor_id: str, day: date) -> List[Interval]:
+        """Working periods starting on `day`; one ending at or before its start ends the next day"""
+        periods = self.hours.get(doctor_id) or self.default_hours
+        next_day = day + timedelta(days=1)
+        return [(datetime.combine(day, start), datetime.combine(next_day if end <= start else day, end))
+                for start, end in periods.get(day.weekday(), [])]
+
+    def iter_free_slots(self, doctor_id: str, bookings: BookingIntervals, start_day: date, end_day: date,
+                        duration: int = 30, step: int = 30,
+                        not_before: Optional[datetime] = None) -> Iterator[datetime]:
+        """Free slots lying within the days [start_day, end_day], generated lazily in time order.
+
+        `bookings` must cover those days. The previous day's periods are included for the
+        part that runs past midnight.
+        """
+        length, stride = timedelta(minutes=duration), timedelta(minutes=step)
+        range_start = datetime.combine(start_day, time.min)
+        range_end = datetime.combine(end_day + timedelta(days=1), time.min)
+        floor = max(not_before, range_start) if not_before is not None else range_start
+        day = start_day - timedelta(days=1)
+        while day <= end_day:
+            for window_start, window_end in self.working_windows(doctor_id, day):
+                if window_end <= floor:
+                    continue
+                # Slots keep the grid of their period; before the range they are only skipped
+                for slot in bookings.free_slots(window_start, min(window_end, range_end), length, stride):
+                    if slot >= floor:
+                        yield slot
+            day += timedelta(days=1)
+
+    def free_slots(self, doctor_id: str, bookings: BookingIntervals, start_day: date, end_day: date,
+                   duration: int = 30, step: int = 30,
+                   not_before: Optional[datetime] = None) -> List[datetime]:
+        """All free slot starts for one doctor over [start_day, end_day]"""
+        return list(self.iter_free_slots(doctor_id, bookings, start_day, end_day, duration, step, not_before))
+
+    def free_slots_by_doctor(self, bookings_by_doctor: Dict[str, BookingIntervals],
+                             doctor_ids: Sequence[str], start_day: date, end_day: date,
+                             duration: int = 30, step: int = 30,
+                             not_before: Optional[datetime] = None) -> Dict[str, List[datetime]]:
+        """Free slots for several doctors over a multi-day range"""
+        empty = BookingIntervals()
+        return {
+            doctor_id: self.free_slots(doctor_id, bookings_by_doctor.get(doctor_id, empty),
+                                       start_day, end_day, duration, step, not_before)
+            for doctor_id in doctor_ids
+        }
+
+def group_bookings(appointments: Iterable[Dict[str, Any]]) -> Dict[str, BookingIntervals]:
+    """Build one BookingIntervals per doctor from appointment rows"""
+    intervals: Dict[str, List[Interval]] = {}
+    for appointment in appointments:
+        intervals.setdefault(str(appointment["doctor_id"]), []).append(booking_interval(appointment))
+    return {doctor_id: BookingIntervals(items) for doctor_id, items in intervals.items()}
+
+def parse_working_hours(rows: Iterable[Dict[str, Any]]) -> Dict[str, WorkingHours]:
+    """Turn `doctor_availability` rows into working hours per doctor"""
+    hours: Dict[str, WorkingHours] = {}
+    for row in rows:
+        if row.get("is_available") is False:
+            continue
+        periods = hours.setdefault(str(row["doctor_id"]), {}).setdefault(int(row["day_of_week"]), [])
+        periods.append((time.fromisoformat(str(row["start_time"])), time.fromisoformat(str(row["end_time"]))))
+    for doctor_hours in hours.values():
+        for periods in doctor_hours.values():
+            periods.sort()
+    return hours
@@ -1,7 +1,14 @@
-from supabase import create_client
+from supabase import Client
+from supabase.lib.client_options import ClientOptions
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.utils import AsyncClient, SyncClient
+from fastapi import HTTPException
+import httpx
 import os
+import threading
 from dotenv import load_dotenv
 import traceback
+from .. import config
 
 # Load environment variables
 load_dotenv()
@@ -9,26 +16,163 @@ load_dotenv()
 # Supabase client setup for the Hospital Management System.
 # This file initializes the Supabase client for database interactions.
 
-def get_supabase_client():
-    try:
+class _PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose HTTP session keeps a bounded keep-alive connection pool"""
+
+    def __init__(self, base_url: str, *, limits: httpx.Limits, **kwargs):
+        self._limits = limits
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout) -> SyncClient:
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self._limits,
+            follow_redirects=True,
+        )
+
+class _PooledAsyncPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client backed by a bounded keep-alive connection pool"""
+
+    def __init__(self, base_url: str, *, limits: httpx.Limits, **kwargs):
+        self._limits = limits
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout) -> AsyncClient:
+        return AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self._limits,
+            follow_redirects=True,
+        )
+
+class PooledSupabaseClient(Client):
+    """Supabase client that routes table queries through a pooled PostgREST session"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, limits: httpx.Limits,
+                 options: ClientOptions):
+        self._limits = limits
+        super().__init__(supabase_url, supabase_key, options)
+
+    def _init_postgrest_client(self, rest_url, supabase_key, headers, schema, timeout):
+        client = _PooledPostgrestClient(
+            rest_url, limits=self._limits, headers=headers, schema=schema, timeout=timeout
+        )
+        client.auth(token=supabase_key)
+        return client
+
+class SupabaseClientRegistry:
+    """Holds a single pooled Supabase client per worker process.
+
+    The client is created lazily on first use and re-created if the process
+    has been forked, so every uvicorn worker owns exactly one connection pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client: Client = None
+        self._pid: int = None
+        self._async_client: AsyncPostgrestClient = None
+        self._async_pid: int = None
+
+    @staticmethod
+    def _credentials():
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_KEY")
-        
+
         if not supabase_url or not supabase_key:
             print("Environment variables check:")
             print(f"SUPABASE_URL present: {'Yes' if supabase_url else 'No'}")
             print(f"SUPABASE_KEY present: {'Yes' if supabase_key else 'No'}")
             raise ValueError("Supabase URL and key must be provided in environment variables")
-        
-        # Create Supabase client
-        client = create_client(supabase_url, supabase_key)
-        return client
+        return supabase_url, supabase_key
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=config.SUPABASE_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=config.SUPABASE_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=config.SUPABASE_POOL_KEEPALIVE_EXPIRY,
+        )
+
+    def _create(self) -> Client:
+        supabase_url, supabase_key = self._credentials()
+        options = ClientOptions(postgrest_client_timeout=config.SUPABASE_TIMEOUT)
+        return PooledSupabaseClient(supabase_url, supabase_key, self._limits(), options)
+
+    def _create_async(self) -> AsyncPostgrestClient:
+        supabase_url, supabase_key = self._credentials()
+        return _PooledAsyncPostgrestClient(
+            f"{supabase_url}/rest/v1",
+            limits=self._limits(),
+            headers={"apiKey": supabase_key, "Authorization": f"Bearer {supabase_key}"},
+            timeout=config.SUPABASE_TIMEOUT,
+        )
+
+    def get(self) -> Client:
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    self._client = self._create()
+                    self._pid = pid
+        return self._client
+
+    def get_async(self) -> AsyncPostgrestClient:
+        """Async PostgREST client used by the repository layer (one per worker)"""
+        pid = os.getpid()
+        if self._async_client is None or self._async_pid != pid:
+            with self._lock:
+                if self._async_client is None or self._async_pid != pid:
+                    self._async_client = self._create_async()
+                    self._async_pid = pid
+        return self._async_client
+
+    def close(self):
+        """Close the pooled connections of the current process' client"""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.postgrest.aclose()
+            self._client = None
+            self._pid = None
+
+    async def aclose(self):
+        """Close both the sync and the async connection pools"""
+        self.close()
+        client, pid = self._async_client, self._async_pid
+        self._async_client = None
+        self._async_pid = None
+        if client is not None and pid == os.getpid():
+            await client.aclose()
+
+registry = SupabaseClientRegistry()
+
+def get_supabase_client():
+    try:
+        return registry.get()
     except Exception as e:
         print(f"Error initializing Supabase client: {str(e)}")
         print("Full error traceback:")
         print(traceback.format_exc())
         return None
 
+def get_supabase() -> Client:
+    """FastAPI dependency that hands out the worker's shared Supabase client"""
+    client = get_supabase_client()
+    if not client:
+        raise HTTPException(status_code=500, detail="Failed to initialize Supabase client")
+    return client
+
+def get_async_db() -> AsyncPostgrestClient:
+    """FastAPI dependency that hands out the worker's shared async PostgREST client"""
+    try:
+        return registry.get_async()
+    except Exception as e:
+        print(f"Error initializing async PostgREST client: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to initialize Supabase client")
+
 def test_connection():
     client = get_supabase_client()
     if client:
@@ -45,9 +189,9 @@ def test_connection():
             print("Full error traceback:")
             print(traceback.format_exc())
             return False
-    return False 
+    return False
 
 # Function to get the Supabase client instance.
 # It ensures that the client is initialized with the correct credentials.
 
-supabase = get_supabase_client() 
\ No newline at end of file
+supabase = get_supabase_client()
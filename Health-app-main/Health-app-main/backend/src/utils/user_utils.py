@@ -1,6 +1,8 @@
+from typing import Any, Dict, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from .supabase_client import supabase
+from .auth import InvalidToken, token_verifier
+from .profile_sync import profile_sync
 
 security = HTTPBearer()
 
@@ -13,34 +15,47 @@ def upsert_patient(user):
     full_name = user.get('user_metadata', {}).get('full_name') or user.get('user_metadata', {}).get('name')
     if not user_id or not email:
         return
-    supabase.table("patients").upsert({
+    # Written behind the request, and only when the profile changed since it was last queued
+    profile_sync.submit({
         "id": user_id,
         "email": email,
         "full_name": full_name
-    }).execute()
+    })
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+class AuthenticatedUser:
+    """The caller, as described by the claims of their verified Supabase access token"""
+
+    __slots__ = ("id", "email", "user_metadata", "app_metadata", "claims")
+
+    def __init__(self, claims: Dict[str, Any]):
+        self.id = claims["sub"]
+        self.email = claims.get("email")
+        self.user_metadata = claims.get("user_metadata") or {}
+        self.app_metadata = claims.get("app_metadata") or {}
+        self.claims = claims
+
+    @property
+    def role(self) -> Optional[str]:
+        """Application role (PATIENT, DOCTOR, ...) from the user's metadata"""
+        return self.app_metadata.get("role") or self.user_metadata.get("role")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "email": self.email, "user_metadata": self.user_metadata}
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> AuthenticatedUser:
     try:
-        # Get the token from the Authorization header
-        token = credentials.credentials
-        
-        # Verify the token with Supabase
-        user = supabase.auth.get_user(token)
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Upsert patient info on login
-        upsert_patient(user.get('user'))
-        return user
-        
-    except Exception as e:
+        # Verified locally against the project's signing keys (no Supabase Auth round trip)
+        claims = await token_verifier.verify(credentials.credentials)
+    except InvalidToken:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        ) 
\ No newline at end of file
+        )
+    user = AuthenticatedUser(claims)
+
+    # Upsert patient info on login
+    upsert_patient(user.as_dict())
+    return user
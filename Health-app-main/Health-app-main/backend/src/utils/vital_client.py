@@ -1,121 +1,125 @@
+import asyncio
 import os
-import requests
+import httpx
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-import json
+from .. import config
+
+# The four timeseries used by the summary and report endpoints
+TIMESERIES_METRICS = ("heart_rate", "activity", "sleep", "blood_oxygen")
 
 class VitalAPIClient:
-    """Client for interacting with the Vital API to get wearable data"""
-    
-    def __init__(self):
-        self.api_key = os.environ.get("VITAL_API_KEY", "")
-        self.base_url = "https://api.tryvital.io/v2"
+    """Async client for interacting with the Vital API to get wearable data.
+
+    One instance is shared per worker: it owns a keep-alive connection pool and
+    caps the number of in-flight Vital requests with a semaphore.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        self.api_key = api_key if api_key is not None else os.environ.get("VITAL_API_KEY", "")
+        self.base_url = base_url or config.VITAL_BASE_URL
         self.headers = {
             "Accept": "application/json",
             "Content-Type": "application/json",
             "X-API-Key": self.api_key
         }
-        
-    def get_user_devices(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get a list of connected devices for a user"""
-        url = f"{self.base_url}/user/{user_id}/devices"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        return response.json().get("devices", [])
-    
-    def get_heart_rate_data(self, user_id: str, start_date: Optional[datetime] = None, 
-                          end_date: Optional[datetime] = None) -> Dict[str, Any]:
-        """Get heart rate data for a user within a date range"""
-        if not start_date:
-            start_date = datetime.now() - timedelta(days=7)
-        if not end_date:
-            end_date = datetime.now()
-            
-        url = f"{self.base_url}/timeseries/{user_id}/heart_rate"
-        params = {
-            "start_date": start_date.strftime("%Y-%m-%d"),
-            "end_date": end_date.strftime("%Y-%m-%d"),
-        }
-        response = requests.get(url, headers=self.headers, params=params)
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(config.VITAL_TIMEOUT, connect=config.VITAL_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.VITAL_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=config.VITAL_POOL_MAX_KEEPALIVE,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(config.VITAL_MAX_CONCURRENCY)
+
+    async def _request(self, method: str, path: str, **kwargs) -> Any:
+        async with self._semaphore:
+            response = await self._client.request(method, f"{self.base_url}{path}", **kwargs)
         response.raise_for_status()
         return response.json()
-    
-    def get_activity_data(self, user_id: str, start_date: Optional[datetime] = None,
-                         end_date: Optional[datetime] = None) -> Dict[str, Any]:
-        """Get activity data for a user within a date range"""
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        await self._client.aclose()
+
+    async def get_user_devices(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get a list of connected devices for a user"""
+        data = await self._request("GET", f"/user/{user_id}/devices")
+        return data.get("devices", [])
+
+    async def get_timeseries(self, user_id: str, metric: str, start_date: Optional[datetime] = None,
+                             end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get one timeseries (heart_rate, activity, sleep, blood_oxygen) for a user within a date range"""
         if not start_date:
             start_date = datetime.now() - timedelta(days=7)
         if not end_date:
             end_date = datetime.now()
-            
-        url = f"{self.base_url}/timeseries/{user_id}/activity"
+
         params = {
             "start_date": start_date.strftime("%Y-%m-%d"),
             "end_date": end_date.strftime("%Y-%m-%d"),
         }
-        response = requests.get(url, headers=self.headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    
-    def get_sleep_data(self, user_id: str, start_date: Optional[datetime] = None,
-                      end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        return await self._request("GET", f"/timeseries/{user_id}/{metric}", params=params)
+
+    async def get_heart_rate_data(self, user_id: str, start_date: Optional[datetime] = None,
+                                  end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get heart rate data for a user within a date range"""
+        return await self.get_timeseries(user_id, "heart_rate", start_date, end_date)
+
+    async def get_activity_data(self, user_id: str, start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get activity data for a user within a date range"""
+        return await self.get_timeseries(user_id, "activity", start_date, end_date)
+
+    async def get_sleep_data(self, user_id: str, start_date: Optional[datetime] = None,
+                             end_date: Optional[datetime] = None) -> Dict[str, Any]:
         """Get sleep data for a user within a date range"""
-        if not start_date:
-            start_date = datetime.now() - timedelta(days=7)
-        if not end_date:
-            end_date = datetime.now()
-            
-        url = f"{self.base_url}/timeseries/{user_id}/sleep"
-        params = {
-            "start_date": start_date.strftime("%Y-%m-%d"),
-            "end_date": end_date.strftime("%Y-%m-%d"),
-        }
-        response = requests.get(url, headers=self.headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    
-    def get_blood_oxygen_data(self, user_id: str, start_date: Optional[datetime] = None,
-                            end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        return await self.get_timeseries(user_id, "sleep", start_date, end_date)
+
+    async def get_blood_oxygen_data(self, user_id: str, start_date: Optional[datetime] = None,
+                                    end_date: Optional[datetime] = None) -> Dict[str, Any]:
         """Get blood oxygen data for a user within a date range"""
-        if not start_date:
-            start_date = datetime.now() - timedelta(days=7)
-        if not end_date:
-            end_date = datetime.now()
-            
-        url = f"{self.base_url}/timeseries/{user_id}/blood_oxygen"
-        params = {
-            "start_date": start_date.strftime("%Y-%m-%d"),
-            "end_date": end_date.strftime("%Y-%m-%d"),
-        }
-        response = requests.get(url, headers=self.headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    
-    def create_user(self, client_user_id: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.get_timeseries(user_id, "blood_oxygen", start_date, end_date)
+
+    async def get_all_timeseries(self, user_id: str, start_date: Optional[datetime] = None,
+                                 end_date: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """Fetch heart rate, activity, sleep and blood oxygen concurrently, keyed by metric"""
+        results = await asyncio.gather(*(
+            self.get_timeseries(user_id, metric, start_date, end_date)
+            for metric in TIMESERIES_METRICS
+        ))
+        return dict(zip(TIMESERIES_METRICS, results))
+
+    async def create_user(self, client_user_id: str, profile: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new user in Vital API"""
-        url = f"{self.base_url}/user"
         payload = {
             "client_user_id": client_user_id,
             "profile": profile
         }
-        response = requests.post(url, headers=self.headers, json=payload)
-        response.raise_for_status()
-        return response.json()
-    
-    def get_user_link(self, user_id: str) -> Dict[str, Any]:
+        return await self._request("POST", "/user", json=payload)
+
+    async def get_user_link(self, user_id: str) -> Dict[str, Any]:
         """Get a link for a user to connect their wearable devices"""
-        url = f"{self.base_url}/user/{user_id}/link"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        return response.json()
-    
-    def get_connected_sources(self, user_id: str) -> List[Dict[str, Any]]:
+        return await self._request("GET", f"/user/{user_id}/link")
+
+    async def get_connected_sources(self, user_id: str) -> List[Dict[str, Any]]:
         """Get a list of connected data sources for a user"""
-        url = f"{self.base_url}/user/{user_id}/providers"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        return response.json().get("providers", [])
+        data = await self._request("GET", f"/user/{user_id}/providers")
+        return data.get("providers", [])
+
+_vital_client: Optional[VitalAPIClient] = None
 
 def get_vital_client() -> VitalAPIClient:
-    """Get a configured Vital API client"""
-    return VitalAPIClient() 
\ No newline at end of file
+    """Get the worker's shared, pooled Vital API client"""
+    global _vital_client
+    if _vital_client is None:
+        _vital_client = VitalAPIClient()
+    return _vital_client
+
+async def close_vital_client():
+    """Release the shared client's connections (called on application shutdown)"""
+    global _vital_client
+    if _vital_client is not None:
+        await _vital_client.aclose()
+        _vital_client = None
@@ -0,0 +1,170 @@
+import asyncio
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from ..models.timeseries import WearableSeries
+from .. import config
+from .metrics import metrics
+from .rollups import TIERS, Rollup, build_rollups, pick_resolution
+
+# Local time-series store for Vital wearable data.
+# Samples are kept as one columnar WearableSeries per (user, metric, day). Days that were complete when they
+# were synced never change on Vital's side, so they are served locally; only
+# days after the user's sync watermark (including today) are fetched again.
+# Every day also carries its 1m/1h/1d rollups, rebuilt only when that day is
+# re-synced, so long ranges can be served downsampled without touching raw samples.
+
+Fetcher = Callable[[datetime, datetime], Awaitable[Any]]
+EntryKey = Tuple[str, str, date]
+# (samples, final, rollups per tier)
+Entry = Tuple[WearableSeries, bool, Dict[str, Rollup]]
+
+MS_PER_DAY = 86_400_000
+
+def extract_samples(payload: Any) -> WearableSeries:
+    """Turn a Vital timeseries response (a list of samples or {"data": [...]}) into a series"""
+    if isinstance(payload, dict):
+        payload = payload.get("data") or payload.get("samples") or []
+    return WearableSeries.from_records(
+        sample for sample in payload or [] if isinstance(sample, dict)
+    )
+
+def _day_start_ms(day: date) -> int:
+    return (day - date(1970, 1, 1)).days * MS_PER_DAY
+
+def _days(start: date, end: date) -> Iterable[date]:
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+def _runs(days: List[date]) -> List[Tuple[date, date]]:
+    """Collapse sorted days into (first, last) runs of consecutive days"""
+    runs: List[Tuple[date, date]] = []
+    for day in days:
+        if runs and runs[-1][1] + timedelta(days=1) == day:
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+class WearableTimeSeriesStore:
+    """LRU store of per-day wearable samples with a per-user sync watermark"""
+
+    def __init__(self, max_entries: int = config.WEARABLE_STORE_MAX_ENTRIES,
+                 retention_days: int = config.WEARABLE_STORE_RETENTION_DAYS):
+        self.max_entries = max_entries
+        self.retention_days = retention_days
+        # (user, metric, day) -> (points, final, rollups); a day is final once it had ended when synced
+        self._entries: "OrderedDict[EntryKey, Entry]" = OrderedDict()
+        self._watermarks: Dict[str, Dict[str, date]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._last_age_sweep: Optional[date] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def watermark(self, user_id: str, metric: str) -> Optional[date]:
+        """Last complete day synced from Vital for this user and metric"""
+        return self._watermarks.get(user_id, {}).get(metric)
+
+    def _is_fresh(self, key: EntryKey) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[1]
+
+    async def _sync(self, user_id: str, metric: str, start: date, end: date,
+                    fetch: Fetcher) -> List[Entry]:
+        """Fetch the days in [start, end] not held locally and return the entries for the range"""
+        today = date.today()
+        end = min(end, today)
+        days = list(_days(start, end))
+        lock = self._locks.setdefault((user_id, metric), asyncio.Lock())
+
+        async with lock:
+            missing = [day for day in days if not self._is_fresh((user_id, metric, day))]
+            # One request per contiguous run of stale days rather than one per day
+            spans = _runs(missing)
+            payloads = await asyncio.gather(*(
+                fetch(datetime.combine(span_start, time.min), datetime.combine(span_end, time.max))
+                for span_start, span_end in spans
+            ))
+            for (span_start, span_end), payload in zip(spans, payloads):
+                self.put(user_id, metric, span_start, span_end, extract_samples(payload), today)
+
+            self.hits += len(days) - len(missing)
+            self.misses += len(missing)
+
+            entries: List[Entry] = []
+            for day in days:
+                key = (user_id, metric, day)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                self._entries.move_to_end(key)
+                entries.append(entry)
+            return entries
+
+    async def get_range(self, user_id: str, metric: str, start: date, end: date,
+                        fetch: Fetcher) -> WearableSeries:
+        """Return the samples for [start, end], fetching only the days not held locally"""
+        entries = await self._sync(user_id, metric, start, end, fetch)
+        return WearableSeries.concat([entry[0] for entry in entries])
+
+    async def query(self, user_id: str, metric: str, start: date, end: date, fetch: Fetcher,
+                    resolution: str = "auto") -> Tuple[str, Union[WearableSeries, Rollup]]:
+        """Return (resolution, data) for [start, end]: raw samples or one rollup tier.
+
+        "auto" keeps raw samples while they fit in WEARABLE_MAX_POINTS and
+        otherwise picks the finest tier that does.
+        """
+        entries = await self._sync(user_id, metric, start, end, fetch)
+        span_ms = ((end - start).days + 1) * MS_PER_DAY
+        resolution = pick_resolution(span_ms, sum(len(entry[0]) for entry in entries), resolution)
+        if resolution == "raw":
+            return resolution, WearableSeries.concat([entry[0] for entry in entries])
+        return resolution, Rollup.concat([entry[2][resolution] for entry in entries], TIERS[resolution])
+
+    def put(self, user_id: str, metric: str, span_start: date, span_end: date,
+            series: WearableSeries, today: Optional[date] = None):
+        """Store the samples synced for [span_start, span_end] and advance the watermark"""
+        today = today or date.today()
+        for day in _days(span_start, span_end):
+            key = (user_id, metric, day)
+            day_start = _day_start_ms(day)
+            samples = series.slice(day_start, day_start + MS_PER_DAY)
+            self._entries[key] = (samples, day < today, build_rollups(samples))
+            self._entries.move_to_end(key)
+
+        last_final = min(span_end, today - timedelta(days=1))
+        if last_final >= span_start:
+            user_marks = self._watermarks.setdefault(user_id, {})
+            if metric not in user_marks or user_marks[metric] < last_final:
+                user_marks[metric] = last_final
+
+        self._evict(today)
+
+    def _evict(self, today: date):
+        if self._last_age_sweep != today:
+            cutoff = today - timedelta(days=self.retention_days)
+            expired = [key for key in self._entries if key[2] < cutoff]
+            for key in expired:
+                del self._entries[key]
+            self.evictions += len(expired)
+            self._last_age_sweep = today
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+wearable_store = WearableTimeSeriesStore()
+metrics.register("wearable_store", wearable_store.stats)
@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI
+
+from src.repositories.appointments import get_appointment_repository
+from src.routers import appointment
+from src.utils.auth import get_current_user_id
+from src.utils.booking import BookingLedger, SlotConflict
+from src.utils.outbox import MemoryQueue, NotificationOutbox
+
+NINE = datetime(2030, 1, 7, 9)
+
+class FakeAppointments:
+    def __init__(self, rows, conflict=False):
+        self.rows = {row["id"]: dict(row) for row in rows}
+        self.conflict = conflict
+        self.plain_updates = 0
+
+    async def get(self, appointment_id):
+        return self.rows.get(appointment_id)
+
+    async def load_day(self, doctor_id, start, end):
+        return [row for row in self.rows.values() if row["doctor_id"] == doctor_id]
+
+    async def update_exclusive(self, appointment_id, data):
+        if self.conflict:
+            raise SlotConflict("conflicting key value violates exclusion constraint")
+        self.rows[appointment_id].update(data)
+        return [self.rows[appointment_id]]
+
+    async def update(self, appointment_id, data):
+        self.plain_updates += 1
+        self.rows[appointment_id].update(data)
+        return [self.rows[appointment_id]]
+
+    async def list_by_ids(self, appointment_ids):
+        return [dict(self.rows[i]) for i in appointment_ids if i in self.rows]
+
+    async def find_overlapping(self, doctor_ids, start, end):
+        return [row for row in self.rows.values() if row["doctor_id"] in doctor_ids]
+
+    async def insert_many_exclusive(self, rows):
+        created = [{**row, "id": f"n{len(self.rows) + n}"} for n, row in enumerate(rows)]
+        self.rows.update((row["id"], row) for row in created)
+        return created
+
+    async def upsert_many_exclusive(self, rows):
+        for row in rows:
+            self.rows[row["id"]].update(row)
+        return [self.rows[row["id"]] for row in rows]
+
+    async def cancel_many(self, appointment_ids):
+        for appointment_id in appointment_ids:
+            self.rows[appointment_id]["status"] = "cancelled"
+        return [self.rows[i] for i in appointment_ids]
+
+def row(appointment_id, start, doctor_id="d1", patient_id="p1"):
+    return {"id": appointment_id, "patient_id": patient_id, "doctor_id": doctor_id,
+            "appointment_date": start.isoformat(), "appointment_type": "follow_up", "duration_minutes": 30,
+            "reason": "Checkup", "status": "scheduled", "created_at": NINE.isoformat(), "updated_at": NINE.isoformat()}
+
+async def discard(rows):
+    pass
+
+def request(repository, method, path, user_id="p1", **kwargs):
+    app = FastAPI()
+    app.include_router(appointment.router)
+    app.dependency_overrides[get_appointment_repository] = lambda: repository
+    app.dependency_overrides[get_current_user_id] = lambda: user_id
+    appointment.booking_ledger = BookingLedger()
+    appointment.notification_outbox = NotificationOutbox(MemoryQueue(), sink=discard)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(run())
+
+def test_reschedule_within_its_own_slot():
+    repository = FakeAppointments([row("a1", NINE)])
+    response = request(repository, "PUT", "/appointments/a1",
+                       json={"appointment_date": (NINE + timedelta(minutes=15)).isoformat()})
+    assert response.status_code == 200
+    assert repository.rows["a1"]["appointment_date"] == NINE + timedelta(minutes=15)
+
+def test_reschedule_onto_another_booking_is_a_conflict():
+    repository = FakeAppointments([row("a1", NINE), row("a2", NINE + timedelta(hours=1), patient_id="p2")])
+    response = request(repository, "PUT", "/appointments/a1",
+                       json={"appointment_date": (NINE + timedelta(minutes=45)).isoformat()})
+    assert response.status_code == 409
+
+def test_reschedule_rejected_by_the_database_is_a_conflict():
+    repository = FakeAppointments([row("a1", NINE)], conflict=True)
+    response = request(repository, "PUT", "/appointments/a1",
+                       json={"appointment_date": (NINE + timedelta(hours=2)).isoformat()})
+    assert response.status_code == 409
+
+def test_edit_without_a_new_time_skips_the_ledger():
+    repository = FakeAppointments([row("a1", NINE)], conflict=True)
+    response = request(repository, "PUT", "/appointments/a1", json={"notes": "Bring previous reports"})
+    assert response.status_code == 200 and repository.plain_updates == 1
+
+def statuses(response):
+    assert response.status_code == 200
+    return [result["status"] for result in response.json()["results"]]
+
+def test_bulk_routes_require_authentication():
+    app = FastAPI()
+    app.include_router(appointment.router)
+    app.dependency_overrides[get_appointment_repository] = lambda: FakeAppointments([])
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/appointments/bulk/cancel", json={"ids": ["a1"]})
+
+    assert asyncio.run(run()).status_code == 422
+
+def test_bulk_create_only_books_the_callers_appointments():
+    repository = FakeAppointments([])
+    items = [{key: value for key, value in row(None, NINE + timedelta(hours=n), patient_id=patient).items()
+              if key in ("patient_id", "doctor_id", "appointment_date", "appointment_type", "reason")}
+             for n, patient in enumerate(("p1", "p2"))]
+    response = request(repository, "POST", "/appointments/bulk", json={"items": items})
+    assert statuses(response) == ["created", "forbidden"]
+    assert [row["patient_id"] for row in repository.rows.values()] == ["p1"]
+
+def test_bulk_update_of_someone_elses_appointment_is_forbidden():
+    repository = FakeAppointments([row("a1", NINE), row("a2", NINE + timedelta(hours=1), patient_id="p2")])
+    moved = (NINE + timedelta(hours=3)).isoformat()
+    response = request(repository, "PUT", "/appointments/bulk",
+                       json={"items": [{"id": "a1", "notes": "Fasting"}, {"id": "a2", "appointment_date": moved},
+                                       {"id": "a3", "notes": "Fasting"}]})
+    assert statuses(response) == ["updated", "forbidden", "not_found"]
+    assert repository.rows["a2"]["appointment_date"] == (NINE + timedelta(hours=1)).isoformat()
+
+def test_bulk_cancel_only_cancels_the_callers_appointments():
+    repository = FakeAppointments([row("a1", NINE), row("a2", NINE + timedelta(hours=1), patient_id="p2"),
+                                   row("a3", NINE + timedelta(hours=2), doctor_id="d2", patient_id="p3")])
+    response = request(repository, "POST", "/appointments/bulk/cancel", user_id="d2",
+                       json={"ids": ["a1", "a2", "a3", "a4"]})
+    assert statuses(response) == ["forbidden", "forbidden", "cancelled", "not_found"]
+    assert [row["status"] for row in repository.rows.values()] == ["scheduled", "scheduled", "cancelled"]
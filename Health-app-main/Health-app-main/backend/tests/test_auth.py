@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.utils.auth import InvalidToken, TokenVerifier
+
+KEY = {"kid": "k1", "kty": "EC", "crv": "P-256", "x": "x", "y": "y"}
+
+def verifier(*responses):
+    """A verifier whose JWKS endpoint answers with the given responses in turn"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    instance = TokenVerifier(secret="", jwks_url="https://auth.test/jwks.json", jwks_min_refresh=60)
+    instance._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return instance, calls
+
+def signing_key(instance, kid="k1"):
+    async def run():
+        try:
+            return await instance._signing_key(kid)
+        finally:
+            await instance.aclose()
+
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("response", [
+    httpx.Response(200, text="<html>Sign in to the Wi-Fi</html>"),
+    httpx.Response(200, json={"keys": "none"}),
+    httpx.Response(200, json=["k1"]),
+    httpx.Response(503),
+])
+def test_bad_jwks_response_is_an_invalid_token(response):
+    instance, _ = verifier(response)
+    with pytest.raises(InvalidToken):
+        signing_key(instance)
+    assert instance._keys_fetched_at is not None
+
+def test_failed_refresh_keeps_the_previous_keys_and_is_not_retried_per_request():
+    instance, calls = verifier(httpx.Response(200, json={"keys": [KEY]}), httpx.Response(200, text="<html>"))
+
+    async def run():
+        assert await instance._signing_key("k1") == KEY
+        instance._keys_fetched_at -= instance.jwks_ttl
+        # The refresh fails; the cached key keeps working and the next unknown kid waits for the interval
+        assert await instance._signing_key("k1") == KEY
+        for _ in range(3):
+            with pytest.raises(InvalidToken):
+                await instance._signing_key("k2")
+        await instance.aclose()
+
+    asyncio.run(run())
+    assert len(calls) == 2
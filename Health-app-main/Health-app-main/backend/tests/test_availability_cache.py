@@ -0,0 +1,174 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from src.utils.availability_cache import AvailabilityCache
+from src.utils.cache import SET_IF_UNCHANGED, MemoryCache, RedisCache
+
+DAY = date(2024, 1, 1)
+NINE = datetime(2024, 1, 1, 9)
+
+class FakeRedis:
+    """The commands RedisCache uses, over a dict of bytes values (expiry is ignored)"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def register_script(self, source):
+        assert source == SET_IF_UNCHANGED
+
+        async def run(keys, args):
+            # Same layout as the Lua script: entry keys then version keys; TTL, versions, values
+            n = len(keys) // 2
+            written = 0
+            for i in range(n):
+                if (self.data.get(keys[n + i]) or b"").decode() == str(args[1 + i]):
+                    self.data[keys[i]] = str(args[1 + n + i]).encode()
+                    written += 1
+            return written
+
+        return run
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, px=None):
+        self.commands.append(("set", key, value))
+
+    def incr(self, key):
+        self.commands.append(("incr", key))
+
+    def pexpire(self, key, ms):
+        self.commands.append(("pexpire", key))
+
+    def delete(self, *keys):
+        self.commands.append(("delete", *keys))
+
+    async def execute(self):
+        data, results = self.redis.data, []
+        for name, *args in self.commands:
+            if name == "set":
+                data[args[0]] = args[1].encode()
+                results.append(True)
+            elif name == "incr":
+                data[args[0]] = str(int(data.get(args[0], b"0")) + 1).encode()
+                results.append(int(data[args[0]]))
+            elif name == "delete":
+                results.append(sum(data.pop(key, None) is not None for key in args))
+            else:
+                results.append(True)
+        return results
+
+class FakeTable:
+    def __init__(self):
+        self.rows = []
+        self.queries = 0
+        self.gate = None
+
+    async def find_overlapping(self, doctor_ids, start, end):
+        self.queries += 1
+        snapshot = [dict(row) for row in self.rows if row["doctor_id"] in doctor_ids]
+        if self.gate is not None:
+            await self.gate.wait()
+        return snapshot
+
+    def book(self, doctor_id, start):
+        self.rows.append({"doctor_id": doctor_id, "appointment_date": start.isoformat(), "duration_minutes": 30})
+
+def workers(count):
+    redis = FakeRedis()
+    return [AvailabilityCache(RedisCache(redis, "availability", ttl=300)) for _ in range(count)]
+
+def intervals(result):
+    bookings = result["d1"]
+    return list(zip(bookings.starts, bookings.ends))
+
+def test_cached_day_is_shared_between_workers():
+    async def run():
+        first, second = workers(2)
+        table = FakeTable()
+        table.book("d1", NINE)
+        assert intervals(await first.bookings(["d1"], DAY, DAY, table.find_overlapping)) == \
+            [(NINE, NINE + timedelta(minutes=30))]
+        assert intervals(await second.bookings(["d1"], DAY, DAY, table.find_overlapping)) == \
+            [(NINE, NINE + timedelta(minutes=30))]
+        return table.queries
+
+    assert asyncio.run(run()) == 1
+
+def test_invalidation_by_another_worker_reaches_every_worker():
+    async def run():
+        first, second = workers(2)
+        table = FakeTable()
+        await first.bookings(["d1"], DAY, DAY, table.find_overlapping)
+        table.book("d1", NINE)
+        await second.invalidate("d1", NINE, NINE + timedelta(minutes=30))
+        return intervals(await first.bookings(["d1"], DAY, DAY, table.find_overlapping))
+
+    assert asyncio.run(run()) == [(NINE, NINE + timedelta(minutes=30))]
+
+def test_load_racing_another_workers_invalidation_is_not_written_back():
+    async def run():
+        loader, writer = workers(2)
+        table = FakeTable()
+        table.gate = asyncio.Event()
+        # The loader reads the table before the booking lands...
+        load = asyncio.create_task(loader.bookings(["d1"], DAY, DAY, table.find_overlapping))
+        await asyncio.sleep(0)
+        # ...then another worker books and invalidates while that query is still running
+        table.book("d1", NINE)
+        await writer.invalidate("d1", NINE, NINE + timedelta(minutes=30))
+        table.gate.set()
+        assert intervals(await load) == []
+        table.gate = None
+        # The stale empty day was not cached, so the next read sees the booking
+        queries = table.queries
+        result = intervals(await writer.bookings(["d1"], DAY, DAY, table.find_overlapping))
+        return result, table.queries - queries, loader.store.stale_writes
+
+    result, queries, stale = asyncio.run(run())
+    assert result == [(NINE, NINE + timedelta(minutes=30))]
+    assert queries == 1 and stale == 1
+
+def test_load_racing_an_invalidation_in_the_same_worker_is_not_written_back():
+    async def run():
+        cache = AvailabilityCache(MemoryCache(ttl=300, max_entries=100))
+        table = FakeTable()
+        table.gate = asyncio.Event()
+        load = asyncio.create_task(cache.bookings(["d1"], DAY, DAY, table.find_overlapping))
+        await asyncio.sleep(0)
+        table.book("d1", NINE)
+        await cache.invalidate("d1", NINE, NINE + timedelta(minutes=30))
+        table.gate.set()
+        await load
+        table.gate = None
+        return intervals(await cache.bookings(["d1"], DAY, DAY, table.find_overlapping))
+
+    assert asyncio.run(run()) == [(NINE, NINE + timedelta(minutes=30))]
+
+def test_booking_across_midnight_is_cached_on_both_days():
+    async def run():
+        cache = workers(1)[0]
+        table = FakeTable()
+        table.book("d1", datetime(2024, 1, 1, 23, 45))
+        result = await cache.bookings(["d1"], DAY, DAY + timedelta(days=1), table.find_overlapping)
+        second_day = await cache.bookings(["d1"], DAY + timedelta(days=1), DAY + timedelta(days=1),
+                                          table.find_overlapping)
+        return intervals(result), intervals(second_day), table.queries
+
+    both, second_day, queries = asyncio.run(run())
+    assert both == second_day == [(datetime(2024, 1, 1, 23, 45), datetime(2024, 1, 2, 0, 15))]
+    assert queries == 1
@@ -0,0 +1,221 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from postgrest.exceptions import APIError
+
+from src.repositories.appointments import AppointmentRepository
+from src.utils.booking import BookingLedger, ReservationRetry, SlotConflict
+from src.utils.scheduling import booking_interval
+
+NINE = datetime(2024, 1, 1, 9)
+
+class FakeTable:
+    """Appointments of one database, with the exclusion constraint and a round trip per call"""
+
+    def __init__(self, rows=(), constraint=True):
+        self.rows = [dict(row) for row in rows]
+        self.constraint = constraint
+        self.loads = 0
+
+    def _overlapping(self, doctor_id, start, end, ignore=None):
+        return [row for row in self.rows if row["doctor_id"] == doctor_id and row["id"] != ignore
+                and booking_interval(row)[0] < end and start < booking_interval(row)[1]]
+
+    async def load(self, doctor_id, start, end):
+        self.loads += 1
+        await asyncio.sleep(0)
+        return [dict(row) for row in self._overlapping(doctor_id, start, end)]
+
+    async def load_many(self, doctor_ids, start, end):
+        return [row for doctor_id in doctor_ids for row in await self.load(doctor_id, start, end)]
+
+    async def insert(self, row):
+        await asyncio.sleep(0.001)
+        if self.constraint and self._overlapping(row["doctor_id"], *booking_interval(row)):
+            raise SlotConflict("conflicting key value violates exclusion constraint")
+        row = {**row, "id": f"a{len(self.rows) + 1}"}
+        self.rows.append(row)
+        return row
+
+    async def update(self, appointment_id, changes):
+        await asyncio.sleep(0.001)
+        row = next(row for row in self.rows if row["id"] == appointment_id)
+        moved = {**row, **changes}
+        if self.constraint and self._overlapping(moved["doctor_id"], *booking_interval(moved), ignore=appointment_id):
+            raise SlotConflict("conflicting key value violates exclusion constraint")
+        row.update(changes)
+        return [dict(row)]
+
+def appointment(start, doctor_id="d1", minutes=30, **extra):
+    return {"doctor_id": doctor_id, "appointment_date": start.isoformat(), "duration_minutes": minutes, **extra}
+
+async def reserve(ledger, table, start, doctor_id="d1", minutes=30):
+    row = appointment(start, doctor_id, minutes)
+    return await ledger.reserve(doctor_id, *booking_interval(row), row, load=table.load, insert=table.insert)
+
+async def outcomes(calls):
+    return await asyncio.gather(*calls, return_exceptions=True)
+
+def test_concurrent_reserves_of_one_slot_book_it_once():
+    async def run():
+        ledger, table = BookingLedger(), FakeTable(constraint=False)
+        results = await outcomes([reserve(ledger, table, NINE + timedelta(minutes=m)) for m in (0, 0, 10, 20, 0) * 4])
+        return ledger, table, results
+
+    ledger, table, results = asyncio.run(run())
+    # Without the database constraint the ledger alone must keep the slot single-booked
+    assert len(table.rows) == 1
+    assert sum(not isinstance(result, Exception) for result in results) == 1
+    assert all(isinstance(result, SlotConflict) for result in results if isinstance(result, Exception))
+    assert ledger.stats()["in_flight"] == 0
+
+def test_concurrent_reserves_of_different_slots_all_succeed():
+    async def run():
+        ledger, table = BookingLedger(), FakeTable()
+        return table, await outcomes([reserve(ledger, table, NINE + timedelta(minutes=30 * n)) for n in range(8)])
+
+    table, results = asyncio.run(run())
+    assert not any(isinstance(result, Exception) for result in results)
+    assert len(table.rows) == 8
+
+def test_back_to_back_reserves_do_not_conflict():
+    async def run():
+        ledger, table = BookingLedger(), FakeTable()
+        await reserve(ledger, table, NINE)
+        await reserve(ledger, table, NINE + timedelta(minutes=30))
+        with pytest.raises(SlotConflict):
+            await reserve(ledger, table, NINE + timedelta(minutes=45))
+
+    asyncio.run(run())
+
+def test_exclusion_violation_maps_to_conflict():
+    class Query:
+        async def execute(self):
+            raise APIError({"code": "23P01", "message": "conflicting key value violates exclusion constraint",
+                            "details": None, "hint": None})
+
+    with pytest.raises(SlotConflict):
+        asyncio.run(AppointmentRepository(None)._write_exclusive(Query()))
+
+def test_serialization_failure_maps_to_retry():
+    class Query:
+        async def execute(self):
+            raise APIError({"code": "40001", "message": "could not serialize access", "details": None, "hint": None})
+
+    with pytest.raises(ReservationRetry):
+        asyncio.run(AppointmentRepository(None)._write_exclusive(Query()))
+
+def test_database_conflict_drops_the_cached_day():
+    async def run():
+        ledger, table = BookingLedger(), FakeTable()
+        await reserve(ledger, table, NINE + timedelta(hours=2))
+        # Another worker books 09:00 behind this worker's back
+        table.rows.append({**appointment(NINE), "id": "elsewhere"})
+        with pytest.raises(SlotConflict):
+            await reserve(ledger, table, NINE)
+        assert (("d1", NINE.date())) not in ledger._days
+        assert ledger.stats()["db_conflicts"] == 1 and ledger.stats()["in_flight"] == 0
+        # The next request reloads the day and is rejected without an insert
+        loads = table.loads
+        with pytest.raises(SlotConflict):
+            await reserve(ledger, table, NINE)
+        assert table.loads == loads + 1 and ledger.stats()["db_conflicts"] == 1
+
+    asyncio.run(run())
+
+def test_transient_errors_are_retried():
+    async def run():
+        ledger, table = BookingLedger(max_retries=2), FakeTable()
+        failures = [ReservationRetry("deadlock detected")] * 2
+
+        async def flaky(row):
+            if failures:
+                raise failures.pop()
+            return await table.insert(row)
+
+        row = appointment(NINE)
+        await ledger.reserve("d1", *booking_interval(row), row, load=table.load, insert=flaky)
+        return ledger, table
+
+    ledger, table = asyncio.run(run())
+    assert len(table.rows) == 1 and ledger.stats()["retries"] == 2
+
+def test_hold_many_rejects_conflicts_within_the_batch():
+    async def run():
+        ledger, table = BookingLedger(), FakeTable([{**appointment(NINE + timedelta(hours=3)), "id": "a0"}])
+        items = [
+            ("d1", NINE, NINE + timedelta(minutes=30)),
+            ("d1", NINE + timedelta(minutes=15), NINE + timedelta(minutes=45)),  # overlaps the first item
+            ("d1", NINE + timedelta(minutes=30), NINE + timedelta(hours=1)),  # touches the first item
+            ("d2", NINE, NINE + timedelta(minutes=30)),  # same time, other doctor
+            ("d1", NINE + timedelta(hours=3), NINE + timedelta(hours=3, minutes=30)),  # already booked
+        ]
+        accepted = await ledger.hold_many(items, table.load_many)
+        held = ledger.stats()["in_flight"]
+        ledger.release_many(items, accepted, accepted)
+        return accepted, held, ledger.stats()["in_flight"]
+
+    accepted, held, after = asyncio.run(run())
+    assert accepted == [True, False, True, True, False]
+    assert held == 3 and after == 0
+
+def test_hold_many_ignores_the_appointments_being_moved():
+    async def run():
+        ledger, table = BookingLedger(), FakeTable([{**appointment(NINE), "id": "a0"}])
+        items = [("d1", NINE + timedelta(minutes=15), NINE + timedelta(minutes=45))]
+        return (await ledger.hold_many(items, table.load_many),
+                await ledger.hold_many(items, table.load_many, ignore_ids={"a0"}))
+
+    assert asyncio.run(run()) == ([False], [True])
+
+def test_reserve_conflicts_with_a_batch_hold_in_flight():
+    async def run():
+        ledger, table = BookingLedger(), FakeTable()
+        items = [("d1", NINE, NINE + timedelta(minutes=30))]
+        accepted = await ledger.hold_many(items, table.load_many)
+        with pytest.raises(SlotConflict):
+            await reserve(ledger, table, NINE)
+        ledger.release_many(items, accepted, [False])
+        await reserve(ledger, table, NINE)
+
+    asyncio.run(run())
+
+def test_move_within_its_own_slot():
+    async def run():
+        ledger, table = BookingLedger(), FakeTable([{**appointment(NINE), "id": "a0"}])
+        changes = {"appointment_date": (NINE + timedelta(minutes=15)).isoformat()}
+        return await ledger.move("d1", "a0", NINE + timedelta(minutes=15), NINE + timedelta(minutes=45),
+                                 load=table.load, write=lambda: table.update("a0", changes))
+
+    moved = asyncio.run(run())
+    assert moved[0]["appointment_date"] == (NINE + timedelta(minutes=15)).isoformat()
+
+def test_move_onto_another_booking_conflicts():
+    async def run():
+        ledger = BookingLedger()
+        table = FakeTable([{**appointment(NINE), "id": "a0"}, {**appointment(NINE + timedelta(hours=1)), "id": "a1"}])
+        with pytest.raises(SlotConflict):
+            await ledger.move("d1", "a0", NINE + timedelta(minutes=45), NINE + timedelta(minutes=75),
+                              load=table.load, write=lambda: table.update("a0", {}))
+        return ledger
+
+    assert asyncio.run(run()).stats()["in_flight"] == 0
+
+def test_concurrent_move_and_reserves_of_one_slot_book_it_once():
+    target = NINE + timedelta(hours=2)
+
+    async def run():
+        ledger, table = BookingLedger(), FakeTable([{**appointment(NINE), "id": "a0"}], constraint=False)
+        changes = {"appointment_date": target.isoformat()}
+        move = ledger.move("d1", "a0", target, target + timedelta(minutes=30), load=table.load,
+                           write=lambda: table.update("a0", changes))
+        for first in (move, reserve(ledger, table, target)):
+            results = await outcomes([first, reserve(ledger, table, target), reserve(ledger, table, target)])
+            assert sum(not isinstance(result, Exception) for result in results) == 1
+            assert len([row for row in table.rows if booking_interval(row)[0] == target]) == 1
+            # Reset for the second round, where a new booking goes first
+            table.rows = [{**appointment(NINE), "id": "a0"}]
+            ledger.invalidate("d1")
+
+    asyncio.run(run())
@@ -0,0 +1,18 @@
+from src.utils.doctor_search import DoctorSearchIndex
+
+def names(index, **kwargs):
+    page, _ = index.search(**kwargs)
+    return [doctor["name"] for _, doctor in page]
+
+def test_name_order_follows_renames_and_removals():
+    index = DoctorSearchIndex()
+    index.load([{"id": str(n), "name": name, "specialty": "Cardiology"}
+                for n, name in enumerate(["Carol", "alice", "Bob", "Dave"])])
+    assert names(index) == ["alice", "Bob", "Carol", "Dave"]
+
+    index.upsert({"id": "1", "name": "Eve", "specialty": "Cardiology"})
+    index.remove("2")
+    index.upsert({"id": "4", "name": "Bob", "specialty": "Cardiology"})
+    assert names(index) == ["Bob", "Carol", "Dave", "Eve"]
+    assert index._order_keys == sorted(index._order_keys)
+    assert names(index, q="ev", specialty="cardiology") == ["Eve"]
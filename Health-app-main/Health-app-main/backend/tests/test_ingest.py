@@ -0,0 +1,152 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from src.utils.ingest import IngestBuffer, NDJSONParser
+
+USER = "3f2b8c1e-9a4d-4e1f-8b2a-0c5d6e7f8a9b"
+OTHER = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+NOW_MS = int(time.time() * 1000)
+
+def parse(*records):
+    parser = NDJSONParser()
+    batch = parser.feed(b"".join(json.dumps(record).encode() + b"\n" for record in records))
+    return batch
+
+def samples(user_id, count=3, metric="heart_rate"):
+    return {"user_id": user_id, "metric": metric, "unit": "bpm",
+            "timestamps": [NOW_MS - 1000 * n for n in range(count)], "values": [70.0] * count}
+
+def test_non_uuid_user_ids_are_rejected():
+    batch = parse(samples("device-1"), samples(USER.upper()), samples("../etc"))
+    assert batch.rejected == 6
+    assert list(batch.series) == [(USER, "heart_rate")]
+
+class RejectingSink:
+    """Refuses any insert containing a row of `bad`, like a foreign key on wearable_samples.user_id"""
+
+    def __init__(self, bad):
+        self.bad = bad
+        self.rows = []
+        self.calls = 0
+
+    async def __call__(self, rows):
+        self.calls += 1
+        if any(row["user_id"] == self.bad for row in rows):
+            raise ValueError("insert or update violates foreign key constraint")
+        self.rows.extend(rows)
+
+def test_rejected_series_does_not_block_the_rest_of_the_buffer():
+    async def run():
+        sink = RejectingSink(OTHER)
+        buffer = IngestBuffer(sink=sink, batch_size=100, flush_interval=60, max_attempts=3)
+        await buffer.add(parse(samples(USER), samples(OTHER), samples(USER, metric="spo2")))
+        for _ in range(buffer.max_attempts - 1):
+            with pytest.raises(ValueError):
+                await buffer.flush()
+        await buffer.flush()
+        await buffer.add(parse(samples(USER, metric="steps")))
+        await buffer.flush()
+        return sink, buffer.stats()
+
+    sink, stats = asyncio.run(run())
+    assert {row["metric"] for row in sink.rows} == {"heart_rate", "spo2", "steps"}
+    assert all(row["user_id"] == USER for row in sink.rows)
+    assert stats["dropped"] == 3 and stats["pending"] == 0 and stats["flushed"] == 9
+
+def test_unreachable_database_keeps_samples_without_using_attempts():
+    async def run():
+        rows, outage = [], [True]
+
+        async def sink(batch):
+            if outage[0]:
+                raise httpx.ConnectError("connection refused")
+            rows.extend(batch)
+
+        buffer = IngestBuffer(sink=sink, batch_size=100, flush_interval=60, max_attempts=1)
+        await buffer.add(parse(samples(USER), samples(USER, metric="spo2")))
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectError):
+                await buffer.flush()
+        outage[0] = False
+        await buffer.flush()
+        return rows, buffer.stats()
+
+    rows, stats = asyncio.run(run())
+    assert len(rows) == 6 and stats["dropped"] == 0 and stats["pending"] == 0
+
+def test_write_cancelled_mid_flush_puts_the_samples_back():
+    async def run():
+        started = asyncio.Event()
+
+        async def stuck(rows):
+            started.set()
+            await asyncio.Event().wait()
+
+        buffer = IngestBuffer(sink=stuck, batch_size=100, flush_interval=60)
+        await buffer.add(parse(samples(USER, count=10)))
+        flush = asyncio.create_task(buffer.flush())
+        await started.wait()
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert buffer.pending == 10 and len(buffer._rows(list(buffer._pending))) == 10
+
+def test_close_stops_the_worker_and_writes_what_is_buffered():
+    async def run():
+        rows = []
+
+        async def sink(batch):
+            await asyncio.sleep(0.01)
+            rows.extend(batch)
+
+        buffer = IngestBuffer(sink=sink, batch_size=4, flush_interval=60)
+        await buffer.add(parse(samples(USER, count=10)))
+        worker = buffer._worker
+        await asyncio.sleep(0)
+        await asyncio.wait_for(buffer.close(), 1)
+        return rows, buffer, worker
+
+    rows, buffer, worker = asyncio.run(run())
+    assert len(rows) == 10 and buffer.pending == 0 and worker.done()
+
+def post_ingest(body, user_id=None):
+    from fastapi import FastAPI
+    from src.routers import wearable
+    from src.utils.auth import get_current_user_id
+
+    rows = []
+
+    async def sink(batch):
+        rows.extend(batch)
+
+    app = FastAPI()
+    app.include_router(wearable.router)
+    if user_id is not None:
+        app.dependency_overrides[get_current_user_id] = lambda: user_id
+    wearable.ingest_buffer = IngestBuffer(sink=sink, flush_interval=60)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/wearable/ingest", content=body,
+                                         headers={"Content-Type": "application/x-ndjson"})
+        await wearable.ingest_buffer.flush()
+        return response
+
+    return asyncio.run(run()), rows
+
+def test_ingest_requires_authentication():
+    response, rows = post_ingest(json.dumps(samples(USER)).encode())
+    assert response.status_code == 422 and rows == []
+
+def test_ingest_drops_samples_of_other_users():
+    body = b"\n".join(json.dumps(record).encode() for record in (samples(USER), samples(OTHER, count=5)))
+    response, rows = post_ingest(body, user_id=USER)
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 3 and response.json()["forbidden"] == 5
+    assert {row["user_id"] for row in rows} == {USER}
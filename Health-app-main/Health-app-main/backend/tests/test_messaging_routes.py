@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.repositories.messaging import get_conversation_repository, get_message_repository
+from src.routers import messaging
+from src.utils.auth import get_current_user_id
+
+class FakeConversations:
+    def __init__(self):
+        self.rows = {"c1": {"id": "c1", "patient_id": "p1", "doctor_id": "d1"}}
+
+    async def get(self, conversation_id, columns="*"):
+        return self.rows.get(conversation_id)
+
+    async def find(self, patient_id, doctor_id):
+        return None
+
+    async def insert(self, row):
+        self.rows[row["id"]] = row
+        return [row]
+
+class FakeMessages:
+    def __init__(self):
+        self.rows = []
+
+    async def page(self, conversation_id, limit, before=None, after=None):
+        return [row for row in self.rows if row["conversation_id"] == conversation_id][:limit]
+
+    async def insert(self, row):
+        row = {**row, "sent_at": "2030-01-07T09:00:00+00:00"}
+        self.rows.append(row)
+        return [row]
+
+def request(method, path, user_id=None, **kwargs):
+    app = FastAPI()
+    app.include_router(messaging.router)
+    messages = FakeMessages()
+    app.dependency_overrides[get_conversation_repository] = FakeConversations
+    app.dependency_overrides[get_message_repository] = lambda: messages
+    if user_id is not None:
+        app.dependency_overrides[get_current_user_id] = lambda: user_id
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(run()), messages
+
+@pytest.mark.parametrize("method, path, kwargs", [
+    ("GET", "/messaging/messages?conversation_id=c1", {}),
+    ("POST", "/messaging/messages", {"json": {"conversation_id": "c1", "content": "hello"}}),
+    ("POST", "/messaging/conversations?patient_id=p1&doctor_id=d1", {}),
+])
+def test_messaging_routes_require_authentication(method, path, kwargs):
+    assert request(method, path, **kwargs)[0].status_code == 422
+
+def test_only_participants_read_a_conversation():
+    assert request("GET", "/messaging/messages?conversation_id=c1", user_id="p2")[0].status_code == 403
+    assert request("GET", "/messaging/messages?conversation_id=c9", user_id="p1")[0].status_code == 403
+    assert request("GET", "/messaging/messages?conversation_id=c1", user_id="d1")[0].status_code == 200
+
+def test_only_participants_post_to_a_conversation():
+    body = {"conversation_id": "c1", "content": "hello"}
+    response, messages = request("POST", "/messaging/messages", user_id="p2", json=body)
+    assert response.status_code == 403 and messages.rows == []
+    response, messages = request("POST", "/messaging/messages", user_id="p1", json=body)
+    assert response.status_code == 200 and len(messages.rows) == 1
+
+def test_conversations_are_created_only_by_a_participant():
+    assert request("POST", "/messaging/conversations?patient_id=p1&doctor_id=d2", user_id="p2")[0].status_code == 403
+    assert request("POST", "/messaging/conversations?patient_id=p1&doctor_id=d2", user_id="p1")[0].status_code == 200
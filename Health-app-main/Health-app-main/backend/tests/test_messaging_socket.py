@@ -0,0 +1,50 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.repositories.messaging import get_conversation_repository
+from src.routers import messaging
+from src.utils.auth import InvalidToken
+
+class FakeVerifier:
+    async def verify(self, token):
+        if not token.startswith("token-"):
+            raise InvalidToken("bad signature")
+        return {"sub": token[len("token-"):]}
+
+class FakeConversations:
+    async def get(self, conversation_id, columns="*"):
+        if conversation_id == "c1":
+            return {"patient_id": "p1", "doctor_id": "d1"}
+        return None
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(messaging, "token_verifier", FakeVerifier())
+    app = FastAPI()
+    app.include_router(messaging.router)
+    app.dependency_overrides[get_conversation_repository] = lambda: FakeConversations()
+    return TestClient(app)
+
+def close_code(client, path, **kwargs):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(path, **kwargs):
+            pass
+    return closed.value.code
+
+def test_socket_without_a_valid_token_is_closed(client):
+    assert close_code(client, "/messaging/ws/c1") == 4401
+    assert close_code(client, "/messaging/ws/c1?token=forged") == 4401
+
+def test_socket_of_a_non_participant_is_closed(client):
+    assert close_code(client, "/messaging/ws/c1?token=token-p2") == 4403
+
+def test_socket_of_an_unknown_conversation_is_closed(client):
+    assert close_code(client, "/messaging/ws/c2?token=token-p1") == 4404
+
+def test_participants_are_accepted_with_either_token_form(client):
+    with client.websocket_connect("/messaging/ws/c1?token=token-p1"):
+        pass
+    with client.websocket_connect("/messaging/ws/c1", subprotocols=["bearer", "token-d1"]) as socket:
+        assert socket.accepted_subprotocol == "bearer"
@@ -0,0 +1,125 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from fastapi import FastAPI
+
+from src.repositories.messaging import get_conversation_repository, get_message_repository
+from src.routers import messaging
+from src.utils.auth import get_current_user_id
+from src.utils.scheduling import parse_datetime
+
+START = datetime(2030, 1, 7, 9, 0, tzinfo=timezone.utc)
+
+def key(timestamp, row_id):
+    return parse_datetime(timestamp), row_id
+
+class Store:
+    """One conversation of p1; messages become visible only once committed"""
+
+    def __init__(self):
+        self.conversation = {"id": "c1", "patient_id": "p1", "doctor_id": "d1",
+                             "last_message_at": START.isoformat(), "last_message_id": None}
+        self.messages = []
+
+    def commit(self, seconds, message_id=None):
+        # Supabase trims trailing zeros from the fraction, which fromisoformat rejects before 3.11
+        sent_at = (START + timedelta(seconds=seconds)).isoformat().replace("+00:00", "Z")
+        row = {"id": message_id or str(uuid.uuid4()), "conversation_id": "c1", "content": "hi",
+               "sent_at": sent_at.replace("000Z", "Z")}
+        self.messages.append(row)
+        latest = max(self.messages, key=lambda m: key(m["sent_at"], m["id"]))
+        self.conversation.update(last_message_at=latest["sent_at"], last_message_id=latest["id"])
+        return row["id"]
+
+class FakeConversations:
+    def __init__(self, store):
+        self.store = store
+
+    async def page_for_user(self, user_id, limit, before=None):
+        return [self.store.conversation]
+
+    async def changed_since(self, user_id, since):
+        conv = self.store.conversation
+        return [dict(conv)] if parse_datetime(conv["last_message_at"]) >= parse_datetime(since) else []
+
+class FakeMessages:
+    def __init__(self, store):
+        self.store = store
+
+    async def since(self, conversation_ids, after, limit):
+        after = key(*after)
+        rows = [m for m in self.store.messages if key(m["sent_at"], m["id"]) > after]
+        return sorted(rows, key=lambda m: key(m["sent_at"], m["id"]))[:limit]
+
+def client(store):
+    app = FastAPI()
+    app.include_router(messaging.router)
+    app.dependency_overrides[get_conversation_repository] = lambda: FakeConversations(store)
+    app.dependency_overrides[get_message_repository] = lambda: FakeMessages(store)
+    app.dependency_overrides[get_current_user_id] = lambda: "p1"
+
+    async def get(since=None):
+        params = {"since": since} if since else {}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            return await http.get("/messaging/sync", params=params)
+
+    return get
+
+def syncer(store):
+    get = client(store)
+
+    async def sync(since=None):
+        response = await get(since)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        return [m["id"] for m in body["messages"]], body["cursor"]
+
+    return sync
+
+def test_message_committed_late_is_delivered_once():
+    async def run():
+        store = Store()
+        store.commit(0)
+        sync = syncer(store)
+        first, cursor = await sync()
+        on_time = store.commit(2.5)
+        second, cursor = await sync(cursor)
+        # Its transaction started first, so it carries an earlier sent_at than the one already synced
+        late = store.commit(1.25)
+        third, cursor = await sync(cursor)
+        fourth, cursor = await sync(cursor)
+        return on_time, late, [first, second, third, fourth]
+
+    on_time, late, responses = asyncio.run(run())
+    assert responses == [[], [on_time], [late], []]
+
+def test_history_inside_the_window_is_not_sent_by_the_first_sync():
+    async def run():
+        store = Store()
+        store.commit(0)
+        store.commit(1)
+        sync = syncer(store)
+        _, cursor = await sync()
+        return await sync(cursor)
+
+    assert asyncio.run(run())[0] == []
+
+def test_messages_older_than_the_window_are_forgotten():
+    async def run():
+        store = Store()
+        sync = syncer(store)
+        _, cursor = await sync()
+        old = store.commit(1)
+        delivered, cursor = await sync(cursor)
+        store.commit(messaging.config.SYNC_OVERLAP + 5)
+        _, cursor = await sync(cursor)
+        return old, delivered, messaging._decode_sync_cursor(cursor)[1]
+
+    old, delivered, remembered = asyncio.run(run())
+    assert delivered == [old] and old not in remembered and len(remembered) == 1
+
+def test_malformed_cursor_is_rejected():
+    response = asyncio.run(client(Store())("not-a-cursor"))
+    assert response.status_code == 400
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.utils.outbox import MemoryQueue, NotificationOutbox
+
+def events(outbox, count):
+    return [outbox.event("u1", "Reminder", f"Message {n}") for n in range(count)]
+
+def test_batch_cancelled_mid_write_goes_back_on_the_queue():
+    async def run():
+        started = asyncio.Event()
+
+        async def stuck(rows):
+            started.set()
+            await asyncio.Event().wait()
+
+        outbox = NotificationOutbox(MemoryQueue(), sink=stuck, flush_interval=60)
+        await outbox.publish(events(outbox, 3))
+        flush = asyncio.create_task(outbox.flush())
+        await started.wait()
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        return await outbox.queue.pop(10), outbox.stats()
+
+    requeued, stats = asyncio.run(run())
+    assert [event["message"] for event in requeued] == ["Message 0", "Message 1", "Message 2"]
+    assert all(event["attempts"] == 0 for event in requeued)
+    assert stats["dropped"] == 0
+
+def test_close_stops_the_dispatcher_and_delivers_what_is_queued():
+    async def run():
+        written = []
+
+        async def sink(rows):
+            written.extend(rows)
+
+        outbox = NotificationOutbox(MemoryQueue(), sink=sink, flush_interval=60)
+        await outbox.publish(events(outbox, 2))
+        worker = outbox._worker
+        await asyncio.wait_for(outbox.close(), 1)
+        return written, worker.done()
+
+    written, stopped = asyncio.run(run())
+    assert len(written) == 2 and stopped
+
+def test_rejected_event_does_not_take_its_batch_down_with_it():
+    async def run():
+        written = []
+
+        async def sink(rows):
+            if any(row["user_id"] == "not-a-uuid" for row in rows):
+                raise ValueError("violates foreign key constraint notifications_user_id_fkey")
+            written.extend(rows)
+
+        outbox = NotificationOutbox(MemoryQueue(), sink=sink, flush_interval=60, max_attempts=2)
+        batch = events(outbox, 7)
+        batch[3]["user_id"] = "not-a-uuid"
+        await outbox.publish(batch)
+        with pytest.raises(ValueError):
+            await outbox.flush()
+        first = len(written)
+        await outbox.flush()
+        return first, written, outbox.stats()
+
+    first, written, stats = asyncio.run(run())
+    assert first == 6 and len(written) == 6
+    assert stats["dropped"] == 1 and stats["sent"] == 6 and stats["queue_depth"] == 0
+
+def test_unreachable_database_requeues_the_whole_batch():
+    async def run():
+        async def sink(rows):
+            raise httpx.ConnectError("connection refused")
+
+        outbox = NotificationOutbox(MemoryQueue(), sink=sink, flush_interval=60)
+        await outbox.publish(events(outbox, 4))
+        with pytest.raises(httpx.ConnectError):
+            await outbox.flush()
+        return await outbox.queue.pop(10)
+
+    requeued = asyncio.run(run())
+    assert len(requeued) == 4 and all(event["attempts"] == 1 for event in requeued)
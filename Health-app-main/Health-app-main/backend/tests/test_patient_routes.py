@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.repositories.patients import get_patient_repository
+from src.routers import patients
+from src.utils.user_utils import AuthenticatedUser, get_current_user
+
+class FakePatients:
+    async def page(self, columns, limit, after=None, search=None, name=None, email=None):
+        rows = [{"id": "p1", "full_name": "Asha Rao", "email": "asha@example.com"}]
+        return rows if after is None else []
+
+    async def estimate_count(self, search=None, name=None, email=None):
+        return 1
+
+def request(path, role=None):
+    app = FastAPI()
+    app.include_router(patients.router)
+    app.dependency_overrides[get_patient_repository] = lambda: FakePatients()
+    if role is not None:
+        app.dependency_overrides[get_current_user] = lambda: AuthenticatedUser({"sub": "u1",
+                                                                                "app_metadata": {"role": role}})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(path)
+
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("path", ["/patients/", "/patients/export"])
+def test_patient_records_need_a_staff_role(path):
+    assert request(path).status_code == 403  # no bearer token
+    assert request(path, role="PATIENT").status_code == 403
+
+@pytest.mark.parametrize("role", ["DOCTOR", "ADMIN"])
+def test_staff_can_list_and_export_patients(role):
+    listing = request("/patients/", role=role)
+    assert listing.status_code == 200 and listing.json()["items"][0]["id"] == "p1"
+    export = request("/patients/export", role=role)
+    assert export.status_code == 200 and [row["id"] for row in export.json()] == ["p1"]
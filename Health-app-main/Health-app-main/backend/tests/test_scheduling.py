@@ -0,0 +1,93 @@
+from datetime import date, datetime, time, timedelta
+
+from src.utils.scheduling import BookingIntervals, SlotEngine, parse_datetime
+
+DAY = date(2024, 1, 1)  # a Monday
+
+def at(hour, minute=0, day=DAY):
+    return datetime.combine(day, time(hour, minute))
+
+def booking(start, minutes=30):
+    return start, start + timedelta(minutes=minutes)
+
+def engine(start, end):
+    return SlotEngine(default_hours={weekday: [(start, end)] for weekday in range(7)})
+
+def test_booking_starting_before_slot_overlaps_it():
+    bookings = BookingIntervals([(at(8, 45), at(9, 15))])
+    assert bookings.overlaps(at(9), at(9, 30))
+    assert bookings.overlaps(at(8, 30), at(9))
+    assert not bookings.overlaps(at(9, 15), at(9, 45))
+
+def test_booking_starting_before_window_blocks_first_slot():
+    bookings = BookingIntervals([(at(8, 45), at(9, 15))])
+    slots = list(bookings.free_slots(at(9), at(11), timedelta(minutes=30), timedelta(minutes=30)))
+    # The grid resumes at the first step after the booking ends
+    assert slots == [at(9, 30), at(10), at(10, 30)]
+
+def test_touching_intervals_do_not_overlap():
+    bookings = BookingIntervals([booking(at(10))])
+    assert not bookings.overlaps(at(9, 30), at(10))
+    assert not bookings.overlaps(at(10, 30), at(11))
+    assert bookings.overlaps(at(10, 29), at(10, 31))
+
+def test_touching_intervals_merge():
+    bookings = BookingIntervals([booking(at(10)), booking(at(10, 30)), booking(at(12))])
+    assert list(zip(bookings.starts, bookings.ends)) == [(at(10), at(11)), (at(12), at(12, 30))]
+    bookings.add(at(11), at(12))
+    assert list(zip(bookings.starts, bookings.ends)) == [(at(10), at(12, 30))]
+
+def test_add_merges_every_interval_it_spans():
+    bookings = BookingIntervals([booking(at(9)), booking(at(10)), booking(at(11))])
+    bookings.add(at(9, 15), at(11, 5))
+    assert list(zip(bookings.starts, bookings.ends)) == [(at(9), at(11, 30))]
+
+def test_free_slots_between_back_to_back_bookings():
+    bookings = BookingIntervals([booking(at(9)), booking(at(9, 30)), booking(at(10, 30))])
+    slots = engine(time(9), time(12)).free_slots("d", bookings, DAY, DAY)
+    assert slots == [at(10), at(11), at(11, 30)]
+
+def test_slot_ending_at_window_end_is_offered():
+    slots = engine(time(9), time(10)).free_slots("d", BookingIntervals(), DAY, DAY, duration=60, step=30)
+    assert slots == [at(9)]
+
+def test_parse_datetime_converts_offsets_to_naive_utc():
+    assert parse_datetime("2024-01-01T20:30:00-05:00") == at(1, 30, DAY + timedelta(days=1))
+    assert parse_datetime("2024-01-01T09:00:00Z") == at(9)
+    assert parse_datetime("2024-01-01T09:00:00") == at(9)
+
+def test_parse_datetime_accepts_postgrest_timestamps():
+    # PostgREST trims trailing zeros from fractions and may print an hour-only offset
+    assert parse_datetime("2024-01-01T09:00:00.5+00:00") == at(9) + timedelta(microseconds=500000)
+    assert parse_datetime("2024-01-01T09:00:00.12345+00") == at(9) + timedelta(microseconds=123450)
+    assert parse_datetime("2024-01-01T10:00:00+01") == at(9)
+    assert parse_datetime("2024-01-01T09:00:00.1234567Z") == at(9) + timedelta(microseconds=123456)
+
+def test_working_window_crossing_midnight():
+    windows = engine(time(22), time(2)).working_windows("d", DAY)
+    assert windows == [(at(22), at(2, day=DAY + timedelta(days=1)))]
+
+def test_overnight_slots_fall_on_the_day_they_start():
+    next_day = DAY + timedelta(days=1)
+    hours = engine(time(22), time(2))
+    # Day one gets the evening half of its own period and the early hours of the previous day's
+    assert hours.free_slots("d", BookingIntervals(), DAY, DAY, duration=60, step=60) == \
+        [at(0), at(1), at(22), at(23)]
+    assert hours.free_slots("d", BookingIntervals(), DAY, next_day, duration=60, step=60) == \
+        [at(0), at(1), at(22), at(23), at(0, day=next_day), at(1, day=next_day), at(22, day=next_day),
+         at(23, day=next_day)]
+
+def test_booking_across_utc_midnight_blocks_both_days():
+    next_day = DAY + timedelta(days=1)
+    # 18:45-19:15 at UTC-5 is 23:45-00:15 UTC
+    start = parse_datetime("2024-01-01T18:45:00-05:00")
+    bookings = BookingIntervals([(start, start + timedelta(minutes=30))])
+    slots = engine(time(22), time(2)).free_slots("d", bookings, DAY, next_day, duration=30, step=30)
+    assert at(23, 30) not in slots and at(0, day=next_day) not in slots
+    assert at(23) in slots and at(0, 30, day=next_day) in slots
+
+def test_not_before_applies_across_days():
+    hours = engine(time(9), time(11))
+    slots = hours.free_slots("d", BookingIntervals(), DAY, DAY + timedelta(days=1), not_before=at(10, 15))
+    assert slots == [at(10, 30), at(9, day=DAY + timedelta(days=1)), at(9, 30, day=DAY + timedelta(days=1)),
+                     at(10, day=DAY + timedelta(days=1)), at(10, 30, day=DAY + timedelta(days=1))]